@@ -0,0 +1,303 @@
+"""End-to-end throughput of SimpleTwitchBot against a local replay server
+
+Usage:
+    python benchmarks/bench_e2e.py [recorded_chat.log] [--lines N] [--profiles max,100x,burst]
+                                   [--json results.json] [--compare baseline.json]
+
+For each replay profile a ReplayServer is started in its own process and
+a bot (no live feed, archive or echo) connects to it over a real
+websocket. Reports, per profile:
+
+- ingest throughput: chat messages processed (scored and stored) per
+  second; near-duplicates are stored too, scored from their cluster
+- latency percentiles per stage: queue wait (received -> parsed),
+  scoring (submitted -> scored), store, and end-to-end (received -> stored)
+- dropped messages: lines the ingest queue discarded, and messages sent
+  but never processed
+- memory growth: resident set size of the bot process before and after
+
+Then times the parser, both scorers and the store on their own, so a
+regression can be pinned to a component. ``--json`` saves the results;
+``--compare`` prints the change against a saved run and exits with
+status 1 if any throughput fell by more than ``--threshold``.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+from chat_corpus import load_lines, frames
+from replay_server import ReplayServer
+from irc_parser import iter_messages
+from sentiment import SCORERS, make_analyzer, normalize_text
+from message_store import MessageStore
+from hype_metrics import HypeAggregator
+from simple_bot import SimpleTwitchBot
+
+CHANNEL = 'benchchannel'
+STAGES = ('queue_wait', 'scoring', 'store', 'end_to_end')
+
+
+def rss_bytes():
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def percentiles(samples):
+    """p50/p95/p99/max of latency samples, in milliseconds"""
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max())}
+
+
+class BenchBot(SimpleTwitchBot):
+    """SimpleTwitchBot that records per-stage latencies"""
+
+    def __init__(self, uri, **kwargs):
+        super().__init__(
+            channel=CHANNEL, uri=uri, live_feed=False, archive=False,
+            echo_every=0, status_interval=3600, **kwargs
+        )
+        self.latencies = {stage: [] for stage in STAGES}
+        self._submitted = {}  # id(item) -> submit time
+        submit = self.batcher.submit
+
+        def timed_submit(message, item):
+            self._submitted[id(item)] = time.perf_counter()
+            submit(message, item)
+
+        self.batcher.submit = timed_submit
+
+    @property
+    def processed(self):
+        """Chat messages scored and stored (near-duplicates included)"""
+        return self.store.total
+
+    async def handle_message(self, raw_message, received_at=None):
+        if received_at is not None:
+            self.latencies['queue_wait'].append(time.time() - received_at)
+        await super().handle_message(raw_message, received_at)
+
+    def handle_scored_message(self, item, sentiment):
+        started = time.perf_counter()
+        self.latencies['scoring'].append(started - self._submitted.pop(id(item), started))
+        super().handle_scored_message(item, sentiment)
+        self.latencies['store'].append(time.perf_counter() - started)
+        self.latencies['end_to_end'].append(time.time() - item[0])
+
+
+def serve(lines, profile, port, ready, sent):
+    """Replay server process: publishes its sent count into ``sent``"""
+    async def run():
+        server = ReplayServer(lines, profile)
+        task = asyncio.create_task(server.serve('127.0.0.1', port))
+        await asyncio.sleep(0.2)
+        ready.set()
+        while True:
+            sent.value = server.sent
+            await asyncio.sleep(0.05)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+async def run_profile(lines, profile, port, expected, duration, bot_options):
+    """Replay ``lines`` into a fresh bot; returns the profile's results"""
+    ready = multiprocessing.Event()
+    sent = multiprocessing.Value('q', 0)
+    server = multiprocessing.Process(target=serve, args=(lines, profile, port, ready, sent), daemon=True)
+    server.start()
+    ready.wait(10)
+
+    bot = BenchBot(f"ws://127.0.0.1:{port}", **bot_options)
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    task = asyncio.create_task(bot.start())
+    try:
+        # Until everything was processed, the time limit, or 2s without
+        # progress; throughput is timed from the first message, after the
+        # connection and JOIN
+        first = None
+        last, last_change = 0, start
+        while time.perf_counter() - start < duration:
+            await asyncio.sleep(0.01)
+            processed = bot.processed
+            if processed and first is None:
+                first = time.perf_counter()
+            if processed >= expected:
+                break
+            if processed != last:
+                last, last_change = processed, time.perf_counter()
+            elif processed and time.perf_counter() - last_change > 2:
+                break
+        elapsed = time.perf_counter() - (first or start)
+    finally:
+        bot.running = False
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.1)  # Let the server publish its final count
+        server.terminate()
+        server.join()
+
+    processed = bot.processed
+    return {
+        'profile': profile,
+        'sent': sent.value,
+        'processed': processed,
+        'stored': bot.store.total,
+        'duplicates': bot.dedup.duplicates if bot.dedup is not None else 0,
+        'throughput': processed / elapsed,
+        'elapsed': elapsed,
+        'queue_dropped': bot.ingest.dropped,
+        'lost': max(0, sent.value - processed),
+        'rss_growth_mb': (rss_bytes() - rss_before) / 2**20,
+        'latency_ms': {stage: percentiles(bot.latencies[stage]) for stage in STAGES}
+    }
+
+
+def time_component(func, count, repeat=5):
+    """Best-of-``repeat`` items/sec of ``func()`` processing ``count`` items"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def component_benchmarks(lines):
+    """Items/sec of the parser, each scorer and the store, in isolation"""
+    batched = frames(lines)
+    chat = [
+        (message.nick, normalize_text(message.trailing or ''))
+        for frame in batched
+        for message in iter_messages(frame)
+        if message.command == "PRIVMSG"
+    ]
+    texts = [text for _, text in chat]
+
+    def parse():
+        for frame in batched:
+            for message in iter_messages(frame):
+                message.nick, message.trailing
+
+    results = {'parser': time_component(parse, len(lines))}
+    for name in SCORERS:
+        analyzer = make_analyzer(name)
+        results[f'scorer_{name}'] = time_component(
+            lambda: [analyzer.polarity_scores(text) for text in texts], len(texts)
+        )
+
+    def store():
+        messages = MessageStore(CHANNEL, capacity=1000)
+        hype = HypeAggregator()
+        now = time.time()
+        for i, (username, text) in enumerate(chat):
+            timestamp = now + i * 0.001
+            messages.append(timestamp, username, text, 0.5, 'positive')
+            hype.push(timestamp, 0.5, 'positive')
+
+    results['store'] = time_component(store, len(chat))
+    return results
+
+
+def report(results):
+    for result in results['profiles']:
+        print(f"\n== {result['profile']}: {result['processed']}/{result['sent']} messages in {result['elapsed']:.1f}s "
+              f"({result['throughput']:,.0f} msg/s, {result['duplicates']} scored as duplicates)")
+        print(f"   dropped by queue: {result['queue_dropped']}  sent but not processed: {result['lost']}  "
+              f"RSS growth: {result['rss_growth_mb']:+.1f} MB")
+        print(f"   {'stage (ms)':<12}" + ''.join(f"{name:>10}" for name in ('p50', 'p95', 'p99', 'max')))
+        for stage, latency in result['latency_ms'].items():
+            print(f"   {stage:<12}" + ''.join(f"{latency[name]:>10.2f}" for name in ('p50', 'p95', 'p99', 'max')))
+    print("\nComponents:")
+    for name, rate in results['components'].items():
+        print(f"   {name:<16} {rate:>12,.0f} items/sec")
+
+
+def throughputs(results):
+    """Flat name -> items/sec of every throughput in a results dict"""
+    rates = {f"e2e_{result['profile']}": result['throughput'] for result in results['profiles']}
+    rates.update(results['components'])
+    return rates
+
+
+def compare(results, baseline, threshold):
+    """Print changes against ``baseline``; returns the regressed names"""
+    current, previous = throughputs(results), throughputs(baseline)
+    regressions = []
+    print(f"\nAgainst baseline (regression threshold {threshold:.0%}):")
+    for name, rate in current.items():
+        if name not in previous:
+            continue
+        change = rate / previous[name] - 1
+        flag = ''
+        if change < -threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"   {name:<16} {previous[name]:>12,.0f} -> {rate:>12,.0f}  {change:+.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', nargs='?', help='recorded chat log (raw IRC lines)')
+    parser.add_argument('--lines', type=int, default=50000, help='synthetic corpus size')
+    parser.add_argument('--profiles', default='max,100x,burst', help='comma-separated replay profiles')
+    parser.add_argument('--duration', type=float, default=30.0, help='time limit per profile, in seconds')
+    parser.add_argument('--port', type=int, default=16667)
+    parser.add_argument('--scorer', default='vader', choices=SCORERS)
+    parser.add_argument('--workers', type=int, default=0, help='scoring processes')
+    parser.add_argument('--dedup-window', type=float, default=10.0, help='0 disables duplicate collapsing')
+    parser.add_argument('--json', help='save results to this file')
+    parser.add_argument('--compare', help='baseline results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed throughput drop (fraction)')
+    args = parser.parse_args()
+
+    lines = load_lines(args.log, args.lines)
+    expected = sum(1 for line in lines if ' PRIVMSG ' in line)
+    print(f"Corpus: {args.log or 'synthetic'} ({len(lines)} lines, {expected} chat messages)")
+
+    bot_options = {'scorer': args.scorer, 'workers': args.workers, 'dedup_window': args.dedup_window}
+    results = {'profiles': [], 'components': {}}
+    for profile in args.profiles.split(','):
+        results['profiles'].append(asyncio.run(
+            run_profile(lines, profile, args.port, expected, args.duration, bot_options)
+        ))
+    results['components'] = component_benchmarks(lines)
+    report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
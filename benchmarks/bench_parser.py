@@ -0,0 +1,75 @@
+"""Microbenchmark for the IRC line parser
+
+Usage:
+    python benchmarks/bench_parser.py [recorded_chat.log] [--lines N]
+
+Reports lines/sec for irc_parser.iter_messages on multi-line frames and,
+for reference, for the old split("PRIVMSG") heuristic. The heuristic is
+timed on single lines (its best case) and also fed whole frames to show
+how many chat messages it loses when Twitch batches lines.
+"""
+import argparse
+import time
+
+from chat_corpus import load_lines, frames
+from irc_parser import iter_messages
+
+
+def legacy_parse(raw_message):
+    """The split("PRIVMSG") heuristic the bot used before irc_parser"""
+    if raw_message.startswith("PING"):
+        return None
+    if "PRIVMSG" in raw_message:
+        parts = raw_message.split("PRIVMSG")
+        if len(parts) > 1:
+            username = parts[0].split(":")[1].split("!")[0].strip()
+            message_content = parts[1].split(":", 1)[1].strip()
+            return username, message_content
+    return None
+
+
+def run(label, func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<34} {count:>9} lines  {count / best:>12,.0f} lines/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', nargs='?', help='recorded chat log (raw IRC lines)')
+    parser.add_argument('--lines', type=int, default=100000, help='synthetic corpus size')
+    args = parser.parse_args()
+
+    lines = load_lines(args.log, args.lines)
+    batched = frames(lines)
+    print(f"Corpus: {args.log or 'synthetic'} ({len(lines)} lines, {len(batched)} frames)")
+
+    def parse_frames():
+        count = 0
+        for frame in batched:
+            for message in iter_messages(frame):
+                if message.command == "PRIVMSG":
+                    message.nick, message.trailing
+                count += 1
+        return count
+
+    def parse_legacy():
+        for line in lines:
+            legacy_parse(line)
+        return len(lines)
+
+    run("irc_parser.iter_messages (frames)", parse_frames)
+    run("legacy split heuristic (lines)", parse_legacy)
+
+    chat_lines = sum(1 for line in lines if ' PRIVMSG ' in line)
+    parsed = sum(1 for frame in batched for message in iter_messages(frame) if message.command == "PRIVMSG")
+    legacy = sum(1 for frame in batched if legacy_parse(frame) is not None)
+    print(f"Chat messages recovered from frames: irc_parser {parsed}/{chat_lines}, legacy {legacy}/{chat_lines}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Indexed history queries versus scanning the stored chat in pandas
+
+Usage:
+    python benchmarks/bench_query.py [--messages 1000000] [--hours 6] [--users 5000]
+
+Writes a synthetic stream into a temporary SegmentStore (compacted hour
+partitions, like a past stream) and times two typical questions both ways:
+
+- one user's negative messages in a 15 minute window
+- sentiment per minute over the whole stream
+
+The scan baseline reads every segment into one DataFrame and filters it
+in pandas; ChatQuery prunes segments and row groups, uses the username
+index and reads only the columns it needs.
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import chat_corpus  # noqa: F401 (puts src/ on sys.path)
+from chat_query import ChatQuery
+from message_store import LABELS, LABEL_CODES
+from segment_store import SegmentStore
+
+CHANNEL = 'benchchannel'
+START = 1_700_000_000
+
+
+def fill(store, messages, hours, users, rng):
+    """Append a synthetic stream and compact it like a finished one"""
+    timestamps = np.sort(START + rng.random(messages) * hours * 3600).tolist()
+    # Few chatters write most messages
+    names = [f'user{index}' for index in np.minimum(rng.zipf(1.3, messages), users).tolist()]
+    scores = np.clip(rng.normal(0.1, 0.4, messages), -1, 1).tolist()
+    labels = [LABELS[code] for code in rng.integers(0, len(LABELS), messages).tolist()]
+    for row in zip(timestamps, names, scores, labels):
+        store.append(CHANNEL, row[0], row[1], 'message text', row[2], row[3])
+    store.flush()
+    store._drain()
+    store.compact()
+
+
+def scan(root):
+    """The whole stored channel as one DataFrame"""
+    paths = glob.glob(os.path.join(root, CHANNEL, '*', '*', '*.parquet'))
+    return pd.concat([pq.read_table(path).to_pandas() for path in paths], ignore_index=True)
+
+
+def timed(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--hours', type=int, default=6)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SegmentStore(root)
+        start = time.perf_counter()
+        fill(store, args.messages, args.hours, args.users, np.random.default_rng(args.seed))
+        print(f"Stored {args.messages} messages over {args.hours}h in {time.perf_counter() - start:.1f}s")
+
+        query = ChatQuery(store)
+        user, window = 'user42', (START + 3600, START + 3600 + 900)
+
+        def user_scan():
+            df = scan(root)
+            return df[(df['username'] == user) & (df['sentiment_label'] == LABEL_CODES['negative'])
+                      & (df['timestamp'] >= window[0]) & (df['timestamp'] < window[1])]
+
+        def timeline_scan():
+            df = scan(root)
+            return df.groupby(df['timestamp'] // 60)['sentiment_score'].agg(['count', 'mean'])
+
+        query.frame(CHANNEL, *window, users=[user], labels=['negative'])  # Build the username index once
+        cases = (
+            (f"{user} negative, 15 min", user_scan,
+             lambda: query.frame(CHANNEL, *window, users=[user], labels=['negative'])),
+            ('sentiment per minute', timeline_scan, lambda: query.timeline(CHANNEL, bucket=60)),
+        )
+        print(f"\n{'query':<28}{'rows':>8}{'scan ms':>10}{'indexed ms':>12}{'speedup':>9}")
+        for name, baseline, indexed in cases:
+            scan_time, expected = timed(baseline)
+            query_time, result = timed(indexed)
+            assert len(result) == len(expected), (len(result), len(expected))
+            print(f"{name:<28}{len(result):>8}{scan_time * 1000:>10.1f}{query_time * 1000:>12.1f}{scan_time / query_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
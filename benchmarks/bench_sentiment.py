@@ -0,0 +1,83 @@
+"""Throughput and agreement of the sentiment scorers
+
+Usage:
+    python benchmarks/bench_sentiment.py [recorded_chat.log] [--lines N]
+
+Extracts the chat messages of a corpus and scores every one of them
+(the cache is bypassed) with VADER's polarity_scores and with the
+emote-aware HypeLexiconAnalyzer. Reports messages/sec for both, then
+how often they agree on the sentiment label, the correlation of their
+compound scores, and a label confusion table.
+"""
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+
+from chat_corpus import load_lines, frames
+from irc_parser import iter_messages
+from sentiment import SCORERS, label_for, make_analyzer, normalize_text
+from message_store import LABELS
+
+
+def chat_messages(lines):
+    """Normalized text of every PRIVMSG in the corpus"""
+    return [
+        normalize_text(message.trailing or '')
+        for frame in frames(lines)
+        for message in iter_messages(frame)
+        if message.command == "PRIVMSG"
+    ]
+
+
+def run(label, analyzer, texts, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scores = [analyzer.polarity_scores(text)['compound'] for text in texts]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<10} {len(texts):>9} messages  {len(texts) / best:>12,.0f} messages/sec")
+    return np.array(scores), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', nargs='?', help='recorded chat log (raw IRC lines)')
+    parser.add_argument('--lines', type=int, default=100000, help='synthetic corpus size')
+    args = parser.parse_args()
+
+    texts = chat_messages(load_lines(args.log, args.lines))
+    print(f"Corpus: {args.log or 'synthetic'} ({len(texts)} messages, {len(set(texts))} distinct)")
+
+    results = {}
+    for name in SCORERS:
+        results[name] = run(name, make_analyzer(name), texts)
+    (vader, vader_time), (lexicon, lexicon_time) = results['vader'], results['lexicon']
+    print(f"Speedup: {vader_time / lexicon_time:.1f}x")
+
+    vader_labels = np.array([label_for(score) for score in vader])
+    lexicon_labels = np.array([label_for(score) for score in lexicon])
+    agreement = np.mean(vader_labels == lexicon_labels)
+    correlation = np.corrcoef(vader, lexicon)[0, 1] if vader.std() and lexicon.std() else float('nan')
+    print(f"Label agreement: {agreement:.1%}  compound correlation: {correlation:.3f}")
+
+    print("\n" + f"{'vader/lexicon':<16}" + ''.join(f"{label:>10}" for label in LABELS))
+    for row in LABELS:
+        mask = vader_labels == row
+        print(f"{row:<16}" + ''.join(f"{np.sum(lexicon_labels[mask] == column):>10}" for column in LABELS))
+
+    # Most frequent messages the scorers disagree on, to review the lexicon
+    disagreements = Counter(
+        text for text, a, b in zip(texts, vader_labels, lexicon_labels) if a != b
+    ).most_common(10)
+    if disagreements:
+        print("\nMost frequent disagreements (vader -> lexicon):")
+        scored = dict(zip(texts, zip(vader_labels, lexicon_labels)))
+        for text, count in disagreements:
+            print(f"  {count:>7}  {scored[text][0]:>8} -> {scored[text][1]:<8}  {text[:60]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Throughput and accuracy of the spike detector across many channels
+
+Usage:
+    python benchmarks/bench_spikes.py [--channels 500] [--seconds 1800] [--seed 1]
+
+Simulates per-second chat for every channel: Poisson message counts at a
+per-channel base rate (0.2 to 50 msg/s) and normally distributed scores.
+Every channel gets one rate surge (6x for 10s) and one lasting sentiment
+shift at random times. Reports messages/sec and ticks/sec through
+``SpikeDetector.add``, and how many injected spikes were found, how late,
+and how many events fired elsewhere (false positives per channel-hour).
+"""
+import argparse
+import time
+
+import numpy as np
+
+import chat_corpus  # noqa: F401 (puts src/ on sys.path)
+from spike_detector import SpikeDetector
+
+START = 1_700_000_000
+
+# Room for the detector's warmup, the surge in the first half and the
+# sentiment shift (60s into the second half, at least 120s before the end)
+MIN_SECONDS = 600
+
+
+def simulate(channels, seconds, rng):
+    """Per-channel (base rate, surge second, shift second, shift) and the messages"""
+    plans = []
+    for _ in range(channels):
+        rate = float(np.exp(rng.uniform(np.log(0.2), np.log(50))))
+        surge = int(rng.integers(seconds // 6, seconds // 2))
+        shift = int(rng.integers(seconds // 2 + 60, seconds - 120))
+        plans.append((rate, surge, shift, float(rng.choice([-0.3, 0.3]))))
+
+    # (timestamp, channel, score) in time order, as a bot would see them
+    messages = []
+    for second in range(seconds):
+        for channel, (rate, surge, shift, delta) in enumerate(plans):
+            surging = surge <= second < surge + 10
+            count = rng.poisson(rate * 6 if surging else rate)
+            if not count:
+                continue
+            mean = 0.1 + (delta if second >= shift else 0.0) + (0.3 if surging else 0.0)
+            scores = np.clip(rng.normal(mean, 0.35, count), -1, 1)
+            offsets = np.sort(rng.random(count))
+            for offset, score in zip(offsets.tolist(), scores.tolist()):
+                messages.append((START + second + offset, channel, score))
+    return plans, messages
+
+
+def stream_seconds(value):
+    """--seconds, long enough to place both injected spikes"""
+    seconds = int(value)
+    if seconds < MIN_SECONDS:
+        raise argparse.ArgumentTypeError(f"--seconds must be at least {MIN_SECONDS} (got {seconds})")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=500)
+    parser.add_argument('--seconds', type=stream_seconds, default=1800,
+                        help=f'simulated stream length (at least {MIN_SECONDS})')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    plans, messages = simulate(args.channels, args.seconds, rng)
+    print(f"Simulated {args.channels} channels x {args.seconds}s: {len(messages)} messages")
+
+    detectors = [SpikeDetector(f"channel{index}") for index in range(args.channels)]
+    start = time.perf_counter()
+    for timestamp, channel, score in messages:
+        detectors[channel].add(timestamp, score)
+    end_second = START + args.seconds
+    for detector in detectors:
+        detector.advance(end_second)
+    elapsed = time.perf_counter() - start
+    ticks = sum(detector.ticks for detector in detectors)
+    print(f"{'messages':<10} {len(messages) / elapsed:>12,.0f} /sec")
+    print(f"{'ticks':<10} {ticks / elapsed:>12,.0f} /sec  ({ticks} channel-seconds in {elapsed:.2f}s)")
+
+    # An injected spike counts as found by a matching event within 30s.
+    # Quiet channels cannot reach min_rate or min_messages, so results are
+    # split by base rate
+    bands = ((0, 1), (1, 5), (5, float('inf')))
+    found = {(kind, band): 0 for kind in ('rate', 'sentiment') for band in bands}
+    injected = {band: 0 for band in bands}
+    delays = []
+    others = 0
+    for detector, (rate, surge, shift, delta) in zip(detectors, plans):
+        band = next(band for band in bands if band[0] <= rate < band[1])
+        injected[band] += 1
+        targets = {'rate': (START + surge, 'up'), 'sentiment': (START + shift, 'up' if delta > 0 else 'down')}
+        matched = set()
+        for event in detector.events:
+            target, direction = targets[event.kind]
+            if event.kind not in matched and event.direction == direction and 0 <= event.timestamp - target <= 30:
+                matched.add(event.kind)
+                found[event.kind, band] += 1
+                delays.append(event.timestamp - target)
+            elif not (event.kind == 'sentiment' and 0 <= event.timestamp - START - surge <= 30):
+                others += 1  # Sentiment rises during surges too; that is a real shift
+
+    print(f"\n{'base rate':<12}{'channels':>10}{'surges found':>16}{'shifts found':>16}")
+    for band in bands:
+        label = f"{band[0]}-{band[1]} msg/s" if band[1] != float('inf') else f"{band[0]}+ msg/s"
+        print(f"{label:<12}{injected[band]:>10}{found['rate', band]:>16}{found['sentiment', band]:>16}")
+    if delays:
+        print(f"detection delay: median {np.median(delays):.0f}s, max {max(delays):.0f}s")
+    hours = args.channels * args.seconds / 3600
+    print(f"other events: {others} ({others / hours:.2f} per channel-hour)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Memory per retained message of the message store layouts
+
+Usage:
+    python benchmarks/bench_store_memory.py [recorded_chat.log] [--capacities 1000,100000]
+
+Fills each layout with the newest ``capacity`` chat messages of the
+corpus and reports the bytes per retained message that tracemalloc sees
+still allocated, plus append throughput:
+
+- object DataFrame: the original ``messages_df`` (one Python object per
+  cell, the channel repeated in every row)
+- str list: the previous MessageStore (NumPy columns, one str per message)
+- arena: MessageStore with the UTF-8 text arena, and its own
+  ``memory_usage()`` estimate
+
+Usernames and texts are parsed inside the measurement, so every layout
+pays for the strings it keeps and none for the ones it only encodes.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from chat_corpus import load_lines
+from irc_parser import iter_messages
+from message_store import LABELS, LABEL_CODES, MessageStore
+
+CHANNEL = 'benchchannel'
+
+
+class StrListStore:
+    """The MessageStore layout before the text arena: one str object per message"""
+
+    def __init__(self, channel, capacity):
+        self.channel = channel
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype='float64')
+        self.scores = np.zeros(capacity, dtype='float32')
+        self.labels = np.zeros(capacity, dtype='int8')
+        self.user_ids = np.zeros(capacity, dtype='int32')
+        self.messages = [None] * capacity
+        self.usernames = []
+        self._user_index = {}
+        self.head = 0
+
+    def append(self, timestamp, username, message, score, label):
+        slot = self.head
+        user_id = self._user_index.get(username)
+        if user_id is None:
+            user_id = self._user_index[username] = len(self.usernames)
+            self.usernames.append(username)
+        self.timestamps[slot] = timestamp
+        self.scores[slot] = score
+        self.labels[slot] = LABEL_CODES[label]
+        self.user_ids[slot] = user_id
+        self.messages[slot] = message
+        self.head = (slot + 1) % self.capacity
+
+
+def object_frame(rows, channel):
+    """The original messages_df: every column holds Python objects"""
+    return pd.DataFrame({
+        'timestamp': pd.Series([pd.Timestamp(timestamp, unit='s') for timestamp, *_ in rows], dtype=object),
+        'username': pd.Series([username for _, username, *_ in rows], dtype=object),
+        'message': pd.Series([message for *_, message, _, _ in rows], dtype=object),
+        'sentiment_score': pd.Series([score for *_, score, _ in rows], dtype=object),
+        'sentiment_label': pd.Series([label for *_, label in rows], dtype=object),
+        'channel': pd.Series([channel] * len(rows), dtype=object)
+    })
+
+
+def chat_rows(lines, count):
+    """The newest ``count`` chat messages as (timestamp, username, message, score, label)"""
+    rows = []
+    for i, line in enumerate(lines):
+        for message in iter_messages(line):
+            if message.command == "PRIVMSG":
+                label = LABELS[i % len(LABELS)]
+                rows.append((1.7e9 + i * 0.01, message.nick, message.trailing, (i % 200) / 100 - 1, label))
+    return rows[-count:]
+
+
+def measure(build):
+    """Bytes still allocated after ``build()``, and the built object"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return allocated, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', nargs='?', help='recorded chat log (raw IRC lines)')
+    parser.add_argument('--capacities', default='1000,100000', help='comma-separated retained message counts')
+    args = parser.parse_args()
+
+    capacities = [int(capacity) for capacity in args.capacities.split(',')]
+    lines = load_lines(args.log, int(max(capacities) * 1.01) + 100)
+    print(f"Corpus: {args.log or 'synthetic'} ({len(lines)} lines)")
+
+    for capacity in capacities:
+        count = len(chat_rows(lines, capacity))
+
+        def fill(store):
+            for row in chat_rows(lines, capacity):
+                store.append(*row)
+            return store
+
+        results = {
+            'object DataFrame': measure(lambda: object_frame(chat_rows(lines, capacity), CHANNEL))[0],
+            'str list': measure(lambda: fill(StrListStore(CHANNEL, capacity)))[0]
+        }
+        results['arena'], store = measure(lambda: fill(MessageStore(CHANNEL, capacity)))
+
+        rows = chat_rows(lines, capacity)
+        rates = {}
+        for name, make in (('str list', StrListStore), ('arena', MessageStore)):
+            start = time.perf_counter()
+            fill_store = make(CHANNEL, capacity)
+            for row in rows:
+                fill_store.append(*row)
+            rates[name] = len(rows) / (time.perf_counter() - start)
+
+        text_bytes = sum(len(row[2].encode()) for row in rows)
+        print(f"\n== {count} retained messages ({text_bytes / count:.1f} bytes of UTF-8 text each)")
+        print(f"   {'layout':<18}{'bytes/msg':>12}{'vs original':>14}{'appends/sec':>14}")
+        for name, allocated in results.items():
+            rate = f"{rates[name]:>14,.0f}" if name in rates else ''
+            print(f"   {name:<18}{allocated / count:>12.1f}{allocated / results['object DataFrame']:>14.0%}{rate}")
+        print(f"   {'arena (estimate)':<18}{store.memory_usage() / count:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
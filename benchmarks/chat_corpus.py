@@ -0,0 +1,82 @@
+"""Chat corpora shared by the benchmarks
+
+A recorded log is a text file of raw IRC lines as received from Twitch
+(one per line). When no recording is given, a synthetic corpus with the
+same shape is generated: tagged PRIVMSG lines dominated by repeated
+emotes and copypastas, with the occasional PING and server notice.
+"""
+import os
+import random
+import sys
+
+# Make the bot modules in src/ importable from the benchmarks
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+CHAT_LINES = [
+    "PogChamp PogChamp PogChamp",
+    "KEKW",
+    "LUL LUL LUL",
+    "GG",
+    "gg wp",
+    "Sadge",
+    "this stream is amazing!",
+    "what a play omg",
+    "W",
+    "L",
+    "that was so bad lmao",
+    "monkaS monkaS",
+    "Pog",
+    "let's gooooo",
+    "I love this game",
+    "boring...",
+    "HYPE HYPE HYPE",
+    "first time here, loving it",
+    "Kappa",
+    "catJAM catJAM catJAM catJAM",
+]
+
+COPYPASTA = "I'm not even mad, that was actually impressive. Chat, clip it before it's gone PogChamp"
+
+
+def synthetic_lines(count=100000, channel='otplol', users=5000, seed=1):
+    """Generate ``count`` raw IRC lines resembling busy Twitch chat"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        if i % 2000 == 1999:
+            lines.append("PING :tmi.twitch.tv")
+            continue
+        user = f"viewer{rng.randrange(users)}"
+        roll = rng.random()
+        if roll < 0.15:
+            text = COPYPASTA
+        elif roll < 0.95:
+            text = rng.choice(CHAT_LINES)
+        else:
+            text = f"{rng.choice(CHAT_LINES)} {rng.randrange(1000)}"
+        tags = (
+            f"@badge-info=;badges=;color=#{rng.randrange(0xFFFFFF):06X};display-name={user};"
+            f"emotes=;first-msg=0;flags=;id={rng.getrandbits(64):016x};mod=0;"
+            f"room-id=12345;subscriber=0;tmi-sent-ts={1700000000000 + i * 10};turbo=0;"
+            f"user-id={rng.randrange(10 ** 8)};user-type="
+        )
+        lines.append(f"{tags} :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{channel} :{text}")
+    return lines
+
+
+def load_lines(path=None, count=100000):
+    """Load a recorded log, or generate a synthetic one if ``path`` is None"""
+    if path is None:
+        return synthetic_lines(count)
+    with open(path, encoding='utf-8') as f:
+        return [line.rstrip('\r\n') for line in f if line.strip()]
+
+
+def frames(lines, lines_per_frame=8):
+    """Group lines into CRLF-joined websocket frames like Twitch sends"""
+    return [
+        '\r\n'.join(lines[i:i + lines_per_frame]) + '\r\n'
+        for i in range(0, len(lines), lines_per_frame)
+    ]
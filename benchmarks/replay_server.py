@@ -0,0 +1,144 @@
+"""Local stand-in for Twitch IRC that replays recorded chat
+
+Usage:
+    python benchmarks/replay_server.py [recorded_chat.log] [--port 6667] [--profile 10x]
+
+Speaks just enough of Twitch's IRC-over-websocket protocol for the bots
+(welcome on NICK, JOIN echo, PING/PONG) and, once a client joins a
+channel, replays the corpus into that channel. Point a bot at it with
+``SimpleTwitchBot(uri='ws://127.0.0.1:6667')``.
+
+Profiles:
+    1x, 10x, 100x ...   replay at a multiple of the recorded pace
+                        (tmi-sent-ts tags, or --base-rate msg/s without them)
+    max                 as fast as the client reads
+    burst               recorded pace, with a 100x burst for 1s every 5s
+"""
+import argparse
+import asyncio
+import re
+import time
+
+import websockets
+
+from chat_corpus import load_lines
+
+_SENT_TS = re.compile(r'tmi-sent-ts=(\d+)')
+_PRIVMSG_CHANNEL = re.compile(r' PRIVMSG #[^ ]+ ')
+
+
+def line_offsets(lines, base_rate=100.0):
+    """Seconds from the first line at which each line was recorded"""
+    stamps = []
+    for line in lines:
+        match = _SENT_TS.search(line)
+        stamps.append(int(match.group(1)) / 1000 if match else None)
+    if any(stamp is None for stamp in stamps):
+        return [i / base_rate for i in range(len(lines))]
+    first = stamps[0]
+    return [stamp - first for stamp in stamps]
+
+
+def schedule(offsets, profile):
+    """Replay time of each line, in seconds from the start, for a profile"""
+    if profile == 'max':
+        return [0.0] * len(offsets)
+    if profile == 'burst':
+        # Walk the recording at 1x, but at 100x during the first second of
+        # every five
+        times, clock, previous = [], 0.0, 0.0
+        for offset in offsets:
+            gap = offset - previous
+            previous = offset
+            clock += gap / 100 if clock % 5 < 1 else gap
+            times.append(clock)
+        return times
+    speed = float(profile.rstrip('x'))
+    return [offset / speed for offset in offsets]
+
+
+class ReplayServer:
+    """Replays ``lines`` to every client that joins a channel
+
+    Lines are rewritten to the joined channel and sent in CRLF-joined
+    frames of up to ``lines_per_frame`` lines, as Twitch batches them.
+    ``sent`` counts the PRIVMSG lines sent so far.
+    """
+
+    def __init__(self, lines, profile='10x', base_rate=100.0, lines_per_frame=8, repeat=1):
+        self.lines = lines
+        self.profile = profile
+        self.times = schedule(line_offsets(lines, base_rate), profile)
+        self.lines_per_frame = lines_per_frame
+        self.repeat = repeat
+        self.sent = 0
+        self.finished = asyncio.Event()
+
+    async def handle(self, websocket):
+        replays = []
+        try:
+            async for frame in websocket:
+                for line in frame.split('\r\n'):
+                    command, _, rest = line.partition(' ')
+                    if command == 'NICK':
+                        await websocket.send(f":tmi.twitch.tv 001 {rest} :Welcome, GLHF!\r\n")
+                    elif command == 'PING':
+                        await websocket.send(f"PONG {rest}\r\n")
+                    elif command == 'JOIN':
+                        channel = rest.lstrip('#')
+                        await websocket.send(f":{channel}!{channel}@{channel}.tmi.twitch.tv JOIN #{channel}\r\n")
+                        replays.append(asyncio.create_task(self.replay(websocket, channel)))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for task in replays:
+                task.cancel()
+
+    async def replay(self, websocket, channel):
+        target = f' PRIVMSG #{channel} '
+        lines = [_PRIVMSG_CHANNEL.sub(target, line, count=1) for line in self.lines]
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            i = 0
+            while i < len(lines):
+                delay = self.times[i] - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Everything that is due goes out together, a frame at a time
+                elapsed = time.perf_counter() - start
+                end = i + 1
+                while end < len(lines) and end - i < self.lines_per_frame and self.times[end] <= elapsed:
+                    end += 1
+                batch = lines[i:end]
+                await websocket.send('\r\n'.join(batch) + '\r\n')
+                self.sent += sum(1 for line in batch if ' PRIVMSG ' in line)
+                i = end
+        self.finished.set()
+
+    async def serve(self, host='127.0.0.1', port=6667):
+        """Serve until cancelled"""
+        async with websockets.serve(self.handle, host, port, max_size=None):
+            await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', nargs='?', help='recorded chat log (raw IRC lines)')
+    parser.add_argument('--lines', type=int, default=100000, help='synthetic corpus size')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6667)
+    parser.add_argument('--profile', default='10x', help='Nx, max or burst')
+    parser.add_argument('--base-rate', type=float, default=100.0, help='msg/s of a recording without timestamps')
+    parser.add_argument('--repeat', type=int, default=1, help='replay the corpus this many times per client')
+    args = parser.parse_args()
+
+    server = ReplayServer(load_lines(args.log, args.lines), args.profile, args.base_rate, repeat=args.repeat)
+    print(f"Replaying {len(server.lines)} lines ({args.profile}) on ws://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\nStopped after {server.sent} messages")
+
+
+if __name__ == '__main__':
+    main()
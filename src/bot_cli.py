@@ -0,0 +1,204 @@
+"""Command-line entry point for the hype tracker bots
+
+Usage:
+    python src/bot_cli.py [channel ...] [options]
+
+One channel runs SimpleTwitchBot, several run MultiChannelBot over shared
+connections. Examples:
+
+    python src/bot_cli.py xqc --scorer lexicon --workers 2
+    python src/bot_cli.py xqc --sinks feed,archive
+    python src/bot_cli.py xqc shroud pokimane --headless --sinks archive
+    python src/bot_cli.py benchchannel --uri ws://127.0.0.1:6667 --sinks none --headless
+    python src/bot_cli.py xqc --sinks feed,ndjson,sqlite --export-dir /tmp/chat-export
+
+Runs on uvloop when it is installed (``--loop``). Heavy dependencies are
+imported only when the chosen options need them: pandas and pyarrow with
+the archive and parquet sinks, the scorer's lexicon on first use.
+"""
+import argparse
+import asyncio
+import re
+
+from hype_metrics import DEFAULT_WINDOWS, DEFAULT_HALF_LIVES
+from irc_parser import TWITCH_IRC_URI
+from pipeline import OVERFLOW_POLICIES
+from sentiment import SCORERS
+
+DEFAULT_CHANNELS = ('otplol',)
+EXPORTS = ('ndjson', 'parquet', 'sqlite')  # Sinks from export_sinks
+SINKS = ('feed', 'archive') + EXPORTS
+DEFAULT_SINKS = ('feed',)  # The Parquet archive is opt-in: --sinks feed,archive
+_TIME_UNITS = {'s': 1, 'min': 60, 'h': 3600}
+
+
+def parse_windows(spec):
+    """``last_50,10s,60s,5min`` -> window definitions for HypeAggregator"""
+    windows = []
+    for name in spec.split(','):
+        name = name.strip()
+        match = re.fullmatch(r'last_(\d+)', name)
+        if match:
+            window = (name, 'count', int(match.group(1)))
+        else:
+            match = re.fullmatch(r'(\d+)(s|min|h)', name)
+            if not match:
+                raise argparse.ArgumentTypeError(f"Bad window {name!r} (expected last_N, Ns, Nmin or Nh)")
+            window = (name, 'time', int(match.group(1)) * _TIME_UNITS[match.group(2)])
+        if window[2] == 0:
+            raise argparse.ArgumentTypeError(f"Window must not be empty: {name!r}")
+        windows.append(window)
+    return tuple(windows)
+
+
+def parse_half_lives(spec):
+    """``sentiment=20,rate=10`` -> half-lives in seconds for the decayed hype index"""
+    half_lives = {}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_HALF_LIVES:
+            raise argparse.ArgumentTypeError(f"Bad half-life {item!r} (expected {', '.join(DEFAULT_HALF_LIVES)}=SECONDS)")
+        try:
+            half_lives[name] = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Bad half-life {item!r} (expected {name}=SECONDS)")
+        if half_lives[name] <= 0:
+            raise argparse.ArgumentTypeError(f"Half-life must be positive: {item!r}")
+    return half_lives
+
+
+def parse_sinks(spec):
+    """``feed,archive`` -> set of enabled output sinks ('none' for no sinks)"""
+    sinks = {sink.strip() for sink in spec.split(',') if sink.strip()} - {'none'}
+    unknown = sinks - set(SINKS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown sink(s): {', '.join(sorted(unknown))} (expected {', '.join(SINKS)} or none)")
+    return sinks
+
+
+def build_parser(default_channels=DEFAULT_CHANNELS):
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0], epilog='\n'.join(__doc__.splitlines()[4:]),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('channels', nargs='*', default=list(default_channels), help='channels to track')
+    parser.add_argument('--uri', default=TWITCH_IRC_URI, help='IRC websocket (e.g. a local replay server)')
+
+    analysis = parser.add_argument_group('analysis')
+    analysis.add_argument('--windows', type=parse_windows, default=DEFAULT_WINDOWS,
+                          help='rolling windows, e.g. last_50,10s,60s,5min')
+    analysis.add_argument('--half-lives', type=parse_half_lives, default={},
+                          help='hype index half-lives in seconds (default '
+                               + ','.join(f'{name}={value:g}' for name, value in DEFAULT_HALF_LIVES.items()) + ')')
+    analysis.add_argument('--history-size', type=int, default=1000, help='messages kept in memory per channel')
+    analysis.add_argument('--scorer', default='vader', choices=SCORERS)
+    analysis.add_argument('--cache-size', type=int, default=10000, help='sentiment cache entries')
+    analysis.add_argument('--dedup-window', type=float, default=10.0, help='seconds; 0 disables copypasta collapsing')
+
+    pipeline = parser.add_argument_group('pipeline')
+    pipeline.add_argument('--workers', type=int, default=0, help='scoring processes (0 scores on the event loop)')
+    pipeline.add_argument('--batch-size', type=int, default=64)
+    pipeline.add_argument('--batch-delay', type=float, default=0.05, help='seconds')
+    pipeline.add_argument('--queue-size', type=int, default=10000)
+    pipeline.add_argument('--overflow', default='block', choices=OVERFLOW_POLICIES)
+    pipeline.add_argument('--channels-per-connection', type=int, default=100)
+    pipeline.add_argument('--loop', default='auto', choices=('auto', 'uvloop', 'asyncio'),
+                          help='event loop (auto: uvloop when installed)')
+
+    output = parser.add_argument_group('output')
+    output.add_argument('--sinks', type=parse_sinks, default=set(DEFAULT_SINKS),
+                        help=f"comma-separated: {', '.join(SINKS)} or none (default {','.join(DEFAULT_SINKS)})")
+    output.add_argument('--feed-dir', help='live feed directory for the dashboard')
+    output.add_argument('--feed-records', type=int, default=1024,
+                        help='messages kept in each channel\'s live feed with several channels')
+    output.add_argument('--storage-dir', help='Parquet history directory')
+    output.add_argument('--export-dir', help='directory for the ndjson, parquet and sqlite exports')
+    output.add_argument('--headless', action='store_true', help='no status lines or chat echo')
+    output.add_argument('--status-interval', type=float, default=1.0, help='seconds between status lines')
+    output.add_argument('--echo-every', type=int, default=None, help='echo one in N chat messages (0 disables)')
+    output.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on this port')
+    output.add_argument('--profile', action='store_true', help='start the sampling profiler (needs --metrics-port)')
+    return parser
+
+
+def new_event_loop(mode='auto'):
+    """An event loop for ``mode``: uvloop, asyncio, or uvloop if installed"""
+    if mode != 'asyncio':
+        try:
+            import uvloop
+            return uvloop.new_event_loop()
+        except ImportError:
+            if mode == 'uvloop':
+                raise SystemExit("uvloop is not installed (pip install uvloop)")
+    return asyncio.new_event_loop()
+
+
+def build_exports(args):
+    """Export sinks enabled in ``--sinks``"""
+    names = [name for name in EXPORTS if name in args.sinks]
+    if not names:
+        return []
+    from export_sinks import make_sink
+    return [make_sink(name, args.export_dir) for name in names]
+
+
+def build_bot(args):
+    options = dict(
+        history_size=args.history_size, windows=args.windows, cache_size=args.cache_size,
+        scorer=args.scorer, batch_size=args.batch_size, batch_delay=args.batch_delay,
+        workers=args.workers, queue_size=args.queue_size, overflow=args.overflow,
+        status_interval=0 if args.headless else args.status_interval,
+        live_feed='feed' in args.sinks, feed_dir=args.feed_dir,
+        archive='archive' in args.sinks, storage_dir=args.storage_dir,
+        dedup_window=args.dedup_window, uri=args.uri,
+        metrics_port=args.metrics_port, profile=args.profile, half_lives=args.half_lives,
+        exports=build_exports(args)
+    )
+    if args.echo_every is not None or args.headless:
+        options['echo_every'] = 0 if args.headless else args.echo_every
+
+    if len(args.channels) == 1:
+        from simple_bot import SimpleTwitchBot
+        return SimpleTwitchBot(channel=args.channels[0], **options)
+    from multi_channel import MultiChannelBot
+    return MultiChannelBot(
+        channels=args.channels, channels_per_connection=args.channels_per_connection,
+        feed_records=args.feed_records, **options
+    )
+
+
+def main(argv=None, default_channels=DEFAULT_CHANNELS):
+    args = build_parser(default_channels).parse_args(argv)
+    if args.profile and args.metrics_port is None:
+        raise SystemExit("--profile needs --metrics-port to read the profile")
+
+    loop = new_event_loop(args.loop)
+    asyncio.set_event_loop(loop)
+    bot = build_bot(args)
+    print(f"Event loop: {type(loop).__module__.split('.')[0]}")
+
+    task = loop.create_task(bot.start())
+    try:
+        loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        print("\nBot stopped by user")
+        bot.running = False
+        # Let the bot flush its pipeline and close its sinks
+        task.cancel()
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+    finally:
+        # Cancel leftovers (e.g. websocket keepalives) before closing the loop
+        pending = asyncio.all_tasks(loop)
+        for leftover in pending:
+            leftover.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
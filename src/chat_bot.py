@@ -0,0 +1,295 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from message_store import MessageStore, LABEL_CODES
+from hype_metrics import HypeAggregator, DEFAULT_WINDOWS
+from sentiment import SentimentEngine, MicroBatcher
+from pipeline import IngestQueue, consume
+from irc_parser import iter_messages
+from status_reporter import StatusReporter
+from rollups import Rollups
+from dedup import Deduplicator
+from spike_detector import SpikeDetector
+from instrumentation import Instrumentation
+
+# Console indicator per sentiment label
+SENTIMENT_EMOJI = {
+    'positive': '😊',
+    'negative': '😠',
+    'neutral': '😐'
+}
+
+
+class ChannelState:
+    """Per-channel message store, rolling hype metrics and outputs"""
+
+    def __init__(self, channel, history_size=1000, windows=DEFAULT_WINDOWS, feed=None, archive=None,
+                 dedup_window=10.0, connection=None, on_spike=None, on_collapsed=None, half_lives=None,
+                 exports=()):
+        self.channel = channel
+        self.store = MessageStore(channel, capacity=history_size)
+        self.connection = connection  # TwitchConnection the channel is read from
+        self.gaps = connection.gaps if connection is not None else None
+        self.hype = HypeAggregator(windows, gaps=self.gaps, half_lives=half_lives)
+        self.feed = feed  # Optional LiveFeedWriter
+        self.rollups = Rollups() if feed is not None else None  # Published with the feed's snapshots
+        self.archive = archive  # Optional SegmentStore shared by all channels
+        self.exports = exports  # Export sinks shared by all channels
+        # Collapses copypastas before scoring; on_collapsed(channel, cluster) once one stops repeating
+        self.dedup = None
+        if dedup_window:
+            self.dedup = Deduplicator(dedup_window, on_collapsed=partial(on_collapsed, channel) if on_collapsed else None)
+        self.spikes = SpikeDetector(channel, on_spike=on_spike, gaps=self.gaps)  # O(1) per message, no history kept
+
+    def store_message(self, timestamp, username, message, sentiment_data):
+        """Store a scored message and update the rolling metrics"""
+        self.store.append(timestamp, username, message, sentiment_data['compound'], sentiment_data['label'])
+        self.hype.push(timestamp, sentiment_data['compound'], sentiment_data['label'])
+        self.spikes.add(timestamp, sentiment_data['compound'])
+        if self.feed is not None:
+            self.feed.append(timestamp, username, message, sentiment_data['compound'], sentiment_data['label'])
+            self.rollups.queue(timestamp, username, sentiment_data['compound'], LABEL_CODES[sentiment_data['label']])
+        if self.archive is not None:
+            self.archive.append(self.channel, timestamp, username, message, sentiment_data['compound'], sentiment_data['label'])
+        for sink in self.exports:
+            sink.append(self.channel, timestamp, username, message, sentiment_data['compound'], sentiment_data['label'])
+
+    def get_snapshot(self):
+        """Metrics snapshot published to the live feed"""
+        now = time.time()
+        snapshot = {
+            'channel': self.channel,
+            'timestamp': now,
+            'total_messages': self.store.total,
+            'windows': self.hype.all_metrics(now),
+            'hype': self.hype.hype_index(now),
+            'spikes': self.spikes.stats()
+        }
+        if self.dedup is not None:
+            snapshot['spam'] = self.dedup.stats(now)
+        if self.connection is not None:
+            snapshot['connection'] = self.connection.stats()
+        return snapshot
+
+    def get_hype_metrics(self, window=None):
+        """Current hype metrics for one rolling window (the first configured one by default)"""
+        return self.hype.metrics(window or next(iter(self.hype.windows)), now=time.time())
+
+    def close(self):
+        """Release the channel's live feed"""
+        if self.feed is not None:
+            self.feed.close()
+
+
+class ChatBot:
+    """Scoring pipeline shared by the single- and multi-channel bots
+
+    Raw frames from the IRC connections go through one ingest queue and
+    one micro-batched sentiment engine; scored messages are routed to
+    the ``ChannelState`` of their channel in ``states``. Subclasses add
+    the channels, run their connections in ``run_connections`` and
+    provide ``render_status`` and ``get_hype_metrics``.
+    """
+
+    def __init__(self, history_size=1000, windows=DEFAULT_WINDOWS, cache_size=10000, scorer='vader',
+                 batch_size=64, batch_delay=0.05, workers=0, queue_size=10000, overflow='block',
+                 status_interval=1.0, echo_every=1, live_feed=True, archive=False, storage_dir=None,
+                 dedup_window=10.0, metrics_port=None, profile=False, half_lives=None, exports=None):
+        self.nickname = "justinfan12345"  # Anonymous viewer
+        self.history_size = history_size
+        self.windows = windows
+        self.half_lives = half_lives  # Of each channel's time-decayed hype index
+        self.dedup_window = dedup_window
+        self.live_feed = live_feed
+        self.running = False
+        self.workers = workers  # Scoring processes (0 scores on the event loop)
+
+        # Sentiment analyzer (cached, scored in micro-batches)
+        self.sentiment = SentimentEngine(cache_size=cache_size, scorer=scorer)
+        self.batcher = MicroBatcher(
+            self.sentiment, self.handle_scored_message,
+            batch_size=batch_size, max_delay=batch_delay
+        )
+
+        # Raw lines waiting to be parsed; the websocket readers only enqueue
+        self.ingest = IngestQueue(maxsize=queue_size, overflow=overflow)
+
+        # Persistent chat history (Parquet segments written in the background);
+        # pyarrow and pandas are only imported when the archive is enabled
+        self.archive = None
+        if archive:
+            from segment_store import SegmentStore
+            self.archive = SegmentStore(storage_dir)
+
+        # Export sinks (NDJSON, Parquet, SQLite), each with its own writer thread
+        self.exports = list(exports or [])
+
+        # Console output: status lines every interval, sampled message echo
+        self.reporter = StatusReporter(self.render_status, interval=status_interval, echo_every=echo_every)
+
+        self.states = {}  # channel -> ChannelState
+
+        # Stage latencies and a Prometheus endpoint (None leaves the hot path untouched);
+        # subclasses call instrument() once they are set up
+        self.metrics_port = metrics_port
+        self.profile = profile  # Start the sampling profiler with the bot
+        self.instrumentation = Instrumentation() if metrics_port is not None else None
+
+    def new_state(self, channel, connection=None, feed=None):
+        """Per-channel state wired to the shared outputs"""
+        return ChannelState(
+            channel, self.history_size, self.windows, feed, self.archive, self.dedup_window, connection,
+            self.handle_spike, self.handle_collapsed, self.half_lives, self.exports
+        )
+
+    def instrument(self):
+        """Time the hot-path stages and expose the shared gauges"""
+        instrumentation = self.instrumentation
+        timed = instrumentation.timed
+        self.handle_message = timed('handle_message', self.handle_message)
+        self.sentiment.score_texts = timed('score_batch', self.sentiment.score_texts)
+        self.batcher.on_result = timed('store_message', self.batcher.on_result)
+        self.get_hype_metrics = timed('get_hype_metrics', self.get_hype_metrics)
+        self.reporter.render = timed('render_status', self.reporter.render)
+
+        states = self.states
+        instrumentation.gauge('queue_depth', lambda: len(self.ingest), 'Raw frames waiting to be parsed')
+        instrumentation.gauge('queue_dropped_total', lambda: self.ingest.dropped, 'Frames dropped by the ingest queue', 'counter')
+        instrumentation.gauge('batches_in_flight', lambda: len(self.batcher.in_flight), 'Sentiment batches being scored')
+        instrumentation.gauge('cache_hit_rate', lambda: self.sentiment.stats()['hit_rate'], 'Sentiment cache hit rate')
+        instrumentation.gauge(
+            'messages_stored_total', lambda: sum(state.store.total for state in states.values()),
+            'Chat messages stored', 'counter'
+        )
+        instrumentation.gauge(
+            'store_bytes', lambda: sum(state.store.memory_usage() for state in states.values()),
+            'Bytes held by the message stores'
+        )
+        instrumentation.gauge('console_dropped_total', lambda: self.reporter.writer.dropped, 'Console lines dropped', 'counter')
+        if self.dedup_window:
+            instrumentation.gauge(
+                'duplicates_total', lambda: sum(state.dedup.duplicates for state in states.values()),
+                'Messages collapsed as duplicates', 'counter'
+            )
+        instrumentation.gauge(
+            'spikes_total', lambda: sum(state.spikes.total for state in states.values()),
+            'Hype spikes detected', 'counter'
+        )
+        if self.exports:
+            instrumentation.gauge(
+                'export_dropped_total', lambda: sum(sink.dropped for sink in self.exports),
+                'Messages dropped by the export sinks', 'counter'
+            )
+
+    async def handle_message(self, raw_message, received_at=None):
+        """Parse a frame (possibly several lines) and queue its chat lines for scoring"""
+        if received_at is None:
+            received_at = time.time()
+
+        for message in iter_messages(raw_message):
+            # PINGs were already answered by the connection
+            if message.command == "PRIVMSG" and message.trailing is not None:
+                channel = message.channel
+                state = self.states.get(channel)
+                if state is not None:
+                    content = message.trailing.strip()
+                    # Near-duplicates are scored as their cluster's first line (a
+                    # cache hit) but still recorded like any other message
+                    text, duplicate = content, False
+                    if state.dedup is not None:
+                        cluster, duplicate = state.dedup.check(content, received_at)
+                        if duplicate:
+                            text = cluster.text
+                    self.batcher.submit(text, (received_at, channel, message.nick, content, duplicate))
+
+        # Backpressure when the scoring workers fall behind
+        await self.batcher.wait_ready()
+
+    def handle_scored_message(self, item, sentiment):
+        """Route a scored message to its channel and echo it (sampled)"""
+        timestamp, channel, username, message_content, duplicate = item
+        state = self.states.get(channel)
+        if state is None:
+            return  # Channel removed meanwhile
+        state.store_message(timestamp, username, message_content, sentiment)
+
+        # Repeats are echoed once, collapsed
+        if not duplicate:
+            self.reporter.echo(lambda: f"[{channel}] {username}: {message_content} {SENTIMENT_EMOJI[sentiment['label']]} ({sentiment['compound']:.2f})")
+
+    def handle_collapsed(self, channel, cluster):
+        """Echo a copypasta or emote wall once it stops repeating"""
+        self.reporter.echo(lambda: f"[{channel}] 🔁 x{cluster.repeats} in {cluster.last_seen - cluster.first_seen:.0f}s: {cluster.text[:80]}")
+
+    def handle_spike(self, event):
+        """Announce a detected spike (even when the chat echo is sampled)"""
+        if self.reporter.interval:
+            self.reporter.write(f"[{event.channel}] 🚀 {event.kind.capitalize()} spike ({event.direction}): {event.describe()}")
+
+    def snapshot(self, state):
+        """A channel's metrics snapshot plus the shared pipeline's stats"""
+        snapshot = state.get_snapshot()
+        snapshot['queue'] = self.ingest.stats()
+        snapshot['cache'] = self.sentiment.stats()
+        if self.exports:
+            snapshot['exports'] = {sink.name: sink.stats() for sink in self.exports}
+        return snapshot
+
+    async def publish_live(self, interval=1.0):
+        """Publish per-channel metric snapshots to the live feeds until cancelled"""
+        while True:
+            for state in list(self.states.values()):
+                if state.feed is not None:
+                    try:
+                        state.feed.publish_snapshot(self.snapshot(state), state.rollups)
+                    except Exception as e:
+                        # E.g. a snapshot over the feed's size limit; keep publishing
+                        print(f"Error publishing live snapshot for {state.channel}: {e}")
+            await asyncio.sleep(interval)
+
+    async def run_connections(self):
+        """Read from Twitch until stopped; implemented by the bots"""
+        raise NotImplementedError
+
+    async def start(self):
+        """Run the connections and the shared processing pipeline"""
+        self.running = True
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        self.batcher.executor = executor
+        consumer = asyncio.create_task(consume(self.ingest, self.handle_message))
+        # A status interval of 0 runs headless (no status lines)
+        reporter = asyncio.create_task(self.reporter.run()) if self.reporter.interval else None
+        publisher = asyncio.create_task(self.publish_live()) if self.live_feed else None
+        monitors = []
+        if self.instrumentation is not None:
+            monitors.append(asyncio.create_task(self.instrumentation.monitor_loop()))
+            monitors.append(asyncio.create_task(self.instrumentation.serve(port=self.metrics_port)))
+            if self.profile:
+                self.instrumentation.profiler.start()
+        if self.archive is not None:
+            self.archive.start()
+        for sink in self.exports:
+            sink.start()
+        try:
+            await self.run_connections()
+        finally:
+            consumer.cancel()
+            for task in monitors:
+                task.cancel()
+            await self.batcher.drain()
+            if reporter is not None:
+                reporter.cancel()
+            self.reporter.writer.close()
+            if publisher is not None:
+                publisher.cancel()
+            for state in self.states.values():
+                state.close()
+            if self.archive is not None:
+                self.archive.close()
+            for sink in self.exports:
+                sink.close()
+            if executor is not None:
+                executor.shutdown()
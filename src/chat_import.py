@@ -0,0 +1,181 @@
+import gzip
+import io
+import json
+import os
+import time
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import typed_frame
+from message_store import LABELS
+from rollups import Rollups
+from hype_metrics import ChatterMetrics, DecayedHype
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class StreamingImport:
+    """Incremental importer for large chat logs
+
+    Reads newline-delimited JSON (one chat record per line, optionally
+    gzip-compressed) in chunks of ``chunk_rows`` records. Each chunk is
+    turned into typed columns, folded into running totals, and then
+    dropped; only the newest ``tail_rows`` records are kept. Memory
+    therefore stays bounded by the chunk size no matter how big the log
+    is, and the data imported so far can be analyzed while loading.
+    Timelines are served from ``rollups``, chatter statistics from
+    ``chatters`` and the decayed hype index from ``hype``, all updated
+    per chunk.
+
+    Plain JSON arrays are accepted too, but have to be decoded in one go.
+    """
+
+    def __init__(self, source, name=None, chunk_rows=50000, tail_rows=1000):
+        if isinstance(source, (str, os.PathLike)):
+            self.name = name or os.path.basename(source)
+            self._raw = open(source, 'rb')
+            self._owns_raw = True
+            self.total_bytes = os.path.getsize(source)
+        else:
+            self.name = name or getattr(source, 'name', 'upload')
+            self._raw = source
+            self._owns_raw = False
+            self._raw.seek(0, io.SEEK_END)
+            self.total_bytes = self._raw.tell()
+            self._raw.seek(0)
+
+        self.chunk_rows = chunk_rows
+        self.tail_rows = tail_rows
+
+        head = self._raw.read(64)
+        self._raw.seek(0)
+        if head[:2] == GZIP_MAGIC:
+            self._stream = gzip.GzipFile(fileobj=self._raw)
+            head = self._stream.peek(64)[:64]
+        else:
+            self._stream = self._raw
+        self._lines = self._read_lines(head.lstrip()[:1] == b'[')
+
+        # Running totals over everything imported so far
+        self.rows = 0
+        self.bad_lines = 0
+        self.score_sum = 0.0
+        self.label_counts = np.zeros(len(LABELS), dtype='int64')
+        self.hour_counts = np.zeros(24, dtype='int64')
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.tail = pd.DataFrame()
+        self.rollups = Rollups()
+        self.chatters = ChatterMetrics()
+        self.hype = DecayedHype()
+        self.done = False
+        self.error = None
+
+    def _read_lines(self, is_array):
+        """Yield one raw JSON record at a time"""
+        if is_array:
+            # Not streamable: decode the whole array, then hand it out in chunks
+            for record in json.load(self._stream):
+                yield record
+            return
+        for line in self._stream:
+            line = line.strip()
+            if line:
+                yield line
+
+    def progress(self):
+        """Fraction of the input consumed so far (compressed bytes for gzip)"""
+        if self.done or not self.total_bytes:
+            return 1.0
+        try:
+            return min(1.0, self._raw.tell() / self.total_bytes)
+        except (ValueError, OSError):
+            return 0.0
+
+    def read_chunk(self):
+        """Import the next chunk; returns its typed DataFrame or None when done"""
+        if self.done:
+            return None
+        records = []
+        try:
+            for line in islice(self._lines, self.chunk_rows):
+                if isinstance(line, dict):
+                    records.append(line)
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    self.bad_lines += 1
+        except (OSError, EOFError, ValueError) as e:
+            self.error = str(e)
+            records = records or []
+            self.close()
+
+        if not records:
+            self.close()
+            return None
+
+        chunk = typed_frame(pd.DataFrame.from_records(records))
+        self._accumulate(chunk)
+        return chunk
+
+    def read_for(self, seconds):
+        """Import chunks for up to ``seconds`` seconds; returns rows imported"""
+        deadline = time.monotonic() + seconds
+        imported = 0
+        while not self.done and time.monotonic() < deadline:
+            chunk = self.read_chunk()
+            if chunk is not None:
+                imported += len(chunk)
+        return imported
+
+    def __iter__(self):
+        while True:
+            chunk = self.read_chunk()
+            if chunk is None:
+                return
+            yield chunk
+
+    def _accumulate(self, chunk):
+        self.rows += len(chunk)
+        if 'sentiment_score' in chunk:
+            self.score_sum += float(chunk['sentiment_score'].to_numpy().sum(dtype='float64'))
+        if 'sentiment_label' in chunk:
+            codes = chunk['sentiment_label'].cat.codes.to_numpy()
+            self.label_counts += np.bincount(codes[codes >= 0], minlength=len(LABELS))
+        if 'timestamp' in chunk:
+            timestamps = chunk['timestamp']
+            self.hour_counts += np.bincount(timestamps.dt.hour.dropna().astype('int64'), minlength=24)
+            first, last = timestamps.min(), timestamps.max()
+            self.first_timestamp = first if self.first_timestamp is None else min(first, self.first_timestamp)
+            self.last_timestamp = last if self.last_timestamp is None else max(last, self.last_timestamp)
+            self.rollups.add_frame(chunk)
+            self.chatters.add_frame(chunk)
+            self.hype.add_frame(chunk)
+
+        if self.tail.empty:
+            self.tail = chunk.tail(self.tail_rows).reset_index(drop=True)
+        else:
+            self.tail = pd.concat([self.tail, chunk.tail(self.tail_rows)], ignore_index=True).tail(self.tail_rows).copy()
+        if 'sentiment_label' in self.tail:
+            self.tail['sentiment_label'] = pd.Categorical(self.tail['sentiment_label'], categories=LABELS)
+
+    def summary(self):
+        """Totals over everything imported so far"""
+        return {
+            'rows': self.rows,
+            'bad_lines': self.bad_lines,
+            'mean_sentiment': self.score_sum / self.rows if self.rows else 0.0,
+            'sentiment_breakdown': {LABELS[code]: int(n) for code, n in enumerate(self.label_counts) if n},
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp
+        }
+
+    def close(self):
+        self.done = True
+        if self._stream is not self._raw:
+            self._stream.close()
+        if self._owns_raw:
+            self._raw.close()
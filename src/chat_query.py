@@ -0,0 +1,242 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from message_store import LABELS, LABEL_CODES, LOCAL_TZ
+from segment_store import COLUMNS, SCHEMA, SegmentStore, to_dataframe
+
+_NO_ROWS = np.zeros(0, dtype='int64')
+
+
+class SegmentIndex:
+    """Time ranges of a segment's row groups and its username postings
+
+    The row-group ranges come from the Parquet footer statistics. The
+    inverted index (username -> sorted row ids) is only built the first
+    time a query filters by user, from the dictionary-encoded username
+    column alone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        metadata = pq.ParquetFile(path).metadata
+        time_column = metadata.schema.to_arrow_schema().get_field_index('timestamp')
+        self.rows = metadata.num_rows
+        self.group_offsets = np.zeros(metadata.num_row_groups + 1, dtype='int64')  # First row of each group
+        self.group_ranges = []  # (first, last) timestamp of each row group
+        for group in range(metadata.num_row_groups):
+            row_group = metadata.row_group(group)
+            self.group_offsets[group + 1] = self.group_offsets[group] + row_group.num_rows
+            stats = row_group.column(time_column).statistics
+            if stats is not None and stats.has_min_max:
+                self.group_ranges.append((stats.min, stats.max))
+            else:
+                self.group_ranges.append((float('-inf'), float('inf')))
+        self._postings = None
+        self._lock = threading.Lock()
+
+    def groups(self, start=None, end=None):
+        """Row groups holding any timestamp in [start, end)"""
+        return [
+            group for group, (first, last) in enumerate(self.group_ranges)
+            if (start is None or last >= start) and (end is None or first < end)
+        ]
+
+    def postings(self):
+        """username -> sorted row ids in the segment"""
+        with self._lock:
+            if self._postings is None:
+                column = pq.read_table(self.path, columns=['username']).column('username')
+                parts = {}
+                offset = 0
+                for chunk in column.chunks:
+                    if not pa.types.is_dictionary(chunk.type):
+                        chunk = chunk.dictionary_encode()
+                    codes = chunk.indices.to_numpy(zero_copy_only=False)
+                    order = np.argsort(codes, kind='stable')
+                    sorted_codes = codes[order]
+                    bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+                    names = chunk.dictionary.to_pylist()
+                    for code, rows in zip(sorted_codes[np.r_[0, bounds]] if len(codes) else (), np.split(order + offset, bounds)):
+                        parts.setdefault(names[code], []).append(rows.astype('int64'))
+                    offset += len(chunk)
+                self._postings = {name: np.concatenate(rows) for name, rows in parts.items()}
+            return self._postings
+
+    def rows_for(self, users):
+        """Sorted row ids of messages from any of ``users``"""
+        postings = self.postings()
+        found = [postings[user] for user in users if user in postings]
+        if not found:
+            return _NO_ROWS
+        return np.sort(np.concatenate(found)) if len(found) > 1 else found[0]
+
+
+class ChatQuery:
+    """Indexed queries over the chat history of a SegmentStore
+
+    A query narrows the data down before reading it, in this order:
+
+    1. hour partitions and segments, by the time range in their names
+    2. row groups, by their min/max timestamps (``SegmentIndex``)
+    3. with ``users``: rows, through each segment's username -> row id
+       index, so only row groups containing those users are read
+    4. only the requested columns are read from what is left
+
+    Then the time range and ``labels`` are applied to the rows actually read.
+    Results stream back as Arrow record batches (``batches``) or
+    DataFrame chunks (``chunks``), so a long range never has to fit in
+    memory at once. Segment indexes are cached (up to ``max_indexes``)
+    and rebuilt when a file changes. Compaction never changes a file in
+    place, so the cache cannot serve stale rows.
+    """
+
+    def __init__(self, store=None, max_indexes=4096):
+        self.store = store if store is not None else SegmentStore()
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()  # path -> SegmentIndex
+        self._lock = threading.Lock()
+
+    def index(self, path):
+        """Cached SegmentIndex of a segment file"""
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is not None:
+                self._indexes.move_to_end(path)
+        if index is None or index.mtime != os.path.getmtime(path):
+            index = SegmentIndex(path)
+            with self._lock:
+                self._indexes[path] = index
+                while len(self._indexes) > self.max_indexes:
+                    self._indexes.popitem(last=False)
+        return index
+
+    def segments(self, channel, start=None, end=None):
+        """Paths of the segments overlapping [start, end), oldest first"""
+        return [
+            path
+            for partition in self.store.partitions(channel, start, end)
+            for path, *_ in self.store.segments(channel, partition, start, end)
+        ]
+
+    def batches(self, channel, start=None, end=None, users=None, labels=None, columns=None, batch_rows=65536):
+        """Matching messages as pyarrow RecordBatches of up to ``batch_rows`` rows
+
+        ``start``/``end`` are Unix seconds ([start, end)), ``users`` and
+        ``labels`` collections of usernames and sentiment labels. Batches
+        come in segment order, i.e. by time apart from late messages.
+        """
+        columns = list(columns or COLUMNS)
+        read_columns = list(columns)
+        if 'timestamp' not in read_columns:
+            read_columns.append('timestamp')
+        if labels is not None and 'sentiment_label' not in read_columns:
+            read_columns.append('sentiment_label')
+        codes = None
+        if labels is not None:
+            codes = pa.array(sorted({LABEL_CODES[label] for label in labels}), pa.int8())
+        users = None if users is None else list(users)
+
+        for path in self.segments(channel, start, end):
+            try:
+                index = self.index(path)
+                groups = index.groups(start, end)
+                if not groups:
+                    continue
+                rows = None
+                if users is not None:
+                    rows = index.rows_for(users)
+                    row_groups = np.searchsorted(index.group_offsets, rows, side='right') - 1
+                    groups = [group for group in groups if np.any(row_groups == group)]
+                if not groups:
+                    continue
+                parquet = pq.ParquetFile(path)
+                for group in groups:
+                    table = parquet.read_row_group(group, columns=read_columns)
+                    if rows is not None:
+                        local = rows[row_groups == group] - index.group_offsets[group]
+                        table = table.take(pa.array(local))
+                    table = self._filter(table, start, end, codes, index.group_ranges[group])
+                    if table.num_rows:
+                        yield from table.select(columns).to_batches(max_chunksize=batch_rows)
+            except FileNotFoundError:
+                continue  # Removed by a concurrent compaction
+
+    @staticmethod
+    def _filter(table, start, end, codes, time_range):
+        mask = None
+        first, last = time_range
+        # Row groups entirely inside the range need no time filter
+        if start is not None and first < start:
+            mask = pc.greater_equal(table.column('timestamp'), start)
+        if end is not None and last >= end:
+            below = pc.less(table.column('timestamp'), end)
+            mask = below if mask is None else pc.and_(mask, below)
+        if codes is not None:
+            labelled = pc.is_in(table.column('sentiment_label'), value_set=codes)
+            mask = labelled if mask is None else pc.and_(mask, labelled)
+        return table if mask is None else table.filter(mask)
+
+    def table(self, channel, start=None, end=None, users=None, labels=None, columns=None):
+        """All matching messages as one pyarrow Table"""
+        columns = list(columns or COLUMNS)
+        schema = pa.schema([SCHEMA.field(name) for name in columns])
+        batches = list(self.batches(channel, start, end, users, labels, columns))
+        if not batches:
+            return schema.empty_table()
+        return pa.Table.from_batches(batches).unify_dictionaries()
+
+    def chunks(self, channel, start=None, end=None, users=None, labels=None, columns=None, chunk_rows=65536):
+        """Matching messages as DataFrames in the dashboard layout, ``chunk_rows`` at a time"""
+        columns = list(columns or COLUMNS)
+        for batch in self.batches(channel, start, end, users, labels, columns, chunk_rows):
+            yield to_dataframe(pa.Table.from_batches([batch]), channel, columns)
+
+    def frame(self, channel, start=None, end=None, users=None, labels=None, columns=None):
+        """All matching messages as one DataFrame in the dashboard layout"""
+        columns = list(columns or COLUMNS)
+        return to_dataframe(self.table(channel, start, end, users, labels, columns), channel, columns)
+
+    def timeline(self, channel, start=None, end=None, bucket=60, users=None, labels=None):
+        """Message count, mean sentiment and label counts per ``bucket`` seconds
+
+        Streams over the timestamp, score and label columns only, so it
+        covers a whole stream without loading its messages.
+        """
+        totals = {}  # bucket -> [messages, score sum, label counts...]
+        columns = ['timestamp', 'sentiment_score', 'sentiment_label']
+        for batch in self.batches(channel, start, end, users, labels, columns):
+            keys = np.floor(batch.column(0).to_numpy() / bucket).astype('int64')
+            scores = batch.column(1).to_numpy().astype('float64')
+            codes = batch.column(2).to_numpy().astype('int64')
+            unique, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(unique))
+            sums = np.bincount(inverse, weights=scores, minlength=len(unique))
+            label_counts = np.bincount(inverse * len(LABELS) + codes, minlength=len(unique) * len(LABELS))
+            label_counts = label_counts.reshape(len(unique), len(LABELS))
+            for i, key in enumerate(unique.tolist()):
+                row = totals.get(key)
+                if row is None:
+                    row = totals[key] = np.zeros(2 + len(LABELS))
+                row[0] += counts[i]
+                row[1] += sums[i]
+                row[2:] += label_counts[i]
+
+        keys = sorted(totals)
+        values = np.array([totals[key] for key in keys]).reshape(len(keys), 2 + len(LABELS))
+        frame = pd.DataFrame({
+            'timestamp': pd.to_datetime(np.array(keys, dtype='float64') * bucket, unit='s', utc=True)
+                           .tz_convert(LOCAL_TZ).tz_localize(None),
+            'messages': values[:, 0].astype('int64'),
+            'sentiment': values[:, 1] / np.maximum(values[:, 0], 1)
+        })
+        for i, label in enumerate(LABELS):
+            frame[label] = values[:, 2 + i].astype('int64')
+        return frame
@@ -0,0 +1,204 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import websockets
+
+from irc_parser import TWITCH_IRC_URI
+
+
+class Backoff:
+    """Exponential reconnect delays with full jitter
+
+    The n-th consecutive failure waits a random time between 0 and
+    ``min(cap, base * factor ** n)`` seconds, so many clients dropped at
+    once do not reconnect in lockstep.
+    """
+
+    def __init__(self, base=1.0, cap=60.0, factor=2.0):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.failures = 0
+
+    def next_delay(self):
+        delay = random.uniform(0, min(self.cap, self.base * self.factor ** self.failures))
+        self.failures += 1
+        return delay
+
+    def reset(self):
+        self.failures = 0
+
+
+class GapTracker:
+    """Periods during which the bot was not receiving chat
+
+    A gap runs from the last frame received before a disconnect to the
+    moment the next connection is joined again. Metrics use the gaps to
+    tell "chat was quiet" apart from "we were not listening".
+    """
+
+    def __init__(self, max_gaps=100):
+        self.gaps = deque(maxlen=max_gaps)  # (start, end) in Unix seconds
+        self.open_since = None  # Start of the current gap, if disconnected
+        self.total_seconds = 0.0
+
+    def open(self, since):
+        if self.open_since is None:
+            self.open_since = since
+
+    def close(self, until):
+        """End the current gap; returns its (start, end) or None"""
+        if self.open_since is None:
+            return None
+        gap = (self.open_since, until)
+        self.open_since = None
+        self.gaps.append(gap)
+        self.total_seconds += until - gap[0]
+        return gap
+
+    def overlap(self, start, end):
+        """Seconds of ``[start, end]`` that fall inside gaps"""
+        total = 0.0
+        spans = list(self.gaps)
+        if self.open_since is not None:
+            spans.append((self.open_since, end))
+        for gap_start, gap_end in spans:
+            total += max(0.0, min(end, gap_end) - max(start, gap_start))
+        return total
+
+    def recent(self, since=None):
+        """Gaps ending after ``since`` (all by default), the open one included"""
+        spans = [gap for gap in self.gaps if since is None or gap[1] > since]
+        if self.open_since is not None:
+            spans.append((self.open_since, time.time()))
+        return spans
+
+    def stats(self):
+        return {
+            'gaps': len(self.gaps),
+            'gap_seconds': round(self.total_seconds, 1),
+            'connected': self.open_since is None,
+            'recent': [[round(start, 3), round(end, 3)] for start, end in self.recent()[-10:]]
+        }
+
+
+class TwitchConnection:
+    """One managed websocket to Twitch IRC
+
+    Logs in anonymously, waits for the server's welcome (001) and then
+    calls ``on_ready(connection)`` to JOIN. Every frame is passed to
+    ``on_frame(raw)``; server PINGs are answered straight from the
+    reader, before the frame is queued. If nothing arrives for
+    ``ping_interval`` seconds the connection sends its own PING and
+    reconnects when no reply comes within ``pong_timeout``. Reconnects
+    wait with jittered exponential backoff, reset once a connection has
+    stayed up for ``stable_after`` seconds. Disconnected periods are
+    recorded in ``gaps``.
+    """
+
+    def __init__(self, on_frame, on_ready, nickname="justinfan12345", uri=TWITCH_IRC_URI,
+                 name='conn', ping_interval=60.0, pong_timeout=10.0, auth_timeout=10.0,
+                 stable_after=60.0, backoff=None, gaps=None):
+        self.on_frame = on_frame
+        self.on_ready = on_ready
+        self.nickname = nickname
+        self.uri = uri
+        self.name = name
+        self.ping_interval = ping_interval
+        self.pong_timeout = pong_timeout
+        self.auth_timeout = auth_timeout
+        self.stable_after = stable_after
+        self.backoff = backoff or Backoff()
+        self.gaps = gaps or GapTracker()
+        self.websocket = None
+        self.running = False
+        self.connects = 0
+        self.pings_answered = 0
+        self.last_frame_at = None
+
+    async def send(self, line):
+        if self.websocket is not None:
+            await self.websocket.send(line)
+
+    async def _answer_pings(self, raw):
+        """Reply to server PINGs in a frame; True if the frame held one"""
+        answered = False
+        for line in raw.split('\r\n'):
+            if line.startswith('PING'):
+                await self.websocket.send('PONG' + line[4:])
+                self.pings_answered += 1
+                answered = True
+        return answered
+
+    async def _recv(self, timeout):
+        raw = await asyncio.wait_for(self.websocket.recv(), timeout=timeout)
+        self.last_frame_at = time.time()
+        if 'PING' in raw:
+            await self._answer_pings(raw)
+        return raw
+
+    async def _login(self):
+        """Authenticate and wait for the welcome; frames seen meanwhile are kept"""
+        await self.websocket.send("PASS SCHMOOPIIE")  # Anonymous password
+        await self.websocket.send(f"NICK {self.nickname}")
+        deadline = time.monotonic() + self.auth_timeout
+        while True:
+            raw = await self._recv(max(0.0, deadline - time.monotonic()))
+            await self.on_frame(raw)
+            for line in raw.split('\r\n'):
+                parts = line.split(' ', 2)
+                if len(parts) > 1 and parts[1] == '001':
+                    return
+                if 'Login authentication failed' in line:
+                    raise ConnectionError(line)
+
+    async def _listen(self):
+        while self.running:
+            try:
+                raw = await self._recv(self.ping_interval)
+            except asyncio.TimeoutError:
+                # Quiet for a while: check the connection is still alive
+                await self.websocket.send("PING :tmi.twitch.tv")
+                raw = await self._recv(self.pong_timeout)
+            await self.on_frame(raw)
+
+    async def run(self):
+        """Stay connected until ``running`` is cleared or the task is cancelled"""
+        self.running = True
+        while self.running:
+            connected_at = None
+            try:
+                print(f"[{self.name}] Connecting to {self.uri}...")
+                async with websockets.connect(self.uri) as websocket:
+                    self.websocket = websocket
+                    await self._login()
+                    connected_at = time.monotonic()
+                    self.connects += 1
+                    await self.on_ready(self)
+                    gap = self.gaps.close(time.time())
+                    if gap is not None:
+                        print(f"[{self.name}] Reconnected after a {gap[1] - gap[0]:.1f}s gap")
+                    await self._listen()
+            except asyncio.TimeoutError:
+                print(f"[{self.name}] No reply from the server, reconnecting")
+            except websockets.exceptions.ConnectionClosed as e:
+                print(f"[{self.name}] Connection closed ({e}), reconnecting")
+            except Exception as e:
+                print(f"[{self.name}] Connection error: {e}")
+            finally:
+                self.websocket = None
+                self.gaps.open(self.last_frame_at or time.time())
+
+            if connected_at is not None and time.monotonic() - connected_at >= self.stable_after:
+                self.backoff.reset()
+            if self.running:
+                delay = self.backoff.next_delay()
+                print(f"[{self.name}] Retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        stats = self.gaps.stats()
+        stats.update({'connects': self.connects, 'pings_answered': self.pings_answered})
+        return stats
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from message_store import LABELS
+
+
+def typed_frame(df):
+    """Convert raw chat records to compact, typed columns
+
+    Timestamps become datetime64, scores float32, and the low-cardinality
+    string columns (labels, usernames, channel) become categoricals.
+    """
+    if df.empty:
+        return df
+    df = df.copy()
+    if 'timestamp' in df:
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    if 'sentiment_score' in df:
+        df['sentiment_score'] = df['sentiment_score'].astype('float32')
+    if 'sentiment_label' in df:
+        df['sentiment_label'] = pd.Categorical(df['sentiment_label'], categories=LABELS)
+    for column in ('username', 'channel'):
+        if column in df:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def parse_json_records(content):
+    """Parse a JSON array of chat records into a typed DataFrame"""
+    return typed_frame(pd.DataFrame(json.loads(content.decode('utf-8'))))
+
+
+class DatasetCache:
+    """Parsed datasets keyed by a hash of their raw content
+
+    Entries are evicted least-recently-used first once the total
+    in-memory size of the cached frames exceeds ``max_bytes``. Safe to
+    share between dashboard sessions.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (frame, size in bytes)
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def get_or_load(self, content, loader=parse_json_records):
+        """Return the frame for ``content``, parsing it with ``loader`` on a miss"""
+        key = self.key_for(content)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[0]
+
+        # Parse outside the lock so other sessions are not held up
+        frame = loader(content)
+        size = int(frame.memory_usage(deep=True).sum())
+
+        with self._lock:
+            if key not in self.entries:
+                self.entries[key] = (frame, size)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                    _, (_, evicted) = self.entries.popitem(last=False)
+                    self.total_bytes -= evicted
+            return self.entries[key][0]
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes}
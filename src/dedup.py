@@ -0,0 +1,196 @@
+import heapq
+import string
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from sentiment import normalize_text
+
+_PUNCTUATION = string.punctuation
+_MASK64 = (1 << 64) - 1
+
+# MinHash signatures of NUM_PERM values, indexed by LSH bands of
+# BAND_ROWS values: lines with a token Jaccard similarity of 0.75 share a
+# band with probability above 0.99, unrelated lines almost never do
+NUM_PERM = 32
+BAND_ROWS = 4
+BANDS = NUM_PERM // BAND_ROWS
+
+# Random odd multipliers and offsets: x -> a * x + b (mod 2**64) is a
+# permutation of the 64-bit hash space
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(0, 1 << 63, NUM_PERM, dtype='uint64') * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype='uint64')
+
+
+def dedup_tokens(text):
+    """Distinct lower-cased tokens of a chat line, in first-seen order"""
+    tokens = {}
+    for token in normalize_text(text).lower().split():
+        token = token.strip(_PUNCTUATION) or token
+        tokens[token] = None
+    return list(tokens)
+
+
+def minhash(tokens):
+    """MinHash signature of a token set"""
+    hashes = np.fromiter((hash(token) & _MASK64 for token in tokens), dtype='uint64', count=len(tokens))
+    return (np.outer(_PERM_A, hashes) + _PERM_B[:, None]).min(axis=1)
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the token sets behind two signatures"""
+    return float(np.count_nonzero(signature == other)) / NUM_PERM
+
+
+class SpamCluster:
+    """A chat line and the near-duplicates collapsed into it"""
+
+    __slots__ = ('key', 'signature', 'text', 'first_seen', 'last_seen', 'repeats')
+
+    def __init__(self, key, signature, text, timestamp):
+        self.key = key
+        self.signature = signature
+        self.text = text
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.repeats = 1  # Messages collapsed into this cluster, itself included
+
+
+class Deduplicator:
+    """Collapses copypastas and emote walls into one scored event
+
+    Each chat line is reduced to its set of distinct tokens, so "KEKW KEKW
+    KEKW" and "KEKW" are the same line. Longer lines (at least
+    ``min_minhash_tokens`` distinct tokens) also get a MinHash signature,
+    so edited copypastas with a token similarity of at least
+    ``min_similarity`` still match. A line matching a cluster seen in the
+    last ``window`` seconds is a duplicate: the cluster's repeat count
+    grows and the line can take the sentiment of the cluster's first line
+    (``cluster.text``) instead of being scored again. Duplicates are still
+    chat messages: the bots record every one of them, so rates, windows
+    and spikes count each repeat. When a cluster goes quiet it is expired
+    and, if it collected repeats, passed to ``on_collapsed``.
+
+    ``spam_intensity()`` is the share of duplicates among the messages of
+    the last ``intensity_window`` seconds.
+    """
+
+    def __init__(self, window=10.0, min_similarity=0.6, min_minhash_tokens=4,
+                 intensity_window=60, on_collapsed=None):
+        self.window = window
+        self.min_similarity = min_similarity
+        self.min_minhash_tokens = min_minhash_tokens
+        self.intensity_window = intensity_window
+        self.on_collapsed = on_collapsed
+
+        self.clusters = OrderedDict()  # key -> cluster, least recently seen first
+        self._bands = [{} for _ in range(BANDS)]  # band value -> {key: cluster}
+
+        self.messages = 0
+        self.duplicates = 0
+        self.collapsed = 0  # Expired clusters that had repeats
+        self._seconds = deque()  # [second, messages, duplicates]
+        self._window_messages = 0
+        self._window_duplicates = 0
+
+    @staticmethod
+    def _band_values(signature):
+        return [signature[band * BAND_ROWS:(band + 1) * BAND_ROWS].tobytes() for band in range(BANDS)]
+
+    def _nearest(self, signature):
+        checked = set()
+        for band, value in zip(self._bands, self._band_values(signature)):
+            for key, cluster in band.get(value, {}).items():
+                if key not in checked:
+                    checked.add(key)
+                    if similarity(cluster.signature, signature) >= self.min_similarity:
+                        return cluster
+        return None
+
+    def check(self, text, timestamp):
+        """Register a chat line; returns ``(cluster, is_duplicate)``"""
+        self.expire(timestamp)
+        tokens = dedup_tokens(text)
+        key = ' '.join(sorted(tokens))
+
+        cluster = self.clusters.get(key)
+        signature = None
+        if cluster is None and len(tokens) >= self.min_minhash_tokens:
+            signature = minhash(tokens)
+            cluster = self._nearest(signature)
+
+        duplicate = cluster is not None
+        if duplicate:
+            cluster.repeats += 1
+            cluster.last_seen = timestamp
+            self.clusters.move_to_end(cluster.key)
+            self.duplicates += 1
+        else:
+            cluster = SpamCluster(key, signature, text, timestamp)
+            self.clusters[key] = cluster
+            if signature is not None:
+                for band, value in zip(self._bands, self._band_values(signature)):
+                    band.setdefault(value, {})[key] = cluster
+        self.messages += 1
+        self._count(timestamp, duplicate)
+        return cluster, duplicate
+
+    def _count(self, timestamp, duplicate):
+        second = int(timestamp)
+        if self._seconds and self._seconds[-1][0] >= second:
+            bucket = self._seconds[-1]
+        else:
+            bucket = [second, 0, 0]
+            self._seconds.append(bucket)
+        bucket[1] += 1
+        self._window_messages += 1
+        if duplicate:
+            bucket[2] += 1
+            self._window_duplicates += 1
+
+    def expire(self, now):
+        """Drop clusters and intensity buckets that fell out of their windows"""
+        clusters = self.clusters
+        cutoff = now - self.window
+        while clusters:
+            key, cluster = next(iter(clusters.items()))
+            if cluster.last_seen > cutoff:
+                break
+            del clusters[key]
+            if cluster.signature is not None:
+                for band, value in zip(self._bands, self._band_values(cluster.signature)):
+                    members = band[value]
+                    del members[key]
+                    if not members:
+                        del band[value]
+            if cluster.repeats > 1:
+                self.collapsed += 1
+                if self.on_collapsed is not None:
+                    self.on_collapsed(cluster)
+
+        seconds = self._seconds
+        cutoff = now - self.intensity_window
+        while seconds and seconds[0][0] <= cutoff:
+            _, messages, duplicates = seconds.popleft()
+            self._window_messages -= messages
+            self._window_duplicates -= duplicates
+
+    def spam_intensity(self, now=None):
+        """Share of duplicate messages over the intensity window (0 to 1)"""
+        if now is not None:
+            self.expire(now)
+        return self._window_duplicates / self._window_messages if self._window_messages else 0.0
+
+    def stats(self, now=None, top=3):
+        """Counters, spam intensity and the most repeated active lines"""
+        if now is not None:
+            self.expire(now)
+        largest = heapq.nlargest(top, self.clusters.values(), key=lambda cluster: cluster.repeats)
+        return {
+            'messages': self.messages,
+            'duplicates': self.duplicates,
+            'active_clusters': len(self.clusters),
+            'spam_intensity': round(self.spam_intensity(), 3),
+            'top_repeats': [[cluster.text[:60], cluster.repeats] for cluster in largest if cluster.repeats > 1]
+        }
@@ -0,0 +1,349 @@
+import gzip
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Default location of exported chat (repo-level data/ directory)
+DEFAULT_EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'export')
+
+
+def export_record(channel, timestamp, username, message, score, label):
+    """One scored message in the dashboard's JSON import format"""
+    return {
+        'timestamp': datetime.fromtimestamp(timestamp).isoformat(sep=' ', timespec='milliseconds'),  # Local time
+        'username': username,
+        'message': message,
+        'sentiment_score': round(score, 4),
+        'sentiment_label': label,
+        'channel': channel
+    }
+
+
+class ExportSink:
+    """Output sink for scored messages, written by a background thread
+
+    ``append`` only adds the row to an in-memory batch, so disk latency
+    never reaches the event loop. Full batches, and every
+    ``flush_interval`` seconds the partial one, are queued for the writer
+    thread, which takes everything queued at once and writes it with a
+    single commit (group commit). At most ``max_pending`` rows wait for the
+    disk; beyond that new rows are dropped and counted rather than letting
+    a stalled disk grow memory or block the bot.
+
+    Subclasses implement ``_open``, ``_write(rows)`` and ``_close``, all
+    called on the writer thread only.
+    """
+
+    name = 'export'
+
+    def __init__(self, batch_rows=1000, flush_interval=1.0, max_pending=100000):
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._rows = []  # (channel, timestamp, username, message, score, label)
+        self._lock = threading.Lock()
+        self._batches = queue.Queue()
+        self._thread = None
+        self.pending = 0  # Rows appended but not yet written
+        self.written = 0
+        self.dropped = 0
+        self.commits = 0
+        self.errors = 0
+
+    def append(self, channel, timestamp, username, message, score, label):
+        """Buffer one scored message; never touches the disk"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self._rows.append((channel, timestamp, username, message, score, label))
+            self.pending += 1
+            if len(self._rows) >= self.batch_rows:
+                self._batches.put(self._rows)
+                self._rows = []
+
+    def flush(self):
+        """Hand the partial batch to the writer"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            self._batches.put(rows)
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-writer', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Write everything buffered and stop the writer thread"""
+        self.flush()
+        if self._thread is not None:
+            self._batches.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        try:
+            self._open()
+        except Exception as e:
+            print(f"Error opening {self.name} export: {e}")
+            self._open_failed()
+            return
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                batches = [self._batches.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batches = []
+            # Group commit: everything that queued up meanwhile goes in one write
+            while True:
+                try:
+                    batches.append(self._batches.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batches:
+                stopping = True
+                batches = [batch for batch in batches if batch is not None]
+            rows = [row for batch in batches for row in batch]
+            if rows:
+                self._commit(rows)
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = now
+        try:
+            self._close()
+        except Exception as e:
+            print(f"Error closing {self.name} export: {e}")
+
+    def _open_failed(self):
+        """Count everything as dropped while the writer cannot open its output"""
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            with self._lock:
+                self.pending -= len(batch)
+                self.dropped += len(batch)
+
+    def _commit(self, rows):
+        failed = False
+        try:
+            self._write(rows)
+            self.written += len(rows)
+            self.commits += 1
+        except Exception as e:
+            self.errors += 1
+            failed = True
+            print(f"Error writing {self.name} export: {e}")
+        # append() drops rows under the same lock, so no update is lost
+        with self._lock:
+            self.pending -= len(rows)
+            if failed:
+                self.dropped += len(rows)
+
+    def _open(self):
+        pass
+
+    def _write(self, rows):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def stats(self):
+        return {
+            'written': self.written, 'pending': self.pending, 'dropped': self.dropped,
+            'commits': self.commits, 'errors': self.errors
+        }
+
+
+class _RotatingFileSink(ExportSink):
+    """Writes files in ``directory`` and starts a new one every
+    ``rotate_seconds`` or after ``rotate_bytes``
+
+    A file is written under a ``.tmp`` name and renamed when it is rotated
+    or the sink is closed, so every visible file is complete.
+    """
+
+    extension = ''
+
+    def __init__(self, directory=None, rotate_seconds=3600.0, rotate_bytes=256 * 2**20, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory or DEFAULT_EXPORT_DIR
+        self.rotate_seconds = rotate_seconds
+        self.rotate_bytes = rotate_bytes
+        self.path = None  # Final name of the current file
+        self.opened_at = None
+        self.files = 0
+
+    def _new_path(self):
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        return os.path.join(self.directory, f'chat-{stamp}-{time.time_ns() % 10**9:09d}{self.extension}')
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _write(self, rows):
+        if self.path is not None and (time.monotonic() - self.opened_at >= self.rotate_seconds
+                                      or self._size() >= self.rotate_bytes):
+            self._finish()
+        if self.path is None:
+            self.path = self._new_path()
+            self.opened_at = time.monotonic()
+            self._start_file(self.path + '.tmp')
+        self._write_rows(rows)
+
+    def _finish(self):
+        self._end_file()
+        os.replace(self.path + '.tmp', self.path)
+        self.path = None
+        self.files += 1
+
+    def _close(self):
+        if self.path is not None:
+            self._finish()
+
+    def _size(self):
+        return os.path.getsize(self.path + '.tmp')
+
+    def stats(self):
+        stats = super().stats()
+        stats['files'] = self.files
+        return stats
+
+
+class NdjsonSink(_RotatingFileSink):
+    """Rotating newline-delimited JSON files, one record per message
+
+    Records use the dashboard's import format (``export_record``), so a
+    finished file can be uploaded or imported as is. With ``compress``
+    files are gzip-compressed (the importer reads those too).
+    """
+
+    name = 'ndjson'
+
+    def __init__(self, directory=None, compress=False, **kwargs):
+        super().__init__(directory, **kwargs)
+        self.compress = compress
+        self.extension = '.ndjson.gz' if compress else '.ndjson'
+        self._file = None
+
+    def _start_file(self, path):
+        self._file = gzip.open(path, 'wt', encoding='utf-8') if self.compress else open(path, 'w', encoding='utf-8')
+
+    def _write_rows(self, rows):
+        self._file.write(''.join(json.dumps(export_record(*row), ensure_ascii=False) + '\n' for row in rows))
+        self._file.flush()
+
+    def _end_file(self):
+        self._file.close()
+        self._file = None
+
+
+class ParquetSink(_RotatingFileSink):
+    """Rotating Parquet files, one row group per commit
+
+    Columns follow segment_store.SCHEMA plus the channel, with usernames
+    and channels dictionary-encoded. A Parquet file is only readable once
+    its footer is written, i.e. after rotation or close.
+    """
+
+    name = 'parquet'
+    extension = '.parquet'
+
+    def __init__(self, directory=None, compression='zstd', **kwargs):
+        super().__init__(directory, **kwargs)
+        import pyarrow as pa  # Only needed when this sink is enabled
+        from segment_store import SCHEMA
+        self.compression = compression
+        self.schema = SCHEMA.append(pa.field('channel', pa.dictionary(pa.int32(), pa.string())))
+        self._writer = None
+
+    def _start_file(self, path):
+        import pyarrow.parquet as pq
+        self._writer = pq.ParquetWriter(path, self.schema, compression=self.compression)
+
+    def _write_rows(self, rows):
+        import pyarrow as pa
+        from message_store import LABEL_CODES
+        channels, timestamps, usernames, messages, scores, labels = zip(*rows)
+        columns = {
+            'timestamp': timestamps, 'username': usernames, 'message': messages,
+            'sentiment_score': scores, 'sentiment_label': [LABEL_CODES[label] for label in labels],
+            'channel': channels
+        }
+        self._writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+
+    def _end_file(self):
+        self._writer.close()
+        self._writer = None
+
+
+class SqliteSink(ExportSink):
+    """SQLite database in WAL mode, one transaction per commit
+
+    Rows go into a ``messages`` table (indexed by channel and time) with
+    one ``executemany`` per commit. WAL mode lets the dashboard or any
+    other reader query the file while the bot writes, and
+    ``synchronous=NORMAL`` makes a commit cost no fsync.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path or os.path.join(DEFAULT_EXPORT_DIR, 'chat.sqlite3')
+        self._connection = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Created on the writer thread, the only one that uses it
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS messages ('
+            'channel TEXT NOT NULL, timestamp REAL NOT NULL, username TEXT, message TEXT, '
+            'sentiment_score REAL, sentiment_label TEXT)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS messages_channel_time ON messages (channel, timestamp)')
+        connection.commit()
+        self._connection = connection
+
+    def _write(self, rows):
+        with self._connection:  # One transaction
+            self._connection.executemany(
+                'INSERT INTO messages (channel, timestamp, username, message, sentiment_score, sentiment_label) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# Export sinks by name, as enabled with bot_cli --sinks
+EXPORT_SINKS = {
+    'ndjson': NdjsonSink,
+    'parquet': ParquetSink,
+    'sqlite': SqliteSink,
+}
+
+
+def make_sink(name, directory=None, **kwargs):
+    """Export sink ``name`` writing into ``directory``"""
+    if name not in EXPORT_SINKS:
+        raise ValueError(f"Unknown export sink: {name}")
+    if name == 'sqlite':
+        return SqliteSink(os.path.join(directory, 'chat.sqlite3') if directory else None, **kwargs)
+    return EXPORT_SINKS[name](directory, **kwargs)
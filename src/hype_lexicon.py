@@ -0,0 +1,172 @@
+import math
+import re
+import string
+
+from vaderSentiment.vaderSentiment import NEGATE, BOOSTER_DICT, SentimentIntensityAnalyzer
+
+# Twitch and BTTV/FFZ/7TV emotes, matched case-sensitively as whole tokens.
+# Valences use VADER's -4..+4 scale.
+EMOTE_LEXICON = {
+    'PogChamp': 3.2, 'Pog': 3.0, 'POGGERS': 3.0, 'PogU': 3.0, 'PogO': 1.5, 'POGGIES': 3.0,
+    'KEKW': 2.2, 'LUL': 2.0, 'LULW': 2.2, 'OMEGALUL': 2.5, 'ICANT': 2.0, 'pepeLaugh': 1.5,
+    'catJAM': 2.0, 'peepoClap': 2.2, 'Clap': 2.0, 'EZ': 1.5, 'GIGACHAD': 2.5, 'widepeepoHappy': 2.5,
+    'FeelsGoodMan': 2.2, 'FeelsStrongMan': 2.5, 'FeelsAmazingMan': 3.0, 'HeyGuys': 1.2, 'VoHiYo': 1.2,
+    'bleedPurple': 1.5, 'TwitchUnity': 1.5, 'PrideLove': 2.0, '<3': 2.5, 'Kreygasm': 2.8, 'SeemsGood': 1.8,
+    'Kappa': 0.5, 'KappaPride': 1.0, '4Head': 1.0, 'monkaS': -1.2, 'monkaW': -1.5, 'WutFace': -1.5,
+    'Sadge': -2.5, 'PepeHands': -2.2, 'FeelsBadMan': -2.2, 'BibleThump': -2.0, 'NotLikeThis': -2.2,
+    'ResidentSleeper': -2.5, 'FailFish': -2.0, 'DansGame': -2.2, 'SwiftRage': -2.0, 'BabyRage': -1.5,
+    'WeirdChamp': -2.0, 'Weirdge': -1.5, 'Madge': -2.0, 'modCheck': -0.5, 'Susge': -0.8,
+}
+
+# Chat slang, matched case-insensitively; overrides VADER where chat usage
+# differs ("fire", "insane" and "sick" are praise in chat)
+SLANG_LEXICON = {
+    'pog': 3.0, 'poggers': 3.0, 'hype': 2.8, 'w': 2.0, 'dub': 2.0, 'l': -2.0, 'gg': 1.8, 'ggs': 1.8,
+    'ggwp': 2.2, 'wp': 1.8, 'kekw': 2.2, 'lul': 2.0, 'omegalul': 2.5, 'omg': 1.2, 'goat': 2.8,
+    'based': 1.5, 'clutch': 2.5, 'cracked': 2.5, 'fire': 2.5, 'lit': 2.5, 'insane': 2.2, 'sick': 2.0,
+    'nuts': 2.0, 'godlike': 3.0, 'goated': 2.8, 'letsgo': 2.8, 'lfg': 2.8, 'ez': 1.5, 'clip': 1.0,
+    'cringe': -2.0, 'trash': -2.5, 'mid': -1.5, 'washed': -2.0, 'throw': -1.5, 'throwing': -1.5,
+    'rip': -1.5, 'f': -1.0, 'sadge': -2.5, 'yikes': -1.8, 'ff': -1.5, 'bruh': -1.0, 'copium': -1.0,
+    'boring': -2.0, 'snooze': -2.0, 'scripted': -1.5, 'ratio': -1.2,
+}
+
+NEGATIONS = frozenset(NEGATE) | {"don't", "dont", "isn't", "isnt", "wasn't", "wasnt", "can't", "cant", "no"}
+BOOSTERS = dict(BOOSTER_DICT)
+
+NEGATION_SCALAR = -0.74  # Same dampening VADER applies to negated words
+EXCLAMATION_BOOST = 0.292  # Per '!', up to four
+REPEAT_BOOST = 0.15  # Per extra repetition of a token, up to MAX_REPEAT_BOOST
+MAX_REPEAT_BOOST = 0.6
+NORMALIZATION_ALPHA = 15  # compound = s / sqrt(s^2 + alpha), as in VADER
+
+_PUNCTUATION = string.punctuation.replace("'", '')
+_ELONGATION = re.compile(r'(.)\1{2,}')
+
+
+def build_lexicon(base=None):
+    """Lower-cased word lexicon: VADER's lexicon overlaid with chat slang"""
+    if base is None:
+        base = SentimentIntensityAnalyzer().lexicon
+    lexicon = dict(base)
+    lexicon.update(SLANG_LEXICON)
+    return lexicon
+
+
+def normalize_score(total):
+    """Map a valence sum to [-1, 1]"""
+    return total / math.sqrt(total * total + NORMALIZATION_ALPHA)
+
+
+class HypeLexiconAnalyzer:
+    """Emote-aware dictionary scorer for Twitch chat
+
+    A drop-in alternative to VADER's ``polarity_scores``. Each message is
+    tokenized in a single pass over ``str.split()``: tokens are looked up
+    first in the case-sensitive emote table, then lower-cased (and with
+    punctuation and letter elongation removed) in the word lexicon.
+    Repeated tokens ("KEKW KEKW KEKW") count once, with a small capped
+    boost, so spam adds intensity without dominating the score.
+    Negations flip and boosters amplify the next scored token. Token
+    lookups are memoized, so a token costs one dict lookup once seen.
+    """
+
+    def __init__(self, lexicon=None, emotes=None, memo_size=100000):
+        self.lexicon = build_lexicon() if lexicon is None else lexicon
+        self.emotes = EMOTE_LEXICON if emotes is None else emotes
+        self.memo_size = memo_size
+        self._memo = {}  # token -> (valence, modifier)
+
+    def _valence(self, token):
+        valence = self.emotes.get(token)
+        if valence is not None:
+            return valence, False
+        word = token.strip(_PUNCTUATION).lower()
+        if not word:
+            return None, False
+        valence = self.lexicon.get(word)
+        if valence is None and len(word) > 3:
+            # "gooooo" -> "go", "loooove" -> "love"
+            squeezed = _ELONGATION.sub(r'\1', word)
+            if squeezed != word:
+                valence = self.lexicon.get(squeezed)
+                if valence is None:
+                    valence = self.lexicon.get(_ELONGATION.sub(r'\1\1', word))
+        if valence is None:
+            if word in NEGATIONS:
+                return None, 'negate'
+            booster = BOOSTERS.get(word)
+            if booster is not None:
+                return booster, 'boost'
+        return valence, False
+
+    def polarity_scores(self, text):
+        """VADER-compatible scores: compound, pos, neg and neu"""
+        seen = {}  # token -> index into valences
+        valences = []
+        repeats = []
+        neutral = 0
+        negate = 0  # Tokens left in which a negation applies
+        boost = 0.0
+
+        memo = self._memo
+        for token in text.split():
+            index = seen.get(token)
+            if index is not None:
+                repeats[index] += 1
+                continue
+            entry = memo.get(token)
+            if entry is None:
+                if len(memo) >= self.memo_size:
+                    memo.clear()
+                entry = memo[token] = self._valence(token)
+            valence, modifier = entry
+            if modifier == 'negate':
+                negate = 3
+                neutral += 1
+                continue
+            if modifier == 'boost':
+                boost = valence
+                neutral += 1
+                continue
+            if valence is None:
+                neutral += 1
+                if negate:
+                    negate -= 1
+                continue
+            if boost:
+                valence += boost if valence > 0 else -boost
+                boost = 0.0
+            if negate:
+                valence *= NEGATION_SCALAR
+                negate = 0
+            seen[token] = len(valences)
+            valences.append(valence)
+            repeats.append(1)
+
+        if not valences:
+            return {'neg': 0.0, 'neu': 1.0 if neutral else 0.0, 'pos': 0.0, 'compound': 0.0}
+
+        total = 0.0
+        positive = negative = 0.0
+        for valence, count in zip(valences, repeats):
+            if count > 1:
+                valence *= 1 + min(MAX_REPEAT_BOOST, REPEAT_BOOST * (count - 1))
+            total += valence
+            if valence > 0:
+                positive += valence + 1
+            elif valence < 0:
+                negative += 1 - valence
+            else:
+                neutral += 1
+
+        exclamations = min(4, text.count('!'))
+        if exclamations and total:
+            total += EXCLAMATION_BOOST * exclamations * (1 if total > 0 else -1)
+
+        magnitude = positive + negative + neutral
+        return {
+            'neg': round(negative / magnitude, 3),
+            'neu': round(neutral / magnitude, 3),
+            'pos': round(positive / magnitude, 3),
+            'compound': round(normalize_score(total), 4)
+        }
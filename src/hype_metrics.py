@@ -0,0 +1,463 @@
+import math
+from collections import Counter, deque
+
+import numpy as np
+
+from message_store import LABELS, LABEL_CODES, unix_seconds
+from sketches import CountMinSketch, HyperLogLog, SpaceSaving, hash_items
+
+# Scores are accumulated as integers (VADER compound scores have four
+# decimals) so that running sums never drift over long streams
+SCORE_SCALE = 10000
+
+
+class _RollingWindow:
+    """Running sum and per-label counts over a sliding window of messages"""
+
+    def __init__(self, name):
+        self.name = name
+        self.entries = deque()  # (timestamp, scaled score, label code)
+        self.score_sum = 0
+        self.label_counts = [0] * len(LABELS)
+
+    def _add(self, timestamp, scaled_score, code):
+        self.entries.append((timestamp, scaled_score, code))
+        self.score_sum += scaled_score
+        self.label_counts[code] += 1
+
+    def _evict_oldest(self):
+        _, scaled_score, code = self.entries.popleft()
+        self.score_sum -= scaled_score
+        self.label_counts[code] -= 1
+
+    def expire(self, now):
+        """Drop messages that fell out of the window"""
+
+    def __len__(self):
+        return len(self.entries)
+
+    def metrics(self, now=None):
+        """Current hype score, message count and sentiment breakdown"""
+        if now is not None:
+            self.expire(now)
+        count = len(self.entries)
+        hype_score = self.score_sum / SCORE_SCALE / count if count else 0
+        breakdown = {LABELS[code]: n for code, n in enumerate(self.label_counts) if n}
+        return {
+            'hype_score': round(hype_score, 3),
+            'message_count': count,
+            'sentiment_breakdown': dict(sorted(breakdown.items(), key=lambda item: item[1], reverse=True))
+        }
+
+
+class CountWindow(_RollingWindow):
+    """Window over the last ``size`` messages"""
+
+    def __init__(self, name, size):
+        super().__init__(name)
+        self.size = size
+
+    def push(self, timestamp, scaled_score, code):
+        if len(self.entries) == self.size:
+            self._evict_oldest()
+        self._add(timestamp, scaled_score, code)
+
+
+class TimeWindow(_RollingWindow):
+    """Window over the messages of the last ``seconds`` seconds"""
+
+    def __init__(self, name, seconds):
+        super().__init__(name)
+        self.seconds = seconds
+
+    def push(self, timestamp, scaled_score, code):
+        self._add(timestamp, scaled_score, code)
+        self.expire(timestamp)
+
+    def expire(self, now):
+        cutoff = now - self.seconds
+        entries = self.entries
+        while entries and entries[0][0] <= cutoff:
+            self._evict_oldest()
+
+
+# Windows tracked by default: the last 50 messages plus 10s, 60s and 5min
+DEFAULT_WINDOWS = (
+    ('last_50', 'count', 50),
+    ('10s', 'time', 10),
+    ('60s', 'time', 60),
+    ('5min', 'time', 300),
+)
+
+
+# Half-lives in seconds of the decayed hype accumulators: recent sentiment,
+# recent message rate, and the channel's usual level both are compared with
+DEFAULT_HALF_LIVES = {'sentiment': 30.0, 'rate': 30.0, 'baseline': 600.0}
+
+_POSITIVE = LABEL_CODES['positive']
+
+
+class DecayedHype:
+    """Exponentially time-decayed sentiment, message rate and hype index
+
+    Each accumulator is a sum whose terms lose half their weight every
+    half-life (``half_lives``, seconds), so a message costs O(1) and no
+    history is kept. Sentiment and the positive share are decayed means of
+    recent messages; the rate is the decayed message count over the
+    accumulator's lifetime, corrected while the stream is younger than
+    that. The long ``baseline`` half-life gives the channel's usual rate
+    and sentiment, and ``velocity`` is the rate as a multiple of usual.
+
+    The hype index blends both in [-1, 1]::
+
+        sentiment_weight * sentiment + (1 - sentiment_weight) * tanh(log2(velocity))
+
+    so chat at twice its usual rate adds as much as a sentiment of 0.76.
+    Sentiment is shrunk toward neutral by one pseudo-message: a channel
+    gone quiet drifts back to 0 rather than showing stale chat.
+    """
+
+    def __init__(self, half_lives=None, sentiment_weight=0.5):
+        half_lives = dict(DEFAULT_HALF_LIVES, **(half_lives or {}))
+        unknown = set(half_lives) - set(DEFAULT_HALF_LIVES)
+        if unknown:
+            raise ValueError(f"Unknown half-life: {', '.join(sorted(unknown))}")
+        self.half_lives = half_lives
+        self.sentiment_weight = sentiment_weight
+        # Decay constants (per second)
+        self.k_sentiment = math.log(2) / half_lives['sentiment']
+        self.k_rate = math.log(2) / half_lives['rate']
+        self.k_baseline = math.log(2) / half_lives['baseline']
+
+        self.first = None  # Oldest message seen
+        self.last = None  # Time the sums are decayed to (newest message)
+        self.count = 0
+        self.score_sum = 0.0  # Decayed with the sentiment half-life
+        self.weight = 0.0
+        self.positive = 0.0
+        self.rate_weight = 0.0  # Decayed with the rate half-life
+        self.baseline_score_sum = 0.0  # Decayed with the baseline half-life
+        self.baseline_weight = 0.0
+
+    def _decay_to(self, timestamp):
+        elapsed = timestamp - self.last
+        decay = math.exp(-self.k_sentiment * elapsed)
+        self.score_sum *= decay
+        self.weight *= decay
+        self.positive *= decay
+        self.rate_weight *= math.exp(-self.k_rate * elapsed)
+        decay = math.exp(-self.k_baseline * elapsed)
+        self.baseline_score_sum *= decay
+        self.baseline_weight *= decay
+        self.last = timestamp
+
+    def push(self, timestamp, score, code):
+        """Add one scored message (Unix seconds and label code)"""
+        if self.last is None:
+            self.first = self.last = timestamp
+        elif timestamp > self.last:
+            self._decay_to(timestamp)
+        elif timestamp < self.last:
+            # Late message (e.g. from a slower scoring batch): add it pre-decayed
+            age = self.last - timestamp
+            self.first = min(self.first, timestamp)
+            self._add(score, code, math.exp(-self.k_sentiment * age), math.exp(-self.k_rate * age),
+                      math.exp(-self.k_baseline * age))
+            return
+        self._add(score, code, 1.0, 1.0, 1.0)
+
+    def _add(self, score, code, weight, rate_weight, baseline_weight):
+        self.count += 1
+        self.score_sum += score * weight
+        self.weight += weight
+        if code == _POSITIVE:
+            self.positive += weight
+        self.rate_weight += rate_weight
+        self.baseline_score_sum += score * baseline_weight
+        self.baseline_weight += baseline_weight
+
+    def add_batch(self, timestamps, scores, label_codes):
+        """Add many messages at once (vectorized; any order)"""
+        timestamps = np.asarray(timestamps, dtype='float64')
+        valid = ~np.isnan(timestamps)
+        if not valid.any():
+            return
+        timestamps = timestamps[valid]
+        scores = np.nan_to_num(np.asarray(scores, dtype='float64')[valid])
+        positive = np.asarray(label_codes)[valid] == _POSITIVE
+        newest, oldest = float(timestamps.max()), float(timestamps.min())
+        if self.last is None:
+            self.first = self.last = newest
+        elif newest > self.last:
+            self._decay_to(newest)
+        self.first = min(self.first, oldest)
+
+        age = self.last - timestamps
+        weights = np.exp(-self.k_sentiment * age)
+        baseline_weights = np.exp(-self.k_baseline * age)
+        self.count += len(timestamps)
+        self.score_sum += float(weights @ scores)
+        self.weight += float(weights.sum())
+        self.positive += float(weights[positive].sum())
+        self.rate_weight += float(np.exp(-self.k_rate * age).sum())
+        self.baseline_score_sum += float(baseline_weights @ scores)
+        self.baseline_weight += float(baseline_weights.sum())
+
+    def add_frame(self, df):
+        """Add the messages of a chat DataFrame"""
+        import pandas as pd
+        if df.empty or not {'timestamp', 'sentiment_score', 'sentiment_label'} <= set(df.columns):
+            return
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            return
+        codes = pd.Categorical(df['sentiment_label'], categories=LABELS).codes
+        self.add_batch(unix_seconds(df['timestamp']), df['sentiment_score'].to_numpy(dtype='float64'), codes)
+
+    def _rate(self, weight, k, now):
+        # A steady rate r since the first message gives an expected decayed
+        # count of r / k * (1 - exp(-k * elapsed))
+        elapsed = max(now - self.first, 1.0)
+        return weight * k / -math.expm1(-k * elapsed)
+
+    def metrics(self, now=None):
+        """Hype index and its parts at ``now`` (default: the newest message)"""
+        if self.last is None:
+            return {
+                'hype_index': 0.0, 'sentiment': 0.0, 'baseline_sentiment': 0.0, 'positive_share': 0.0,
+                'rate': 0.0, 'baseline_rate': 0.0, 'velocity': 0.0, 'messages': 0.0
+            }
+        elapsed = max(0.0, now - self.last) if now is not None else 0.0
+        now = self.last + elapsed
+        decay = math.exp(-self.k_sentiment * elapsed)
+        weight = self.weight * decay
+        sentiment = self.score_sum * decay / (weight + 1)
+        baseline_decay = math.exp(-self.k_baseline * elapsed)
+        baseline_sentiment = self.baseline_score_sum * baseline_decay / (self.baseline_weight * baseline_decay + 1)
+        rate = self._rate(self.rate_weight * math.exp(-self.k_rate * elapsed), self.k_rate, now)
+        baseline_rate = self._rate(self.baseline_weight * baseline_decay, self.k_baseline, now)
+        velocity = rate / baseline_rate if baseline_rate > 0 else 0.0
+        velocity_score = math.tanh(math.log2(velocity)) if velocity > 0 else -1.0
+        hype_index = self.sentiment_weight * sentiment + (1 - self.sentiment_weight) * velocity_score
+        return {
+            'hype_index': round(hype_index, 3),
+            'sentiment': round(sentiment, 3),
+            'baseline_sentiment': round(baseline_sentiment, 3),
+            'positive_share': round(self.positive * decay / weight, 3) if weight > 0 else 0.0,
+            'rate': round(rate, 2),
+            'baseline_rate': round(baseline_rate, 2),
+            'velocity': round(velocity, 2),
+            'messages': round(weight, 1)  # Decayed message count behind the sentiment
+        }
+
+
+class HypeAggregator:
+    """Incremental hype metrics over several rolling windows at once
+
+    Every message updates each window's running sum and label counts on
+    push and again on eviction, so queries cost O(1) regardless of how
+    many messages a window holds (time windows evict amortized O(1)).
+    With ``gaps`` (a connection.GapTracker), time windows also report
+    ``coverage``: the share of the window the bot was actually listening.
+    ``decayed`` (a DecayedHype with ``half_lives``) gives the time-decayed
+    hype index alongside the windows.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, gaps=None, half_lives=None):
+        self.gaps = gaps
+        self.decayed = DecayedHype(half_lives)
+        self.windows = {}
+        for name, kind, size in windows:
+            if kind == 'count':
+                self.windows[name] = CountWindow(name, size)
+            elif kind == 'time':
+                self.windows[name] = TimeWindow(name, size)
+            else:
+                raise ValueError(f"Unknown window kind: {kind}")
+
+    def push(self, timestamp, score, label):
+        """Add one scored message to every window"""
+        scaled_score = round(score * SCORE_SCALE)
+        code = LABEL_CODES[label]
+        for window in self.windows.values():
+            window.push(timestamp, scaled_score, code)
+        self.decayed.push(timestamp, score, code)
+
+    def _window_metrics(self, window, now):
+        metrics = window.metrics(now)
+        if self.gaps is not None and now is not None and isinstance(window, TimeWindow):
+            missed = self.gaps.overlap(now - window.seconds, now)
+            metrics['coverage'] = round(1 - missed / window.seconds, 3)
+        return metrics
+
+    def window_name(self, preferred):
+        """``preferred`` if it is configured, else the first window"""
+        return preferred if preferred in self.windows else next(iter(self.windows))
+
+    def metrics(self, name, now=None):
+        """Metrics for a single window"""
+        return self._window_metrics(self.windows[name], now)
+
+    def all_metrics(self, now=None):
+        """Metrics for every window, keyed by window name"""
+        return {name: self._window_metrics(window, now) for name, window in self.windows.items()}
+
+    def hype_index(self, now=None):
+        """Time-decayed hype index, sentiment and velocity"""
+        return self.decayed.metrics(now)
+
+
+def normalize_phrase(message):
+    """Key under which repeated chat lines are counted as one phrase"""
+    return ' '.join(message.replace('\U000e0000', '').lower().split())[:100]
+
+
+class _ChatterBucket:
+    """Sketches of the chatters and phrases of one time bucket"""
+
+    def __init__(self, bucket, precision, top_k, cms_width, cms_depth):
+        self.bucket = bucket
+        self.unique = HyperLogLog(precision)
+        self.chatters = SpaceSaving(top_k)
+        self.phrases = SpaceSaving(top_k)
+        self.phrase_counts = CountMinSketch(cms_width, cms_depth)
+
+    def add(self, usernames, phrases):
+        self.unique.add_hashes(hash_items(usernames))
+        self.chatters.add_counts(Counter(usernames))
+        phrases = [phrase for phrase in phrases if phrase]
+        if phrases:
+            counts = Counter(phrases)
+            self.phrases.add_counts(counts)
+            self.phrase_counts.add_hashes(hash_items(list(counts)), np.fromiter(counts.values(), dtype='int64'))
+
+    def merge(self, other):
+        self.unique.merge(other.unique)
+        self.chatters.merge(other.chatters)
+        self.phrases.merge(other.phrases)
+        self.phrase_counts.merge(other.phrase_counts)
+        return self
+
+    def copy(self):
+        bucket = _ChatterBucket.__new__(_ChatterBucket)
+        bucket.bucket = self.bucket
+        bucket.unique = self.unique.copy()
+        bucket.chatters = self.chatters.copy()
+        bucket.phrases = self.phrases.copy()
+        bucket.phrase_counts = self.phrase_counts.copy()
+        return bucket
+
+
+class ChatterMetrics:
+    """Approximate unique chatters, top chatters and repeated phrases
+
+    Keeps one set of fixed-size sketches per ``bucket_seconds`` bucket for
+    the newest ``buckets`` buckets (an hour by default); a window query
+    merges the buckets it covers. Memory is bounded by the number of
+    buckets, not by the number of chatters:
+
+    - unique chatters: HyperLogLog, standard error ``1.04 / sqrt(2 ** precision)``
+    - top chatters and phrases: Space-Saving, counts overestimated by at
+      most ``messages / top_k``
+    - phrase counts: Count-Min, overestimated by at most
+      ``e / cms_width * messages`` with probability ``1 - exp(-cms_depth)``
+    """
+
+    def __init__(self, bucket_seconds=60, buckets=60, precision=12, top_k=100, cms_width=1024, cms_depth=4):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.precision = precision
+        self.top_k = top_k
+        self.cms_width = cms_width
+        self.cms_depth = cms_depth
+        self._buckets = {}  # bucket number -> _ChatterBucket
+        self.newest = None
+
+    def _bucket(self, bucket):
+        state = self._buckets.get(bucket)
+        if state is None:
+            if self.newest is not None and bucket <= self.newest - self.buckets:
+                return None  # Older than everything retained
+            state = self._buckets[bucket] = _ChatterBucket(
+                bucket, self.precision, self.top_k, self.cms_width, self.cms_depth
+            )
+            if self.newest is None or bucket > self.newest:
+                self.newest = bucket
+                for old in [b for b in self._buckets if b <= bucket - self.buckets]:
+                    del self._buckets[old]
+        return state
+
+    def add(self, timestamp, username, message):
+        """Count one chat message"""
+        self.add_batch([timestamp], [username], [message])
+
+    def add_batch(self, timestamps, usernames, messages):
+        """Count a batch of chat messages (Unix seconds)"""
+        if not len(timestamps):
+            return
+        buckets = np.floor_divide(np.asarray(timestamps, dtype='float64'), self.bucket_seconds)
+        valid = ~np.isnan(buckets)
+        buckets = buckets.astype('int64')
+        for bucket in np.unique(buckets[valid]).tolist():
+            state = self._bucket(bucket)
+            if state is None:
+                continue
+            rows = np.flatnonzero(valid & (buckets == bucket)).tolist()
+            state.add([usernames[i] for i in rows], [normalize_phrase(messages[i]) for i in rows])
+
+    def add_frame(self, df):
+        """Count the messages of a chat DataFrame"""
+        import pandas as pd
+        if df.empty or not {'timestamp', 'username', 'message'} <= set(df.columns):
+            return
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            return
+        self.add_batch(unix_seconds(df['timestamp']), df['username'].astype(object).tolist(), df['message'].astype(str).tolist())
+
+    def window(self, seconds=None, now=None):
+        """Merged sketches of the buckets in the last ``seconds`` seconds
+
+        ``now`` defaults to the newest message seen, so recorded data can be
+        queried like a live stream. Returns None when nothing was counted.
+        """
+        if self.newest is None:
+            return None
+        last = self.newest if now is None else int(now // self.bucket_seconds)
+        first = last - self.buckets + 1
+        if seconds is not None:
+            first = max(first, last - math.ceil(seconds / self.bucket_seconds) + 1)
+        merged = None
+        for bucket in sorted(self._buckets):
+            if first <= bucket <= last:
+                if merged is None:
+                    merged = self._buckets[bucket].copy()
+                else:
+                    merged.merge(self._buckets[bucket])
+        return merged
+
+    def unique_chatters(self, seconds=None, now=None):
+        """Estimated distinct chatters and the estimate's standard error"""
+        merged = self.window(seconds, now)
+        if merged is None:
+            return 0, 0.0
+        estimate = merged.unique.count()
+        return int(round(estimate)), estimate * merged.unique.relative_error
+
+    def top_chatters(self, n=5, seconds=None, now=None):
+        """``(username, messages, max overcount)`` of the most active chatters"""
+        merged = self.window(seconds, now)
+        return merged.chatters.top(n) if merged is not None else []
+
+    def top_phrases(self, n=5, seconds=None, now=None):
+        """``(phrase, messages, max overcount)`` of the most repeated phrases"""
+        merged = self.window(seconds, now)
+        if merged is None:
+            return []
+        # The Count-Min estimate tightens Space-Saving counts inflated by merging
+        top = merged.phrases.top(n)
+        estimates = merged.phrase_counts.estimate_hashes(hash_items([phrase for phrase, _, _ in top])) if top else []
+        return [(phrase, int(min(count, estimate)), error) for (phrase, count, error), estimate in zip(top, estimates)]
+
+    def phrase_count(self, message, seconds=None, now=None):
+        """Estimated number of times a phrase was sent (never an undercount)"""
+        merged = self.window(seconds, now)
+        return merged.phrase_counts.estimate(normalize_phrase(message)) if merged is not None else 0
@@ -0,0 +1,315 @@
+import asyncio
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+
+# Histogram bucket upper bounds in seconds, from 50µs (a parsed line) to
+# 2.5s (a stalled event loop)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+METRIC_PREFIX = 'hypebot'
+DEFAULT_METRICS_PORT = 9464
+
+
+class Histogram:
+    """Cumulative-on-read latency histogram with fixed buckets"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def exposition(self, name, labels=''):
+        """Prometheus text lines for this histogram"""
+        separator = ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.sum}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples one thread's stack from another
+
+    Every ``interval`` seconds a background thread records the target
+    thread's current call stack; ``collapsed()`` returns the counts in
+    the folded format flame graph tools read. Nothing runs while it is
+    stopped, and a sample costs the target thread nothing.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None):
+        """Start sampling (clears earlier samples)"""
+        if self.running:
+            return
+        if interval:
+            self.interval = interval
+        self.stacks.clear()
+        self.samples = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling; the samples are kept until the next start"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self, top=None):
+        """Folded stacks, most sampled first: ``frame;frame;frame count``"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common(top))
+
+    def top_functions(self, top=20):
+        """Leaf frames with their share of samples"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return [(frame, count / self.samples) for frame, count in leaves.most_common(top)]
+
+
+class Instrumentation:
+    """Hot-path counters, latency histograms and a metrics endpoint
+
+    ``timed(stage, func)`` wraps a function (or coroutine function) so
+    every call is counted and its latency recorded in the stage's
+    histogram. Gauges are callables read only when the metrics are
+    scraped, so queue depth and the like cost nothing in between. The
+    bots only wrap their methods when instrumentation is enabled, so
+    disabled instrumentation adds no overhead at all.
+
+    ``serve()`` exposes the metrics in the Prometheus text format on
+    ``/metrics``; ``/profile/start``, ``/profile/stop`` and ``/profile``
+    control the sampling profiler and return its folded stacks.
+    """
+
+    def __init__(self, prefix=METRIC_PREFIX, buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.stages = {}  # stage -> Histogram
+        self.errors = Counter()  # stage -> exceptions raised
+        self.counters = Counter()
+        self.gauges = {}  # name -> (func, help, kind)
+        self.loop_lag = Histogram(buckets)
+        self.last_loop_lag = 0.0
+        self.profiler = SamplingProfiler()
+        self.started = time.time()
+
+    def stage(self, name):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram(self.buckets)
+        return histogram
+
+    def timed(self, stage, func):
+        """Wrap ``func`` so each call's latency is recorded under ``stage``"""
+        histogram = self.stage(stage)
+        errors = self.errors
+        clock = time.perf_counter
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_async(*args, **kwargs):
+                start = clock()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors[stage] += 1
+                    raise
+                finally:
+                    histogram.observe(clock() - start)
+            return timed_async
+
+        @functools.wraps(func)
+        def timed_sync(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors[stage] += 1
+                raise
+            finally:
+                histogram.observe(clock() - start)
+        return timed_sync
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def gauge(self, name, func, help='', kind='gauge'):
+        """Register a value read at scrape time (``kind`` 'counter' for totals)"""
+        self.gauges[name] = (func, help, kind)
+
+    async def monitor_loop(self, interval=0.1):
+        """Record event loop lag (how late a sleep wakes up) until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - start - interval)
+            self.last_loop_lag = lag
+            self.loop_lag.observe(lag)
+
+    def exposition(self):
+        """All metrics in the Prometheus text format"""
+        prefix = self.prefix
+        lines = [
+            f'# HELP {prefix}_stage_seconds Latency of instrumented bot stages',
+            f'# TYPE {prefix}_stage_seconds histogram'
+        ]
+        for stage, histogram in self.stages.items():
+            lines.extend(histogram.exposition(f'{prefix}_stage_seconds', f'stage="{stage}"'))
+        lines.append(f'# HELP {prefix}_stage_errors_total Exceptions raised by instrumented stages')
+        lines.append(f'# TYPE {prefix}_stage_errors_total counter')
+        for stage in self.stages:
+            lines.append(f'{prefix}_stage_errors_total{{stage="{stage}"}} {self.errors[stage]}')
+
+        lines.append(f'# HELP {prefix}_event_loop_lag_seconds How late event loop timers fire')
+        lines.append(f'# TYPE {prefix}_event_loop_lag_seconds histogram')
+        lines.extend(self.loop_lag.exposition(f'{prefix}_event_loop_lag_seconds'))
+
+        for name, value in self.counters.items():
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            lines.append(f'{prefix}_{name} {value}')
+        for name, (func, help, kind) in self.gauges.items():
+            try:
+                value = func()
+            except Exception:
+                continue
+            if help:
+                lines.append(f'# HELP {prefix}_{name} {help}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            lines.append(f'{prefix}_{name} {value}')
+
+        lines.append(f'# TYPE {prefix}_uptime_seconds gauge')
+        lines.append(f'{prefix}_uptime_seconds {time.time() - self.started:.1f}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Compact per-stage p50/p99 and loop lag for the console, in ms"""
+        parts = [
+            f"{stage} {histogram.quantile(0.5) * 1000:g}/{histogram.quantile(0.99) * 1000:g}"
+            for stage, histogram in self.stages.items() if histogram.count
+        ]
+        return f"⏱️ p50/p99 ms: {' | '.join(parts)} | Loop lag: {self.last_loop_lag * 1000:.1f}"
+
+    def handle_request(self, target):
+        """Status, content type and body for an HTTP GET of ``target``"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', self.exposition()
+        if url.path == '/profile/start':
+            try:
+                interval = float(query.get('interval', [0])[0])
+            except ValueError:
+                interval = -1
+            if not 0 <= interval < float('inf'):
+                return 400, 'text/plain', "interval must be a non-negative number of seconds\n"
+            self.profiler.start(interval or None)
+            return 200, 'text/plain', f"Profiler started ({self.profiler.interval * 1000:g} ms interval)\n"
+        if url.path in ('/profile', '/profile/stop'):
+            try:
+                top = int(query.get('top', [0])[0])
+            except ValueError:
+                top = -1
+            if top < 0:
+                return 400, 'text/plain', "top must be a non-negative integer\n"
+            if url.path == '/profile/stop':
+                self.profiler.stop()
+            return 200, 'text/plain', self.profiler.collapsed(top or None) + '\n'
+        return 404, 'text/plain', "Not found: try /metrics, /profile/start, /profile or /profile/stop\n"
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass  # Headers are not needed
+            parts = request.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] != 'GET':
+                status, content_type, body = 405, 'text/plain', "Only GET is supported\n"
+            else:
+                try:
+                    status, content_type, body = self.handle_request(parts[1])
+                except Exception as e:
+                    status, content_type, body = 500, 'text/plain', f"Error: {e}\n"
+            payload = body.encode()
+            reason = {
+                200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'
+            }[status]
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+        """Serve the metrics endpoint until cancelled"""
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"Metrics on http://{host}:{port}/metrics")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.profiler.stop()
@@ -0,0 +1,114 @@
+# Twitch chat over IRC-on-websocket
+TWITCH_IRC_URI = "wss://irc-ws.chat.twitch.tv:443"
+
+# Escapes used in IRCv3 tag values
+_TAG_ESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+
+
+class IRCMessage:
+    """A single parsed IRC line"""
+
+    __slots__ = ('tags', 'prefix', 'command', 'params', 'trailing')
+
+    def __init__(self, tags, prefix, command, params, trailing):
+        self.tags = tags  # Raw tag string, parsed on demand by parse_tags
+        self.prefix = prefix
+        self.command = command
+        self.params = params  # Middle parameters as a single string
+        self.trailing = trailing  # Text after " :" (None if absent)
+
+    @property
+    def nick(self):
+        """Nickname from a ``nick!user@host`` prefix"""
+        prefix = self.prefix
+        if prefix is None:
+            return None
+        end = prefix.find('!')
+        return prefix if end < 0 else prefix[:end]
+
+    @property
+    def channel(self):
+        """Target channel without the leading '#', if any"""
+        params = self.params
+        if params.startswith('#'):
+            end = params.find(' ')
+            return params[1:] if end < 0 else params[1:end]
+        return None
+
+    def parse_tags(self):
+        """Decode the IRCv3 tags into a dict"""
+        return parse_tags(self.tags)
+
+    def __repr__(self):
+        return f"IRCMessage(command={self.command!r}, prefix={self.prefix!r}, params={self.params!r}, trailing={self.trailing!r})"
+
+
+def _unescape(value):
+    if '\\' not in value:
+        return value
+    out = []
+    i = 0
+    length = len(value)
+    while i < length:
+        char = value[i]
+        if char == '\\':
+            i += 1
+            if i < length:
+                out.append(_TAG_ESCAPES.get(value[i], value[i]))
+        else:
+            out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def parse_tags(raw):
+    """Decode an IRCv3 tag string (without the leading '@') into a dict"""
+    tags = {}
+    if not raw:
+        return tags
+    for item in raw.split(';'):
+        key, sep, value = item.partition('=')
+        tags[key] = _unescape(value) if sep else ''
+    return tags
+
+
+def parse_line(line):
+    """Parse one IRC line in a single pass, returning an IRCMessage or None
+
+    Each component is peeled off the front of the line with
+    ``str.partition``; no intermediate token lists are built. Tags are
+    kept as the raw string and only decoded if a caller asks for them.
+    """
+    if not line:
+        return None
+
+    tags = prefix = None
+    rest = line
+    if rest[0] == '@':
+        tags, _, rest = rest.partition(' ')
+        tags = tags[1:]
+    if rest[:1] == ':':
+        prefix, _, rest = rest.partition(' ')
+        prefix = prefix[1:]
+
+    command, _, rest = rest.partition(' ')
+    if not command:
+        return None
+    if rest[:1] == ':':
+        return IRCMessage(tags, prefix, command, '', rest[1:])
+    params, sep, trailing = rest.partition(' :')
+    return IRCMessage(tags, prefix, command, params, trailing if sep else None)
+
+
+def iter_messages(frame):
+    """Split a websocket frame into lines and yield parsed messages
+
+    Twitch packs several CRLF-separated lines into one frame, so every
+    line of the frame must be parsed.
+    """
+    for line in frame.split('\n'):
+        if line[-1:] == '\r':
+            line = line[:-1]
+        message = parse_line(line)
+        if message is not None:
+            yield message
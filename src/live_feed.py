@@ -0,0 +1,343 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from message_store import LABELS, LABEL_CODES
+from rollups import ROLLUP_RESOLUTIONS, Rollups
+
+# Where the bot publishes its feeds and the dashboard looks for them
+DEFAULT_FEED_DIR = os.path.join(tempfile.gettempdir(), 'hype-tracker')
+
+MAGIC = b'HYPEFEED'
+VERSION = 2
+HEADER_SIZE = 4096
+
+# Header fields: magic, version, capacity, record size, generation,
+# write sequence, heartbeat
+_HEADER = struct.Struct('<8sIII4xQQd')
+_WRITE_SEQ_OFFSET = 32
+_HEARTBEAT_OFFSET = 40
+
+# Metrics snapshot, guarded by a sequence lock: the counter is odd while
+# the writer is updating the payload
+_SNAPSHOT_OFFSET = 64
+_SNAPSHOT = struct.Struct('<QI')
+_SNAPSHOT_MAX = HEADER_SIZE - _SNAPSHOT_OFFSET - _SNAPSHOT.size
+
+# One fixed-size record per message (Twitch caps usernames at 25 characters
+# and messages at 500)
+USERNAME_BYTES = 25
+MESSAGE_BYTES = 500
+_RECORD = struct.Struct(f'<dfB{USERNAME_BYTES}s{MESSAGE_BYTES}s6x')
+RECORD_SIZE = _RECORD.size
+RECORD_DTYPE = np.dtype({
+    'names': ['timestamp', 'score', 'label', 'username', 'message'],
+    'formats': ['<f8', '<f4', 'u1', f'S{USERNAME_BYTES}', f'S{MESSAGE_BYTES}'],
+    'offsets': [0, 8, 12, 13, 13 + USERNAME_BYTES],
+    'itemsize': RECORD_SIZE
+})
+
+# Rollups section after the records, guarded by its own sequence lock:
+# counter, message total, first and last timestamp (NaN before the first
+# message), then per resolution its newest bucket and bucket arrays
+_ROLLUPS = struct.Struct('<QQdd')
+_ROLLUP_ARRAYS = (
+    ('buckets', '<i8', 1),
+    ('counts', '<i8', 1),
+    ('label_counts', '<i8', len(LABELS)),
+    ('label_scores', '<f8', len(LABELS)),
+    ('chatters', '<i8', 1),
+)
+
+
+def _rollups_size(resolutions=ROLLUP_RESOLUTIONS):
+    per_bucket = sum(8 * width for _, _, width in _ROLLUP_ARRAYS)
+    return _ROLLUPS.size + sum(8 + capacity * per_bucket for _, _, capacity in resolutions)
+
+
+def _rollup_views(buffer, offset, resolutions=ROLLUP_RESOLUTIONS):
+    """(newest offset, {array name: view}) of each resolution in a rollups section"""
+    views = []
+    offset += _ROLLUPS.size
+    for _, _, capacity in resolutions:
+        newest_offset = offset
+        offset += 8
+        arrays = {}
+        for name, dtype, width in _ROLLUP_ARRAYS:
+            array = np.frombuffer(buffer, dtype=dtype, count=capacity * width, offset=offset)
+            arrays[name] = array.reshape(capacity, width) if width > 1 else array
+            offset += capacity * width * 8
+        views.append((newest_offset, arrays))
+    return views
+
+
+def feed_path(channel, feed_dir=None):
+    """Path of the feed file for a channel"""
+    return os.path.join(feed_dir or DEFAULT_FEED_DIR, f'{channel}.feed')
+
+
+def _truncate_utf8(text, limit):
+    data = text.encode('utf-8')
+    if len(data) <= limit:
+        return data
+    return data[:limit].decode('utf-8', 'ignore').encode('utf-8')
+
+
+class LiveFeedWriter:
+    """Publishes scored messages and metric snapshots for local readers
+
+    The feed is a memory-mapped ring file: a header with the total number
+    of records written, a small metrics snapshot, ``capacity`` fixed-size
+    message records and the bot's rollups (see rollups.Rollups).
+    Publishing is a memory write with no locks or syscalls, and readers
+    only ever read the file, so any number of dashboard viewers can
+    attach without slowing ingestion.
+    """
+
+    def __init__(self, channel, capacity=8192, feed_dir=None):
+        self.channel = channel
+        self.capacity = capacity
+        self.path = feed_path(channel, feed_dir)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._rollups_offset = HEADER_SIZE + capacity * RECORD_SIZE
+        size = self._rollups_offset + _rollups_size()
+        # Reuse an existing file in place so readers on platforms that
+        # cannot replace a mapped file keep working; they notice the new
+        # generation and reset their cursor
+        mode = 'r+b' if os.path.exists(self.path) and os.path.getsize(self.path) == size else 'w+b'
+        self._file = open(self.path, mode)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+        self.write_seq = 0
+        self._snapshot_seq = 0
+        self._rollups_seq = 0
+        self._map[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        self._map[self._rollups_offset:] = bytes(size - self._rollups_offset)
+        self._rollup_views = _rollup_views(self._map, self._rollups_offset)
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, capacity, RECORD_SIZE, time.time_ns(), 0, time.time())
+
+    def append(self, timestamp, username, message, score, label):
+        """Publish one scored message"""
+        slot = self.write_seq % self.capacity
+        _RECORD.pack_into(
+            self._map, HEADER_SIZE + slot * RECORD_SIZE,
+            timestamp, score, LABEL_CODES[label],
+            _truncate_utf8(username, USERNAME_BYTES), _truncate_utf8(message, MESSAGE_BYTES)
+        )
+        # Make the record visible only after it is fully written
+        self.write_seq += 1
+        struct.pack_into('<Q', self._map, _WRITE_SEQ_OFFSET, self.write_seq)
+
+    def publish_snapshot(self, metrics, rollups=None):
+        """Publish a JSON-serializable metrics snapshot, the rollups and a heartbeat"""
+        if rollups is not None:
+            self._publish_rollups(rollups)
+        payload = json.dumps(metrics, separators=(',', ':')).encode('utf-8')
+        if len(payload) > _SNAPSHOT_MAX:
+            raise ValueError(f"Snapshot too large ({len(payload)} bytes)")
+        self._snapshot_seq += 1
+        _SNAPSHOT.pack_into(self._map, _SNAPSHOT_OFFSET, self._snapshot_seq, len(payload))
+        start = _SNAPSHOT_OFFSET + _SNAPSHOT.size
+        self._map[start:start + len(payload)] = payload
+        self._snapshot_seq += 1
+        struct.pack_into('<Q', self._map, _SNAPSHOT_OFFSET, self._snapshot_seq)
+        struct.pack_into('<d', self._map, _HEARTBEAT_OFFSET, time.time())
+
+    def _publish_rollups(self, rollups):
+        if rollups.resolutions != ROLLUP_RESOLUTIONS:
+            raise ValueError("Only rollups at the default resolutions can be published")
+        rollups.flush()
+        offset = self._rollups_offset
+        self._rollups_seq += 1
+        struct.pack_into('<Q', self._map, offset, self._rollups_seq)
+        for series, (newest_offset, arrays) in zip(rollups.series.values(), self._rollup_views):
+            struct.pack_into('<q', self._map, newest_offset, series.newest)
+            for name, view in arrays.items():
+                view[...] = getattr(series, name)
+        first = float('nan') if rollups.first is None else rollups.first
+        last = float('nan') if rollups.last is None else rollups.last
+        self._rollups_seq += 1
+        _ROLLUPS.pack_into(self._map, offset, self._rollups_seq, rollups.total, first, last)
+
+    def close(self):
+        self._rollup_views = None  # Views into the map would keep it from closing
+        self._map.close()
+        self._file.close()
+
+
+class LiveFeedReader:
+    """Reads a channel's live feed incrementally from a cursor
+
+    ``poll(cursor)`` returns only the records written since ``cursor`` as
+    NumPy columns plus the new cursor, so each refresh costs time
+    proportional to the number of new messages.
+    """
+
+    def __init__(self, channel, feed_dir=None):
+        self.channel = channel
+        self.path = feed_path(channel, feed_dir)
+        self._file = None
+        self._map = None
+        self.generation = None
+        self.capacity = 0
+        self._records = None
+        self._rollup_views = None
+
+    def _open(self):
+        """Map the feed file, returning False if it is missing or invalid"""
+        if self._map is not None:
+            return True
+        try:
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.close()
+            return False
+        magic, version, capacity, record_size, generation, _, _ = _HEADER.unpack_from(self._map, 0)
+        rollups_offset = HEADER_SIZE + capacity * RECORD_SIZE
+        if (magic != MAGIC or version != VERSION or record_size != RECORD_SIZE
+                or len(self._map) < rollups_offset + _rollups_size()):
+            self.close()
+            return False
+        self.capacity = capacity
+        self.generation = generation
+        self._records = np.frombuffer(self._map, dtype=RECORD_DTYPE, count=capacity, offset=HEADER_SIZE)
+        self._rollups_offset = rollups_offset
+        self._rollup_views = _rollup_views(self._map, rollups_offset)
+        return True
+
+    def _header(self):
+        return _HEADER.unpack_from(self._map, 0)
+
+    def available(self):
+        """Whether a feed file exists for this channel"""
+        return self._open()
+
+    def heartbeat(self):
+        """Time of the writer's last snapshot, or None"""
+        if not self._open():
+            return None
+        return self._header()[6]
+
+    def is_alive(self, max_age=5.0):
+        """Whether the writer published a snapshot in the last ``max_age`` seconds"""
+        heartbeat = self.heartbeat()
+        return heartbeat is not None and time.time() - heartbeat <= max_age
+
+    def snapshot(self):
+        """Latest metrics snapshot, or None"""
+        if not self._open():
+            return None
+        start = _SNAPSHOT_OFFSET + _SNAPSHOT.size
+        for _ in range(10):
+            seq, length = _SNAPSHOT.unpack_from(self._map, _SNAPSHOT_OFFSET)
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue  # Writer is mid-update
+            payload = bytes(self._map[start:start + length])
+            if struct.unpack_from('<Q', self._map, _SNAPSHOT_OFFSET)[0] == seq:
+                return json.loads(payload)
+        return None
+
+    def rollups(self):
+        """Copy of the writer's latest rollups, or None before it published any"""
+        if not self._open():
+            return None
+        offset = self._rollups_offset
+        for _ in range(10):
+            seq, total, first, last = _ROLLUPS.unpack_from(self._map, offset)
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue  # Writer is mid-update
+            rollups = Rollups()
+            for series, (newest_offset, arrays) in zip(rollups.series.values(), self._rollup_views):
+                series.newest = struct.unpack_from('<q', self._map, newest_offset)[0]
+                for name, view in arrays.items():
+                    setattr(series, name, view.copy())
+            if struct.unpack_from('<Q', self._map, offset)[0] == seq:
+                rollups.total = total
+                rollups.first = None if np.isnan(first) else first
+                rollups.last = None if np.isnan(last) else last
+                return rollups
+        return None
+
+    def poll(self, cursor=0, generation=None):
+        """Read records written since ``cursor``
+
+        Returns ``(columns, cursor, generation, lost)``. ``columns`` maps
+        column names to arrays (empty when nothing is new). Pass the
+        returned cursor and generation to the next call; if the writer
+        restarted, reading starts over from its first retained record.
+        ``lost`` counts records overwritten before they could be read.
+        """
+        if not self._open():
+            return None, cursor, generation, 0
+
+        header = self._header()
+        if header[4] != self.generation:
+            # Writer was restarted: remap to pick up the new file
+            self.close()
+            if not self._open():
+                return None, cursor, generation, 0
+            header = self._header()
+        if generation != self.generation:
+            cursor = 0
+            generation = self.generation
+
+        write_seq = header[5]
+        oldest = max(0, write_seq - self.capacity)
+        lost = max(0, oldest - cursor)
+        cursor = max(cursor, oldest)
+        if cursor >= write_seq:
+            return _columns(self._records[:0]), write_seq, generation, lost
+
+        start, stop = cursor % self.capacity, write_seq % self.capacity
+        if start < stop:
+            chunk = self._records[start:stop].copy()
+        else:
+            chunk = np.concatenate([self._records[start:], self._records[:stop]])
+
+        # Records overwritten while copying are no longer trustworthy,
+        # including the one whose slot the writer may be filling right now
+        overrun = struct.unpack_from('<Q', self._map, _WRITE_SEQ_OFFSET)[0] - self.capacity + 1 - cursor
+        overrun = min(overrun, len(chunk))
+        if overrun > 0:
+            chunk = chunk[overrun:]
+            lost += overrun
+
+        return _columns(chunk), write_seq, generation, lost
+
+    def close(self):
+        self._records = None
+        self._rollup_views = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _columns(records):
+    """Decode a slice of records into typed columns"""
+    return {
+        'timestamp': records['timestamp'].astype('float64'),
+        'score': records['score'].astype('float32'),
+        'label': records['label'].astype('int8'),
+        'username': [name.decode('utf-8', 'replace') for name in records['username']],
+        'message': [text.decode('utf-8', 'replace') for text in records['message']],
+    }
+
+
+def label_names(codes):
+    """Map label codes back to label strings"""
+    return np.array(LABELS, dtype=object)[codes]
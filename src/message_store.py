@@ -0,0 +1,267 @@
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# Sentiment labels are stored as 1-byte codes
+LABELS = ('neutral', 'positive', 'negative')
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+# Message text is stored as UTF-8; lone surrogates (possible in imported
+# JSON) round-trip instead of failing
+TEXT_ENCODING = 'utf-8'
+TEXT_ERRORS = 'surrogatepass'
+
+# Arena bytes of overwritten messages are released once they make up half
+# the arena and at least this many bytes; the check runs each time the
+# arena has grown by a quarter
+_MIN_RELEASE_BYTES = 4096
+
+# Timestamps are kept as Unix seconds and shown in local time
+LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+
+def unix_seconds(timestamps):
+    """Unix seconds of a datetime Series (naive values are local time); NaT becomes NaN"""
+    import pandas as pd
+    if timestamps.dt.tz is None:
+        timestamps = timestamps.dt.tz_localize(LOCAL_TZ)
+    return (timestamps - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy()
+
+
+class StoreView:
+    """Read-only view over the newest rows of a MessageStore
+
+    The rows live in one or two contiguous slices of the ring buffer
+    (two when the window wraps around the end). Column accessors return
+    NumPy views when the window is contiguous and only copy when it wraps.
+    Aggregates work slice by slice and never copy.
+    """
+
+    def __init__(self, store, parts):
+        self.store = store
+        self.parts = parts
+
+    def __len__(self):
+        return sum(part.stop - part.start for part in self.parts)
+
+    def _column(self, array):
+        if len(self.parts) == 1:
+            return array[self.parts[0]]
+        return np.concatenate([array[part] for part in self.parts])
+
+    @property
+    def timestamps(self):
+        return self._column(self.store.timestamps)
+
+    @property
+    def scores(self):
+        return self._column(self.store.scores)
+
+    @property
+    def labels(self):
+        return self._column(self.store.labels)
+
+    @property
+    def user_ids(self):
+        return self._column(self.store.user_ids)
+
+    @property
+    def messages(self):
+        """Message texts, decoded from the store's arena"""
+        store = self.store
+        # The view ends at the newest row, and each row's text ends where
+        # the next one's starts
+        bounds = (self._column(store.text_offsets) - store.text_base).tolist()
+        bounds.append(len(store.text))
+        with memoryview(store.text) as text:
+            return [str(text[start:end], TEXT_ENCODING, TEXT_ERRORS) for start, end in zip(bounds, bounds[1:])]
+
+    def score_sum(self):
+        """Sum of compound scores without copying the window"""
+        return float(sum(self.store.scores[part].sum(dtype='float64') for part in self.parts))
+
+    def mean_score(self):
+        """Average compound score of the window"""
+        count = len(self)
+        return self.score_sum() / count if count else 0.0
+
+    def label_counts(self):
+        """Number of messages per sentiment label, most common first"""
+        counts = np.zeros(len(LABELS), dtype='int64')
+        for part in self.parts:
+            counts += np.bincount(self.store.labels[part], minlength=len(LABELS))
+        breakdown = {LABELS[code]: int(count) for code, count in enumerate(counts) if count}
+        return dict(sorted(breakdown.items(), key=lambda item: item[1], reverse=True))
+
+
+class MessageStore:
+    """Fixed-capacity columnar ring buffer of scored chat messages
+
+    Each column is a preallocated NumPy array, so appending a message is
+    O(1) and never reallocates. Usernames are interned to integer ids,
+    sentiment labels are stored as 1-byte codes from ``LABELS`` and the
+    channel once per store. Message text is packed back to back as UTF-8
+    in one arena in append order, so a row only records where its text
+    starts (it ends where the next row's starts); arena bytes of
+    overwritten messages are released in bulk. A retained message
+    therefore costs 25 bytes plus its UTF-8 text, instead of a Python
+    string object per row. Once the buffer is full the oldest message is
+    overwritten. The username table is rebuilt from the retained rows
+    each time it has grown by ``capacity`` names, so chatters who left
+    do not pile up in it.
+    """
+
+    def __init__(self, channel, capacity=1000):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self.channel = channel
+        self.capacity = capacity
+
+        self.timestamps = np.zeros(capacity, dtype='float64')  # Unix seconds
+        self.scores = np.zeros(capacity, dtype='float32')
+        self.labels = np.zeros(capacity, dtype='int8')
+        self.user_ids = np.zeros(capacity, dtype='int32')
+
+        # Text arena: a row's text starts at arena offset text_offsets[slot];
+        # text[0] is at arena offset text_base (earlier bytes were released)
+        self.text = bytearray()
+        self.text_base = 0
+        self.text_offsets = np.zeros(capacity, dtype='int64')
+        self._release_at = _MIN_RELEASE_BYTES  # Arena size of the next release check
+
+        # Username intern table
+        self.usernames = []
+        self._user_index = {}
+        self._compact_at = capacity  # Table size of the next compaction
+
+        self.head = 0  # Next slot to write
+        self.size = 0
+        self.total = 0  # Messages appended since creation
+
+    def __len__(self):
+        return self.size
+
+    def intern_username(self, username):
+        """Return the integer id for a username, assigning one if needed"""
+        user_id = self._user_index.get(username)
+        if user_id is None:
+            user_id = len(self.usernames)
+            self.usernames.append(username)
+            self._user_index[username] = user_id
+        return user_id
+
+    def _compact_usernames(self):
+        """Rebuild the username table from the ids of the retained rows"""
+        # Rows fill slots 0..size-1 before the buffer wraps
+        live, user_ids = np.unique(self.user_ids[:self.size], return_inverse=True)
+        self.user_ids[:self.size] = user_ids
+        self.usernames = [self.usernames[i] for i in live.tolist()]
+        self._user_index = {username: user_id for user_id, username in enumerate(self.usernames)}
+        self._compact_at = len(self.usernames) + self.capacity
+
+    def append(self, timestamp, username, message, score, label):
+        """Store one scored message, overwriting the oldest when full"""
+        if len(self.usernames) >= self._compact_at:
+            self._compact_usernames()
+        slot = self.head
+        self.timestamps[slot] = timestamp
+        self.scores[slot] = score
+        self.labels[slot] = LABEL_CODES[label]
+        self.user_ids[slot] = self.intern_username(username)
+        self.text_offsets[slot] = self.text_base + len(self.text)
+        self.text += message.encode(TEXT_ENCODING, TEXT_ERRORS)
+
+        self.head = (slot + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        if len(self.text) >= self._release_at:
+            self._release_text()
+        self.total += 1
+        return slot
+
+    def _release_text(self):
+        """Drop the arena bytes before the oldest retained message once they are half the arena"""
+        oldest = (self.head - self.size) % self.capacity
+        dead = int(self.text_offsets[oldest]) - self.text_base
+        if dead >= _MIN_RELEASE_BYTES and dead * 2 >= len(self.text):
+            del self.text[:dead]
+            self.text_base += dead
+        self._release_at = len(self.text) + max(_MIN_RELEASE_BYTES, len(self.text) // 4)
+
+    def message(self, slot):
+        """Text of the message in ``slot``"""
+        following = (slot + 1) % self.capacity
+        start = int(self.text_offsets[slot]) - self.text_base
+        end = len(self.text) if following == self.head else int(self.text_offsets[following]) - self.text_base
+        return self.text[start:end].decode(TEXT_ENCODING, TEXT_ERRORS)
+
+    def extend(self, timestamps, usernames, messages, scores, label_codes):
+        """Append a batch of messages whose labels are already codes"""
+        count = len(timestamps)
+        if count > self.capacity:
+            # Only the newest rows would survive anyway
+            skip = count - self.capacity
+            timestamps, usernames, messages = timestamps[skip:], usernames[skip:], messages[skip:]
+            scores, label_codes = scores[skip:], label_codes[skip:]
+            self.total += skip
+            count = self.capacity
+
+        if len(self.usernames) >= self._compact_at:
+            self._compact_usernames()
+        user_ids = [self.intern_username(username) for username in usernames]
+        encoded = [message.encode(TEXT_ENCODING, TEXT_ERRORS) for message in messages]
+        text_lengths = np.fromiter(map(len, encoded), dtype='int64', count=count)
+        text_offsets = self.text_base + len(self.text) + np.cumsum(text_lengths) - text_lengths
+        self.text += b''.join(encoded)
+        done = 0
+        while done < count:
+            slot = self.head
+            n = min(count - done, self.capacity - slot)
+            self.timestamps[slot:slot + n] = timestamps[done:done + n]
+            self.scores[slot:slot + n] = scores[done:done + n]
+            self.labels[slot:slot + n] = label_codes[done:done + n]
+            self.user_ids[slot:slot + n] = user_ids[done:done + n]
+            self.text_offsets[slot:slot + n] = text_offsets[done:done + n]
+            self.head = (slot + n) % self.capacity
+            done += n
+
+        self.size = min(self.capacity, self.size + count)
+        self.total += count
+        if len(self.text) >= self._release_at:
+            self._release_text()
+
+    def view(self, n=None):
+        """Return a StoreView over the newest ``n`` messages (all if None)"""
+        n = self.size if n is None else max(0, min(n, self.size))
+        start = self.head - n
+        if start >= 0:
+            return StoreView(self, [slice(start, self.head)])
+        if self.head == 0:
+            return StoreView(self, [slice(self.capacity + start, self.capacity)])
+        return StoreView(self, [slice(self.capacity + start, self.capacity), slice(0, self.head)])
+
+    def memory_usage(self):
+        """Bytes held by the columns, the text arena and the username table"""
+        columns = (self.timestamps, self.scores, self.labels, self.user_ids, self.text_offsets)
+        usernames = sys.getsizeof(self.usernames) + sys.getsizeof(self._user_index)
+        usernames += sum(sys.getsizeof(username) for username in self.usernames)
+        return sum(column.nbytes for column in columns) + sys.getsizeof(self.text) + usernames
+
+    def to_dataframe(self, n=None):
+        """Materialize the newest ``n`` messages as a DataFrame
+
+        Usernames, labels and the channel become categoricals, as in
+        dataset_cache.typed_frame, so the frame stays compact too.
+        """
+        import pandas as pd  # Deferred: the bot itself never needs pandas
+        view = self.view(n)
+        user_ids, user_codes = np.unique(view.user_ids, return_inverse=True)
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(view.timestamps, unit='s', utc=True).tz_convert(LOCAL_TZ).tz_localize(None),
+            'username': pd.Categorical.from_codes(user_codes, [self.usernames[i] for i in user_ids.tolist()]),
+            'message': view.messages,
+            'sentiment_score': view.scores,
+            'sentiment_label': pd.Categorical.from_codes(view.labels, categories=LABELS),
+            'channel': pd.Categorical.from_codes(np.zeros(len(view), dtype='int8'), [self.channel])
+        })
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from collections import deque
+
+from chat_bot import ChatBot
+from hype_metrics import DEFAULT_WINDOWS
+from irc_parser import TWITCH_IRC_URI
+from connection import TwitchConnection
+from live_feed import LiveFeedWriter
+
+
+class JoinRateLimiter:
+    """Sliding-window limit on JOIN commands shared by all connections
+
+    Twitch allows 20 JOIN attempts per 10 seconds for unverified accounts.
+    """
+
+    def __init__(self, limit=20, period=10.0):
+        self.limit = limit
+        self.period = period
+        self.sent = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until another JOIN may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self.sent and self.sent[0] <= now - self.period:
+                    self.sent.popleft()
+                if len(self.sent) < self.limit:
+                    self.sent.append(now)
+                    return
+                await asyncio.sleep(self.sent[0] + self.period - now)
+
+
+class IRCConnection:
+    """One websocket to Twitch IRC carrying a group of channels"""
+
+    def __init__(self, index, nickname, ingest, join_limiter, uri=TWITCH_IRC_URI):
+        self.index = index
+        self.uri = uri
+        self.nickname = nickname
+        self.ingest = ingest
+        self.join_limiter = join_limiter
+        self.channels = set()
+        self.connection = TwitchConnection(ingest.put, self._rejoin, nickname, uri, name=f"conn {index}")
+        self.gaps = self.connection.gaps  # Shared by the channels on this connection
+        self._joins = asyncio.Queue()
+        self._joiner = None
+
+    @property
+    def running(self):
+        return self.connection.running
+
+    @running.setter
+    def running(self, value):
+        self.connection.running = value
+
+    def add(self, channel):
+        self.channels.add(channel)
+        self._joins.put_nowait(channel)
+
+    async def remove(self, channel):
+        self.channels.discard(channel)
+        await self.connection.send(f"PART #{channel}")
+
+    async def _rejoin(self, connection):
+        """Once logged in, (re)join everything assigned to this connection"""
+        while not self._joins.empty():
+            self._joins.get_nowait()
+        for channel in self.channels:
+            self._joins.put_nowait(channel)
+        if self._joiner is None:
+            self._joiner = asyncio.create_task(self._join_channels())
+
+    async def _join_channels(self):
+        """Send queued JOINs as the rate limit allows"""
+        while True:
+            channel = await self._joins.get()
+            if channel not in self.channels or self.connection.websocket is None:
+                continue  # Rejoined on the next login
+            await self.join_limiter.acquire()
+            await self.connection.send(f"JOIN #{channel}")
+            print(f"[conn {self.index}] Joined #{channel}")
+
+    async def run(self):
+        """Read frames into the shared ingest queue, reconnecting on errors"""
+        try:
+            await self.connection.run()
+        finally:
+            if self._joiner is not None:
+                self._joiner.cancel()
+                self._joiner = None
+
+
+class MultiChannelBot(ChatBot):
+    """Tracks many channels over a small pool of shared IRC connections
+
+    Channels are spread over connections of up to ``channels_per_connection``
+    channels each. All connections feed one ingest queue and one shared
+    sentiment engine; scored messages are routed to per-channel state.
+    Channels can be added and removed while the bot is running.
+    """
+
+    def __init__(self, channels=(), channels_per_connection=100, history_size=1000,
+                 windows=DEFAULT_WINDOWS, cache_size=10000, scorer='vader', batch_size=64, batch_delay=0.05,
+                 workers=0, queue_size=10000, overflow='block', join_limit=20, join_period=10.0,
+                 status_interval=1.0, echo_every=0, status_top=10, live_feed=False, feed_dir=None,
+                 feed_records=1024, archive=False, storage_dir=None, dedup_window=10.0, uri=TWITCH_IRC_URI,
+                 metrics_port=None, profile=False, half_lives=None, exports=None):
+        super().__init__(
+            history_size=history_size, windows=windows, cache_size=cache_size, scorer=scorer,
+            batch_size=batch_size, batch_delay=batch_delay, workers=workers, queue_size=queue_size,
+            overflow=overflow, status_interval=status_interval, echo_every=echo_every,
+            live_feed=live_feed, archive=archive, storage_dir=storage_dir, dedup_window=dedup_window,
+            metrics_port=metrics_port, profile=profile, half_lives=half_lives, exports=exports
+        )
+        self.channels_per_connection = channels_per_connection
+        self.feed_dir = feed_dir  # One feed file per channel, so live_feed is off by default
+        self.feed_records = feed_records  # Ring size of each channel's feed (~0.5 KB per record)
+        self.uri = uri
+        self.join_limiter = JoinRateLimiter(join_limit, join_period)
+        self.status_top = status_top  # Busiest channels shown every interval
+
+        self.connections = []
+        self._connection_for = {}  # channel -> IRCConnection
+        self._tasks = []
+
+        if self.instrumentation is not None:
+            self.instrument()
+
+        for channel in channels:
+            self.add_channel(channel)
+
+    def instrument(self):
+        """Time the hot-path stages and expose the shared gauges"""
+        super().instrument()
+        instrumentation = self.instrumentation
+        instrumentation.gauge('channels', lambda: len(self.states), 'Tracked channels')
+        instrumentation.gauge('connections', lambda: len(self.connections), 'Open IRC connections')
+
+    def _pick_connection(self):
+        for connection in self.connections:
+            if len(connection.channels) < self.channels_per_connection:
+                return connection
+        connection = IRCConnection(len(self.connections), self.nickname, self.ingest, self.join_limiter, self.uri)
+        self.connections.append(connection)
+        if self.running:
+            self._tasks.append(asyncio.create_task(connection.run()))
+        return connection
+
+    def add_channel(self, channel):
+        """Start tracking a channel"""
+        channel = channel.lower().lstrip('#')
+        if channel in self.states:
+            return self.states[channel]
+        feed = LiveFeedWriter(channel, capacity=self.feed_records, feed_dir=self.feed_dir) if self.live_feed else None
+        connection = self._pick_connection()
+        state = self.states[channel] = self.new_state(channel, connection.connection, feed)
+        connection.add(channel)
+        self._connection_for[channel] = connection
+        return state
+
+    async def remove_channel(self, channel):
+        """Stop tracking a channel and PART it"""
+        channel = channel.lower().lstrip('#')
+        connection = self._connection_for.pop(channel, None)
+        state = self.states.pop(channel, None)
+        if state is not None:
+            state.close()
+        if connection is not None:
+            await connection.remove(channel)
+
+    def render_status(self):
+        """Status lines for the busiest channels over the last minute"""
+        now = time.time()
+        per_channel = [
+            (channel, state.hype.metrics(state.hype.window_name('60s'), now), state.hype.hype_index(now))
+            for channel, state in self.states.items()
+        ]
+        per_channel.sort(key=lambda item: item[1]['message_count'], reverse=True)
+        queue = self.ingest.stats()
+        gaps = sum(len(connection.gaps.gaps) for connection in self.connections)
+        gaps = f" | Gaps: {gaps}" if gaps else ""
+        lines = [f"📊 {len(self.states)} channels | Queue: {queue['depth']} | Dropped: {queue['dropped']}{gaps}"]
+        for channel, metrics, hype in per_channel[:self.status_top]:
+            spam = self.states[channel].dedup
+            spam = f" | Spam: {spam.spam_intensity(now):.0%}" if spam is not None else ""
+            lines.append(
+                f"  #{channel:<25} Hype: {hype['hype_index']:+.2f} ({hype['velocity']:.1f}x usual rate) | "
+                f"Messages (60s): {metrics['message_count']}{spam}"
+            )
+        if self.instrumentation is not None:
+            lines.append(self.instrumentation.summary())
+        return lines
+
+    def get_hype_metrics(self, window=None):
+        """Current hype metrics for every tracked channel"""
+        return {channel: state.get_hype_metrics(window) for channel, state in self.states.items()}
+
+    async def run_connections(self):
+        """Run every connection until the bot is stopped"""
+        self._tasks = [asyncio.create_task(connection.run()) for connection in self.connections]
+        try:
+            while self.running:
+                await asyncio.sleep(1)
+        finally:
+            for connection in self.connections:
+                connection.running = False
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def start(self):
+        """Start all connections and the shared processing pipeline"""
+        print(f"Starting multi-channel bot for {len(self.states)} channels")
+        await super().start()
+
+
+if __name__ == "__main__":
+    # Same flags as bot_cli.py
+    from bot_cli import main
+    main(default_channels=['otplol', 'ninja', 'shroud', 'pokimane', 'xqc'])
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from collections import deque
+
+# What to do with a new line when the ingest queue is full
+OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest', 'sample')
+
+
+class IngestQueue:
+    """Bounded queue between the websocket reader and message processing
+
+    The reader only timestamps and enqueues raw lines. When the queue is
+    full the ``overflow`` policy decides what happens:
+
+    - ``block``: the reader waits for space (backpressure onto the socket)
+    - ``drop_newest``: the incoming line is discarded
+    - ``drop_oldest``: the oldest queued line is discarded to make room
+    - ``sample``: one in every ``sample_rate`` incoming lines replaces the
+      oldest queued line, the rest are discarded
+    """
+
+    def __init__(self, maxsize=10000, overflow='block', sample_rate=10):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+        self.items = deque()
+        self.enqueued = 0
+        self.dropped = 0
+        self._overflow_count = 0
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def __len__(self):
+        return len(self.items)
+
+    async def put(self, raw, received_at=None):
+        """Enqueue a raw line, applying the overflow policy when full"""
+        item = (time.time() if received_at is None else received_at, raw)
+
+        if len(self.items) >= self.maxsize:
+            if self.overflow == 'block':
+                while len(self.items) >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+            elif self.overflow == 'drop_newest':
+                self.dropped += 1
+                return False
+            else:
+                self._overflow_count += 1
+                if self.overflow == 'sample' and self._overflow_count % self.sample_rate:
+                    self.dropped += 1
+                    return False
+                self.items.popleft()
+                self.dropped += 1
+
+        self.items.append(item)
+        self.enqueued += 1
+        self._not_empty.set()
+        return True
+
+    async def get(self):
+        """Wait for and return the oldest (received_at, raw) item"""
+        while not self.items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        item = self.items.popleft()
+        self._not_full.set()
+        return item
+
+    def stats(self):
+        """Queue depth and drop counters"""
+        return {
+            'depth': len(self.items),
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'overflow': self.overflow
+        }
+
+
+async def consume(queue, handler):
+    """Feed queued lines to ``handler(raw, received_at)`` until cancelled"""
+    while True:
+        received_at, raw = await queue.get()
+        try:
+            await handler(raw, received_at)
+        except Exception as e:
+            print(f"Error handling message: {e}")
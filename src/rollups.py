@@ -0,0 +1,264 @@
+import numpy as np
+
+from message_store import LABELS, LOCAL_TZ, unix_seconds
+
+# (name, bucket width in seconds, buckets retained)
+ROLLUP_RESOLUTIONS = (
+    ('1s', 1, 600),       # 10 minutes
+    ('10s', 10, 360),     # 1 hour
+    ('1min', 60, 360),    # 6 hours
+    ('5min', 300, 288),   # 24 hours
+    ('1h', 3600, 168),    # 7 days
+)
+
+# Buckets whose chatter sets stay open for late messages
+_OPEN_BUCKETS = 2
+
+# Usernames remembered for chatter counting before the table is reset
+MAX_USERS = 100000
+
+
+class RollupSeries:
+    """Fixed-size ring of time buckets at one resolution
+
+    Each bucket keeps its message count, per-label message counts and
+    score sums, and the number of unique chatters. Bucket ``b`` covers
+    ``[b * seconds, (b + 1) * seconds)`` and lives in slot
+    ``b % capacity``, so adding a message is O(1) and memory never grows.
+    Only the newest ``capacity`` buckets are retained.
+    """
+
+    def __init__(self, name, seconds, capacity):
+        self.name = name
+        self.seconds = seconds
+        self.capacity = capacity
+
+        self.buckets = np.full(capacity, -1, dtype='int64')  # Bucket number held by each slot
+        self.counts = np.zeros(capacity, dtype='int64')
+        self.label_counts = np.zeros((capacity, len(LABELS)), dtype='int64')
+        self.label_scores = np.zeros((capacity, len(LABELS)), dtype='float64')
+        self.chatters = np.zeros(capacity, dtype='int64')
+
+        self.newest = -1
+        self._open = {}  # bucket -> set of user ids, for the newest buckets only
+
+    def _slot(self, bucket):
+        """Slot for a bucket, reset if it held an older one; None if expired"""
+        if bucket <= self.newest - self.capacity:
+            return None
+        slot = bucket % self.capacity
+        if self.buckets[slot] != bucket:
+            self.buckets[slot] = bucket
+            self.counts[slot] = 0
+            self.label_counts[slot] = 0
+            self.label_scores[slot] = 0.0
+            self.chatters[slot] = 0
+        if bucket > self.newest:
+            self.newest = bucket
+            for old in [b for b in self._open if b <= bucket - _OPEN_BUCKETS]:
+                del self._open[old]
+        return slot
+
+    def add(self, timestamp, score, label_code, user_id):
+        bucket = int(timestamp // self.seconds)
+        slot = self._slot(bucket)
+        if slot is None:
+            return
+        self.counts[slot] += 1
+        self.label_counts[slot, label_code] += 1
+        self.label_scores[slot, label_code] += score
+        users = self._open.get(bucket)
+        if users is None:
+            if bucket <= self.newest - _OPEN_BUCKETS:
+                return  # Closed bucket: its chatter count is final
+            users = self._open[bucket] = set()
+        if user_id not in users:
+            users.add(user_id)
+            self.chatters[slot] += 1
+
+    def add_batch(self, timestamps, scores, label_codes, user_ids):
+        """Add many messages at once with vectorized bucket updates
+
+        Matches calling ``add`` for each message when the batch is in time
+        order: buckets closed before the batch keep their chatter count.
+        """
+        buckets = np.floor_divide(timestamps, self.seconds).astype('int64')
+        newest = max(self.newest, int(buckets.max()))
+        keep = buckets > newest - self.capacity
+        if not keep.all():
+            buckets, scores = buckets[keep], scores[keep]
+            label_codes, user_ids = label_codes[keep], user_ids[keep]
+        if not len(buckets):
+            return
+
+        unique, inverse = np.unique(buckets, return_inverse=True)
+        previous = dict(self._open)  # Assigning slots below may close buckets
+        closed_before = self.newest - _OPEN_BUCKETS
+        slots = np.array([self._slot(int(bucket)) for bucket in unique])
+        n = len(unique)
+        self.counts[slots] += np.bincount(inverse, minlength=n)
+        for code in range(len(LABELS)):
+            mask = label_codes == code
+            self.label_counts[slots, code] += np.bincount(inverse[mask], minlength=n)
+            self.label_scores[slots, code] += np.bincount(inverse[mask], weights=scores[mask], minlength=n)
+
+        # Unique chatters: distinct (bucket, user) pairs, merged with the
+        # sets of buckets that are still open
+        order = np.lexsort((user_ids, inverse))
+        sorted_buckets, sorted_users = inverse[order], user_ids[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (sorted_buckets[1:] != sorted_buckets[:-1]) | (sorted_users[1:] != sorted_users[:-1])
+        distinct = np.bincount(sorted_buckets[first], minlength=n)
+        starts = np.searchsorted(sorted_buckets, np.arange(n))
+        ends = np.append(starts[1:], len(order))
+        for i, bucket in enumerate(unique.tolist()):
+            users = previous.get(bucket)
+            if users is None:
+                if bucket <= closed_before:
+                    continue  # Closed bucket: its chatter count is final
+                if bucket <= self.newest - _OPEN_BUCKETS:
+                    # Opened and closed within this batch
+                    self.chatters[slots[i]] += distinct[i]
+                    continue
+                users = self._open[bucket] = set()
+            before = len(users)
+            users.update(sorted_users[starts[i]:ends[i]].tolist())
+            self.chatters[slots[i]] += len(users) - before
+
+    def frame(self, start=None):
+        """Retained, non-empty buckets (from ``start``, Unix seconds) as a DataFrame"""
+        import pandas as pd  # Deferred: the bot keeps rollups without pandas
+        valid = (self.buckets >= 0) & (self.counts > 0) & (self.buckets > self.newest - self.capacity)
+        if start is not None:
+            valid &= self.buckets >= int(start // self.seconds)
+        slots = np.flatnonzero(valid)
+        slots = slots[np.argsort(self.buckets[slots], kind='stable')]
+
+        counts = self.counts[slots]
+        label_counts = self.label_counts[slots]
+        label_scores = self.label_scores[slots]
+        score_sums = label_scores.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            label_means = np.where(label_counts > 0, label_scores / np.maximum(label_counts, 1), np.nan)
+
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(self.buckets[slots] * self.seconds, unit='s', utc=True).tz_convert(LOCAL_TZ).tz_localize(None),
+            'count': counts,
+            'score_sum': score_sums,
+            'mean_score': score_sums / np.maximum(counts, 1),
+            'chatters': self.chatters[slots],
+            'dominant_label': pd.Categorical.from_codes(
+                label_counts.argmax(axis=1) if len(slots) else np.array([], dtype='int8'), categories=LABELS
+            )
+        })
+        for code, label in enumerate(LABELS):
+            df[label] = label_counts[:, code]
+            df[f'{label}_mean_score'] = label_means[:, code]
+        return df
+
+
+class Rollups:
+    """Multi-resolution rollups of a message stream
+
+    Every message updates one bucket per resolution, so charts can be
+    drawn from a few hundred pre-aggregated buckets instead of scanning
+    raw messages, and the cost of both stays flat however long the
+    stream runs. Usernames get ids for chatter counting; after
+    ``max_users`` of them the table starts over (ids are never reused),
+    so a chatter seen on both sides of a reset may count twice in a
+    bucket that was open at the time.
+    """
+
+    def __init__(self, resolutions=ROLLUP_RESOLUTIONS, max_users=MAX_USERS):
+        self.resolutions = tuple(resolutions)
+        self.series = {name: RollupSeries(name, seconds, capacity) for name, seconds, capacity in resolutions}
+        self.total = 0
+        self.first = None  # Oldest and newest timestamps seen
+        self.last = None
+        self.max_users = max_users
+        self._user_index = {}
+        self._next_user_id = 0
+        self._queued = ([], [], [], [])  # Timestamps, usernames, scores, label codes
+
+    def _user_id(self, username):
+        user_id = self._user_index.get(username)
+        if user_id is None:
+            if len(self._user_index) >= self.max_users:
+                self._user_index.clear()
+            user_id = self._user_index[username] = self._next_user_id
+            self._next_user_id += 1
+        return user_id
+
+    def add(self, timestamp, username, score, label_code):
+        """Count one scored message in every resolution"""
+        user_id = self._user_id(username)
+        for series in self.series.values():
+            series.add(timestamp, score, label_code, user_id)
+        self._track(timestamp, timestamp)
+        self.total += 1
+
+    def queue(self, timestamp, username, score, label_code):
+        """Queue one scored message, counted by the next ``flush()``
+
+        Much cheaper per message than ``add``, for writers that only need
+        the rollups once in a while (e.g. when publishing them).
+        """
+        timestamps, usernames, scores, label_codes = self._queued
+        timestamps.append(timestamp)
+        usernames.append(username)
+        scores.append(score)
+        label_codes.append(label_code)
+
+    def flush(self):
+        """Count the queued messages in one batch"""
+        queued, self._queued = self._queued, ([], [], [], [])
+        self.add_batch(*queued)
+
+    def _track(self, first, last):
+        self.first = first if self.first is None else min(self.first, first)
+        self.last = last if self.last is None else max(self.last, last)
+
+    def add_batch(self, timestamps, usernames, scores, label_codes):
+        """Count a batch of messages (Unix seconds and label codes)"""
+        if not len(timestamps):
+            return
+        timestamps = np.asarray(timestamps, dtype='float64')
+        scores = np.asarray(scores, dtype='float64')
+        label_codes = np.asarray(label_codes, dtype='int64')
+        user_ids = np.fromiter((self._user_id(name) for name in usernames), dtype='int64', count=len(timestamps))
+        valid = ~np.isnan(timestamps) & (label_codes >= 0)
+        if not valid.all():
+            timestamps, scores = timestamps[valid], np.nan_to_num(scores[valid])
+            label_codes, user_ids = label_codes[valid], user_ids[valid]
+            if not len(timestamps):
+                return
+        for series in self.series.values():
+            series.add_batch(timestamps, scores, label_codes, user_ids)
+        self._track(float(timestamps.min()), float(timestamps.max()))
+        self.total += len(timestamps)
+
+    def add_frame(self, df):
+        """Count the messages of a chat DataFrame (local-time timestamps)"""
+        import pandas as pd
+        if df.empty or not {'timestamp', 'sentiment_score', 'sentiment_label'} <= set(df.columns):
+            return
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            return
+        seconds = unix_seconds(df['timestamp'])
+        labels = pd.Categorical(df['sentiment_label'], categories=LABELS).codes
+        usernames = df['username'].astype(object).tolist() if 'username' in df else [None] * len(df)
+        self.add_batch(seconds, usernames, df['sentiment_score'].to_numpy(dtype='float64'), labels)
+
+    def frame(self, name, start=None):
+        return self.series[name].frame(start)
+
+    def choose(self, max_points=120):
+        """Finest resolution covering everything seen in ``max_points`` buckets or fewer"""
+        names = list(self.series)
+        if self.first is None:
+            return names[0]
+        span = self.last - self.first
+        for name, series in self.series.items():
+            if span < series.seconds * min(max_points, series.capacity):
+                return name
+        return names[-1]
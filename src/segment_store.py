@@ -0,0 +1,315 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from message_store import LABELS, LABEL_CODES, LOCAL_TZ
+
+# Default location of the on-disk chat history (repo-level data/ directory)
+DEFAULT_STORAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'history')
+
+SCHEMA = pa.schema([
+    ('timestamp', pa.float64()),  # Unix seconds
+    ('username', pa.dictionary(pa.int32(), pa.string())),
+    ('message', pa.string()),
+    ('sentiment_score', pa.float32()),
+    ('sentiment_label', pa.int8()),  # Code into LABELS
+])
+COLUMNS = SCHEMA.names
+
+# Metadata key of a compacted segment listing the segment files it replaced
+REPLACES_KEY = b'hype.replaces'
+
+
+def partition_for(timestamp):
+    """Hourly partition (relative directory) holding a timestamp, in UTC"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%d/%H')
+
+
+def _partition_start(partition):
+    return datetime.strptime(partition, '%Y%m%d/%H').replace(tzinfo=timezone.utc).timestamp()
+
+
+def segment_name(start, end, compacted=False):
+    """File name encoding the segment's time range in milliseconds"""
+    suffix = '-c' if compacted else ''
+    return f'seg-{int(start * 1000)}-{int(end * 1000) + 1}-{time.time_ns()}{suffix}.parquet'
+
+
+def parse_segment_name(name):
+    """Return (start, end, compacted) from a segment file name, or None"""
+    if not (name.startswith('seg-') and name.endswith('.parquet')):
+        return None
+    parts = name[4:-8].split('-')
+    if len(parts) < 3:
+        return None
+    return int(parts[0]) / 1000, int(parts[1]) / 1000, parts[-1] == 'c'
+
+
+class SegmentStore:
+    """Append-only on-disk chat history in compressed Parquet segments
+
+    Messages are buffered in memory per channel and flushed by a
+    background thread into ``<root>/<channel>/<YYYYMMDD>/<HH>/`` (UTC hour
+    partitions). Each segment's file name carries its time range, so
+    queries skip partitions and segments without opening them. Once an
+    hour is closed, its segments are compacted into one file, sorted by
+    time in row groups of ``row_group_rows`` so that queries (see
+    chat_query) can also skip row groups by their min/max timestamps.
+    A compacted segment lists the files it replaced in its metadata.
+    Only those are hidden from readers, and the next compaction deletes
+    any still left, so rows flushed late into a compacted hour stay
+    visible and get merged next time.
+    """
+
+    def __init__(self, root=None, flush_rows=5000, flush_interval=10.0,
+                 compact_min_segments=4, compression='zstd', row_group_rows=16384):
+        self.root = root or DEFAULT_STORAGE_DIR
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compact_min_segments = compact_min_segments
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+
+        self._buffers = {}  # channel -> dict of column lists
+        self._lock = threading.Lock()
+        self._batches = queue.Queue()
+        self._thread = None
+        self._stop = threading.Event()
+        self.segments_written = 0
+        self.segments_compacted = 0
+        self._replaces = {}  # Compacted segment path -> names of the files it replaced
+
+    def append(self, channel, timestamp, username, message, score, label):
+        """Buffer one scored message; never touches the disk"""
+        with self._lock:
+            buffer = self._buffers.get(channel)
+            if buffer is None:
+                buffer = self._buffers[channel] = {name: [] for name in COLUMNS}
+            buffer['timestamp'].append(timestamp)
+            buffer['username'].append(username)
+            buffer['message'].append(message)
+            buffer['sentiment_score'].append(score)
+            buffer['sentiment_label'].append(LABEL_CODES[label])
+            if len(buffer['timestamp']) >= self.flush_rows:
+                self._batches.put((channel, self._buffers.pop(channel)))
+
+    def flush(self):
+        """Hand every buffered message to the background writer"""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        for channel, buffer in buffers.items():
+            self._batches.put((channel, buffer))
+
+    def start(self):
+        """Start the background flush and compaction thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='segment-writer', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Flush everything and stop the background thread"""
+        self.flush()
+        if self._thread is not None:
+            self._stop.set()
+            self._batches.put(None)
+            self._thread.join()
+            self._thread = None
+        else:
+            self._drain()
+
+    def _run(self):
+        last_flush = last_compaction = time.monotonic()
+        while True:
+            try:
+                item = self._batches.get(timeout=1.0)
+            except queue.Empty:
+                item = False
+            if item is None:
+                self._drain()
+                return
+            if item:
+                self._write_batch(*item)
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = now
+            if now - last_compaction >= 60:
+                self.compact()
+                last_compaction = now
+
+    def _drain(self):
+        while True:
+            try:
+                item = self._batches.get_nowait()
+            except queue.Empty:
+                return
+            if item:
+                self._write_batch(*item)
+
+    def _write_batch(self, channel, buffer):
+        """Write a buffered batch, split into its hour partitions"""
+        if not buffer['timestamp']:
+            return
+        try:
+            table = pa.Table.from_pydict(buffer, schema=SCHEMA)
+            timestamps = np.asarray(buffer['timestamp'])
+            hours = np.floor(timestamps / 3600).astype('int64')
+            unique_hours = np.unique(hours)
+            for hour in unique_hours:
+                mask = hours == hour
+                part = table.filter(pa.array(mask)) if len(unique_hours) > 1 else table
+                part_ts = timestamps[mask]
+                self._write_segment(channel, partition_for(part_ts[0]), part, part_ts.min(), part_ts.max())
+        except Exception as e:
+            print(f"Error writing chat history for {channel}: {e}")
+
+    def _write_segment(self, channel, partition, table, start, end, compacted=False, replaces=()):
+        directory = os.path.join(self.root, channel, partition)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, segment_name(start, end, compacted))
+        if compacted:
+            table = table.replace_schema_metadata({REPLACES_KEY: json.dumps(sorted(replaces))})
+        tmp_path = path + '.tmp'
+        pq.write_table(table, tmp_path, compression=self.compression, row_group_size=self.row_group_rows)
+        os.replace(tmp_path, path)
+        self.segments_written += 1
+        return path
+
+    def compact(self):
+        """Merge the segments of closed hour partitions into one file"""
+        now = time.time()
+        for channel in self.channels():
+            for partition in self.partitions(channel):
+                # Leave room for rows of the hour that were still buffered
+                if _partition_start(partition) + 3600 + 2 * self.flush_interval > now:
+                    continue
+                try:
+                    segments, replaced = self._listing(channel, partition)
+                    # Files already merged (left over when a compaction stopped
+                    # before removing its inputs) only need deleting
+                    merged = [s for s in segments if os.path.basename(s[0]) in replaced]
+                    segments = [s for s in segments if os.path.basename(s[0]) not in replaced]
+                    small = sum(1 for s in segments if not s[3])
+                    if small == 0 or (small < self.compact_min_segments and small == len(segments)):
+                        self._remove(merged)
+                        continue
+                    table = pa.concat_tables([pq.read_table(s[0], schema=SCHEMA) for s in segments])
+                    table = table.sort_by('timestamp')
+                    start = min(s[1] for s in segments)
+                    end = max(s[2] for s in segments)
+                    replaces = replaced | {os.path.basename(s[0]) for s in segments}
+                    self._write_segment(channel, partition, table, start, end - 0.001, True, replaces)
+                    self._remove(segments + merged)
+                    self.segments_compacted += len(segments)
+                except Exception as e:
+                    print(f"Error compacting {channel}/{partition}: {e}")
+
+    def _remove(self, segments):
+        for path, *_ in segments:
+            os.remove(path)
+            self._replaces.pop(path, None)
+
+    # Reading
+
+    def channels(self):
+        """Channels with stored history"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def partitions(self, channel, start=None, end=None):
+        """Hour partitions of a channel that overlap [start, end)"""
+        base = os.path.join(self.root, channel)
+        if not os.path.isdir(base):
+            return []
+        found = []
+        for day in sorted(os.listdir(base)):
+            day_dir = os.path.join(base, day)
+            if not os.path.isdir(day_dir):
+                continue
+            for hour in sorted(os.listdir(day_dir)):
+                partition = f'{day}/{hour}'
+                try:
+                    first = _partition_start(partition)
+                except ValueError:
+                    continue
+                if (end is None or first < end) and (start is None or first + 3600 > start):
+                    found.append(partition)
+        return found
+
+    def _replaced_by(self, path):
+        """Names of the files a compacted segment replaced (cached: the file never changes)"""
+        replaces = self._replaces.get(path)
+        if replaces is None:
+            metadata = pq.read_schema(path).metadata or {}
+            replaces = self._replaces[path] = frozenset(json.loads(metadata.get(REPLACES_KEY, b'[]')))
+        return replaces
+
+    def _listing(self, channel, partition):
+        """Every segment file of a partition, and the names of the files compacted ones replaced"""
+        directory = os.path.join(self.root, channel, partition)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return [], frozenset()
+        found = []
+        replaced = set()
+        for name in names:
+            parsed = parse_segment_name(name)
+            if parsed is None:
+                continue
+            path = os.path.join(directory, name)
+            if parsed[2]:
+                try:
+                    replaced |= self._replaced_by(path)
+                except FileNotFoundError:
+                    continue  # Merged into a newer compacted segment meanwhile
+            found.append((path,) + parsed)
+        return found, frozenset(replaced)
+
+    def segments(self, channel, partition, start=None, end=None):
+        """(path, start, end, compacted) of the segments overlapping [start, end)
+
+        Files already merged into a compacted segment are skipped, so a
+        reader racing a compaction never sees rows twice.
+        """
+        found, replaced = self._listing(channel, partition)
+        return sorted(
+            (s for s in found
+             if os.path.basename(s[0]) not in replaced
+             and (end is None or s[1] < end) and (start is None or s[2] > start)),
+            key=lambda s: s[1]
+        )
+
+    def query(self, channel, start=None, end=None, columns=None):
+        """Messages of a channel in [start, end) as a DataFrame
+
+        Only the partitions, segments and row groups overlapping the range
+        are opened, and only the requested ``columns`` are read from them.
+        See chat_query.ChatQuery for user and label filters and streaming.
+        """
+        from chat_query import ChatQuery
+        return ChatQuery(self).frame(channel, start, end, columns=columns)
+
+
+def to_dataframe(table, channel, columns):
+    """Convert a stored table to the dashboard's DataFrame layout"""
+    df = table.to_pandas()
+    if 'timestamp' in df:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True).dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+        df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+    if 'sentiment_label' in df:
+        df['sentiment_label'] = pd.Categorical.from_codes(df['sentiment_label'].astype('int8'), categories=LABELS)
+    df = df[[column for column in columns if column in df]]
+    df['channel'] = channel
+    return df
@@ -0,0 +1,248 @@
+import asyncio
+from collections import OrderedDict, deque
+
+# Twitch appends this invisible tag character to bypass its duplicate-message
+# filter, so otherwise identical lines would miss the cache
+DUPLICATE_BYPASS_CHAR = '\U000e0000'
+
+
+def normalize_text(message):
+    """Normalize a chat line for cache lookups without changing its score"""
+    return ' '.join(message.replace(DUPLICATE_BYPASS_CHAR, '').split())
+
+
+def label_for(compound):
+    """Map a compound score to a sentiment label"""
+    if compound >= 0.05:
+        return 'positive'
+    if compound <= -0.05:
+        return 'negative'
+    return 'neutral'
+
+
+def vader_result(scores):
+    """Convert VADER polarity scores to the bot's sentiment dict"""
+    return {
+        'compound': scores['compound'],
+        'positive': scores['pos'],
+        'negative': scores['neg'],
+        'neutral': scores['neu'],
+        'label': label_for(scores['compound'])
+    }
+
+
+def _vader_analyzer():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+def _lexicon_analyzer():
+    from hype_lexicon import HypeLexiconAnalyzer
+    return HypeLexiconAnalyzer()
+
+
+# Scoring backends: VADER, or the emote-aware chat lexicon (several times
+# faster). Each is imported only when an analyzer is first built.
+SCORERS = {
+    'vader': _vader_analyzer,
+    'lexicon': _lexicon_analyzer,
+}
+
+
+def make_analyzer(scorer='vader'):
+    """Create the analyzer for a scorer name from SCORERS"""
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown scorer: {scorer} (expected one of {', '.join(SCORERS)})")
+    return SCORERS[scorer]()
+
+
+class SentimentEngine:
+    """Sentiment scoring with a bounded LRU cache keyed by normalized text
+
+    Chat is extremely repetitive (emote spam, "GG", copypastas), so most
+    lines are answered from the cache and only misses reach the analyzer
+    (VADER by default, see SCORERS). The returned dicts are shared with
+    the cache and must not be mutated. The analyzer is built on first use,
+    so it is never loaded when worker processes do all the scoring.
+    """
+
+    def __init__(self, cache_size=10000, analyzer=None, scorer='vader'):
+        if analyzer is None and scorer not in SCORERS:
+            raise ValueError(f"Unknown scorer: {scorer} (expected one of {', '.join(SCORERS)})")
+        self.scorer = scorer
+        self._analyzer = analyzer
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            self._analyzer = make_analyzer(self.scorer)
+        return self._analyzer
+
+    def score(self, message):
+        """Score a single message"""
+        return self.score_batch([message])[0]
+
+    def score_batch(self, messages):
+        """Score a batch of messages, running VADER only on cache misses"""
+        results, missing = self.lookup(messages)
+        if missing:
+            self.fill(results, missing, self.score_texts(list(missing)))
+        return results
+
+    def score_texts(self, texts):
+        """Run the analyzer on already normalized texts, bypassing the cache"""
+        return [vader_result(self.analyzer.polarity_scores(text)) for text in texts]
+
+    def lookup(self, messages):
+        """Answer a batch from the cache
+
+        Returns the per-message results (None for misses) and a dict mapping
+        each distinct missing normalized text to its positions in the batch.
+        """
+        cache = self.cache
+        results = [None] * len(messages)
+        missing = {}
+
+        for i, message in enumerate(messages):
+            key = normalize_text(message)
+            result = cache.get(key)
+            if result is not None:
+                cache.move_to_end(key)
+                results[i] = result
+                self.hits += 1
+            elif key in missing:
+                # Repeated within the batch: scored once
+                missing[key].append(i)
+                self.hits += 1
+            else:
+                missing[key] = [i]
+                self.misses += 1
+
+        return results, missing
+
+    def fill(self, results, missing, scored):
+        """Complete a lookup with scores for ``missing`` (in its key order)"""
+        cache = self.cache
+        for (key, positions), result in zip(missing.items(), scored):
+            for i in positions:
+                results[i] = result
+            cache[key] = result
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return results
+
+    def stats(self):
+        """Cache hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'cache_entries': len(self.cache)
+        }
+
+
+# Analyzers used by score_in_worker inside ProcessPoolExecutor workers
+_worker_analyzers = {}
+
+
+def score_in_worker(texts, scorer='vader'):
+    """Score normalized texts with the given scorer; runs in a worker process"""
+    analyzer = _worker_analyzers.get(scorer)
+    if analyzer is None:
+        analyzer = _worker_analyzers[scorer] = make_analyzer(scorer)
+    return [vader_result(analyzer.polarity_scores(text)) for text in texts]
+
+
+class MicroBatcher:
+    """Collects submitted messages and scores them in micro-batches
+
+    A batch is flushed once ``batch_size`` messages are pending or
+    ``max_delay`` seconds after its first message arrived, whichever
+    comes first. Cache misses are scored inline, or in ``executor`` (a
+    ProcessPoolExecutor) when one is given. ``on_result(item, sentiment)``
+    is called for each message in submission order even when batches
+    finish out of order. Submitting never blocks the caller; use
+    ``wait_ready`` to apply backpressure when too many batches are in
+    flight.
+    """
+
+    def __init__(self, engine, on_result, batch_size=64, max_delay=0.05,
+                 executor=None, max_in_flight=4):
+        self.engine = engine
+        self.on_result = on_result
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.pending = []  # (message, item)
+        self.in_flight = deque()  # (batch, results, missing, future or None)
+        self._timer = None
+        self._ready = None
+
+    def submit(self, message, item):
+        """Queue a message for scoring; ``item`` is passed back to on_result"""
+        self.pending.append((message, item))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+
+    def flush(self):
+        """Dispatch every pending message for scoring now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        results, missing = self.engine.lookup([message for message, _ in batch])
+
+        future = None
+        if missing and self.executor is not None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, score_in_worker, list(missing), self.engine.scorer)
+            future.add_done_callback(lambda _: self._deliver())
+        elif missing:
+            self.engine.fill(results, missing, self.engine.score_texts(list(missing)))
+
+        self.in_flight.append((batch, results, missing, future))
+        self._deliver()
+
+    def _deliver(self):
+        """Hand finished batches to on_result, oldest first"""
+        while self.in_flight:
+            batch, results, missing, future = self.in_flight[0]
+            if future is not None:
+                if not future.done():
+                    break
+                try:
+                    self.engine.fill(results, missing, future.result())
+                except Exception as e:
+                    print(f"Error scoring batch of {len(batch)} messages: {e}")
+                    self.in_flight.popleft()
+                    continue
+            self.in_flight.popleft()
+            for (_, item), sentiment in zip(batch, results):
+                self.on_result(item, sentiment)
+
+        if self._ready is not None and len(self.in_flight) < self.max_in_flight:
+            self._ready.set()
+
+    async def wait_ready(self):
+        """Wait until fewer than ``max_in_flight`` batches are being scored"""
+        while len(self.in_flight) >= self.max_in_flight:
+            self._ready = asyncio.Event()
+            await self._ready.wait()
+
+    async def drain(self):
+        """Flush pending messages and wait for every batch to be delivered"""
+        self.flush()
+        while self.in_flight:
+            future = self.in_flight[0][3]
+            await asyncio.wait([future])
+            self._deliver()
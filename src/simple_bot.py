@@ -1,182 +1,131 @@
-import asyncio
-import websockets
-import json
-import ssl
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-import pandas as pd
-from datetime import datetime
+import time
+from chat_bot import ChatBot
+from hype_metrics import DEFAULT_WINDOWS
+from irc_parser import TWITCH_IRC_URI
+from connection import TwitchConnection, GapTracker
+from live_feed import LiveFeedWriter
 
-class SimpleTwitchBot:
-    def __init__(self, channel='ninja'):
-        self.channel = channel.lower()
-        self.nickname = "justinfan12345"  # Anonymous viewer
-        self.running = False
+class SimpleTwitchBot(ChatBot):
+    """One channel read over its own IRC connection"""
+    
+    def __init__(self, channel='ninja', history_size=1000, windows=DEFAULT_WINDOWS,
+                 cache_size=10000, scorer='vader', batch_size=64, batch_delay=0.05,
+                 workers=0, queue_size=10000, overflow='block',
+                 status_interval=1.0, echo_every=1, live_feed=True, feed_dir=None,
+                 archive=False, storage_dir=None, dedup_window=10.0, uri=TWITCH_IRC_URI,
+                 metrics_port=None, profile=False, half_lives=None, exports=None):
+        super().__init__(
+            history_size=history_size, windows=windows, cache_size=cache_size, scorer=scorer,
+            batch_size=batch_size, batch_delay=batch_delay, workers=workers, queue_size=queue_size,
+            overflow=overflow, status_interval=status_interval, echo_every=echo_every,
+            live_feed=live_feed, archive=archive, storage_dir=storage_dir, dedup_window=dedup_window,
+            metrics_port=metrics_port, profile=profile, half_lives=half_lives, exports=exports
+        )
+        self.channel = channel.lower().lstrip('#')
+        self.uri = uri  # Twitch IRC, or a local replay server for benchmarks
+        
+        # Managed IRC connection: answers PINGs, backs off, records gaps
+        self.connection = TwitchConnection(
+            self.ingest.put, self.join, self.nickname, uri, name=self.channel, gaps=GapTracker()
+        )
         
-        # Initialize sentiment analyzer
-        self.analyzer = SentimentIntensityAnalyzer()
+        # Message store, hype metrics, spikes, dedup, and the live feed for
+        # the dashboard (memory-mapped ring file) with its rollups
+        feed = LiveFeedWriter(self.channel, feed_dir=feed_dir) if live_feed else None
+        self.state = self.states[self.channel] = self.new_state(self.channel, self.connection, feed)
+        self.store = self.state.store
+        self.gaps = self.state.gaps
+        self.hype = self.state.hype
+        self.spikes = self.state.spikes
+        self.dedup = self.state.dedup
+        self.feed = self.state.feed
+        self.rollups = self.state.rollups
         
-        # Initialize data storage
-        self.messages_df = pd.DataFrame(columns=[
-            'timestamp', 'username', 'message', 'sentiment_score', 
-            'sentiment_label', 'channel'
-        ])
+        self._last_total = 0
+        if self.instrumentation is not None:
+            self.instrument()
         print(f"Initialized sentiment analyzer and data storage for {self.channel}")
         
     async def connect(self):
-        """Connect to Twitch IRC using websockets"""
-        uri = "wss://irc-ws.chat.twitch.tv:443"
-        
-        while self.running:
-            try:
-                print(f"Attempting to connect to {uri}...")
-                async with websockets.connect(uri) as websocket:
-                    print(f"Connected to Twitch IRC for channel: {self.channel}")
-                    
-                    # Send authentication and join commands
-                    print("Sending authentication...")
-                    await websocket.send("PASS SCHMOOPIIE")  # Anonymous password
-                    await websocket.send(f"NICK {self.nickname}")
-                    await websocket.send(f"USER {self.nickname} 8 * :{self.nickname}")
-                    
-                    # Wait a moment for authentication
-                    await asyncio.sleep(1)
-                    
-                    print(f"Joining #{self.channel}...")
-                    await websocket.send(f"JOIN #{self.channel}")
-                    
-                    print(f"Joined #{self.channel}")
-                    
-                    # Listen for messages
-                    while self.running:
-                        try:
-                            message = await asyncio.wait_for(websocket.recv(), timeout=300)
-                            await self.handle_message(message)
-                        except asyncio.TimeoutError:
-                            # Send PING to keep connection alive
-                            await websocket.send("PING :tmi.twitch.tv")
-                        except websockets.exceptions.ConnectionClosed:
-                            print("Connection closed, attempting to reconnect...")
-                            break
-                            
-            except Exception as e:
-                print(f"Connection error: {e}")
-                if self.running:
-                    print("Retrying in 5 seconds...")
-                    await asyncio.sleep(5)
+        """Stay connected to Twitch IRC, reconnecting with backoff"""
+        await self.connection.run()
+    
+    async def join(self, connection):
+        """JOIN the channel once the server has welcomed us"""
+        print(f"Joining #{self.channel}...")
+        await connection.send(f"JOIN #{self.channel}")
+        print(f"Joined #{self.channel}")
             
+    def instrument(self):
+        """Time the hot-path stages and expose the bot's gauges"""
+        super().instrument()
+        timed = self.instrumentation.timed
+        self.analyze_sentiment = timed('analyze_sentiment', self.analyze_sentiment)
+        self.get_hype_index = timed('get_hype_index', self.get_hype_index)
+    
     def analyze_sentiment(self, message):
-        """Analyze sentiment of a message using VADER"""
-        scores = self.analyzer.polarity_scores(message)
-        
-        # Determine sentiment label
-        if scores['compound'] >= 0.05:
-            label = 'positive'
-        elif scores['compound'] <= -0.05:
-            label = 'negative'
-        else:
-            label = 'neutral'
-            
-        return {
-            'compound': scores['compound'],
-            'positive': scores['pos'],
-            'negative': scores['neg'],
-            'neutral': scores['neu'],
-            'label': label
-        }
+        """Analyze sentiment of a message using VADER (cached)"""
+        return self.sentiment.score(message)
     
-    def store_message(self, username, message, sentiment_data):
-        """Store message and sentiment data in DataFrame"""
-        new_row = {
-            'timestamp': datetime.now(),
-            'username': username,
-            'message': message,
-            'sentiment_score': sentiment_data['compound'],
-            'sentiment_label': sentiment_data['label'],
-            'channel': self.channel
-        }
-        
-        self.messages_df = pd.concat([self.messages_df, pd.DataFrame([new_row])], ignore_index=True)
-        
-        # Keep only last 1000 messages to manage memory
-        if len(self.messages_df) > 1000:
-            self.messages_df = self.messages_df.tail(1000)
+    def store_message(self, username, message, sentiment_data, timestamp=None):
+        """Store message and sentiment data in the ring buffer"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.state.store_message(timestamp, username, message, sentiment_data)
     
-    def get_hype_metrics(self):
-        """Calculate current hype metrics"""
-        if len(self.messages_df) == 0:
-            return {'hype_score': 0, 'message_count': 0, 'sentiment_breakdown': {}}
-        
-        # Recent messages (last 50)
-        recent_messages = self.messages_df.tail(50)
-        
-        # Calculate hype score (average sentiment)
-        hype_score = recent_messages['sentiment_score'].mean()
-        
-        # Sentiment breakdown
-        sentiment_counts = recent_messages['sentiment_label'].value_counts().to_dict()
-        
-        return {
-            'hype_score': round(hype_score, 3),
-            'message_count': len(recent_messages),
-            'sentiment_breakdown': sentiment_counts
-        }
+    @property
+    def messages_df(self):
+        """Stored messages as a DataFrame (built on demand)"""
+        return self.store.to_dataframe()
     
-    async def handle_message(self, raw_message):
-        """Parse and handle IRC messages"""
-        if raw_message.startswith("PING"):
-            return  # Ignore PING messages
-            
-        # Parse PRIVMSG (chat messages)
-        if "PRIVMSG" in raw_message:
-            try:
-                # Extract username and message content
-                parts = raw_message.split("PRIVMSG")
-                if len(parts) > 1:
-                    user_part = parts[0]
-                    message_part = parts[1]
-                    
-                    # Extract username
-                    username = user_part.split(":")[1].split("!")[0].strip()
-                    
-                    # Extract message content
-                    message_content = message_part.split(":", 1)[1].strip()
-                    
-                    # Analyze sentiment
-                    sentiment = self.analyze_sentiment(message_content)
-                    
-                    # Store message
-                    self.store_message(username, message_content, sentiment)
-                    
-                    # Get current hype metrics
-                    metrics = self.get_hype_metrics()
-                    
-                    # Display with sentiment info
-                    sentiment_emoji = {
-                        'positive': '😊',
-                        'negative': '😠', 
-                        'neutral': '😐'
-                    }
-                    
-                    print(f"[{self.channel}] {username}: {message_content} {sentiment_emoji[sentiment['label']]} ({sentiment['compound']:.2f})")
-                    print(f"📊 Current Hype: {metrics['hype_score']:.2f} | Messages: {metrics['message_count']} | {metrics['sentiment_breakdown']}")
-                    print("-" * 80)
-                    
-            except Exception as e:
-                print(f"Error parsing message: {e}")
+    def get_hype_metrics(self, window=None):
+        """Current hype metrics for one rolling window (the first configured one by default)"""
+        return self.state.get_hype_metrics(window)
+    
+    def get_hype_index(self):
+        """Time-decayed hype index blending sentiment and chat velocity"""
+        return self.hype.hype_index(now=time.time())
+    
+    def get_window_metrics(self):
+        """Current hype metrics for every configured window"""
+        return self.hype.all_metrics(now=time.time())
+    
+    def get_snapshot(self):
+        """Metrics snapshot published to the live feed"""
+        return self.snapshot(self.state)
+    
+    def render_status(self):
+        """Status lines shown by the reporter every interval"""
+        metrics = self.get_hype_metrics(self.hype.window_name('last_50'))
+        hype = self.get_hype_index()
+        total = self.store.total
+        rate = (total - self._last_total) / self.reporter.interval
+        self._last_total = total
+        queue = self.ingest.stats()
+        spam = f" | Spam: {self.dedup.spam_intensity(time.time()):.0%}" if self.dedup is not None else ""
+        gaps = f" | Gaps: {len(self.gaps.gaps)} ({self.gaps.total_seconds:.0f}s)" if self.gaps.gaps else ""
+        lines = [
+            f"📊 Current Hype: {hype['hype_index']:+.2f} (sentiment {hype['sentiment']:+.2f}, {hype['velocity']:.1f}x usual rate) | Last {metrics['message_count']}: {metrics['sentiment_breakdown']}",
+            f"⚡ {rate:.1f} msg/s | Queue: {queue['depth']} | Dropped: {queue['dropped']} | Cache hit rate: {self.sentiment.stats()['hit_rate']:.0%}{spam}{gaps}"
+        ]
+        if self.instrumentation is not None:
+            lines.append(self.instrumentation.summary())
+        lines.append("-" * 80)
+        return lines
+    
+    async def run_connections(self):
+        """Read the channel until the connection is stopped"""
+        try:
+            await self.connect()
+        finally:
+            self.connection.running = False
                 
     async def start(self):
         """Start the bot"""
         print(f"Starting Simple Twitch Bot for channel: {self.channel}")
-        self.running = True
-        await self.connect()
+        await super().start()
 
 if __name__ == "__main__":
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    bot = SimpleTwitchBot(channel='otplol')
-    try:
-        loop.run_until_complete(bot.start())
-    except KeyboardInterrupt:
-        print("\nBot stopped by user")
-        bot.running = False
+    # Same flags as bot_cli.py, e.g. python src/simple_bot.py xqc --scorer lexicon
+    from bot_cli import main
+    main(default_channels=['otplol'])
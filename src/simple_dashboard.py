@@ -4,9 +4,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime
-import json
 import numpy as np
-import time
+from html import escape
+from live_feed import LiveFeedReader
+from message_store import MessageStore, LOCAL_TZ
+from dataset_cache import DatasetCache, typed_frame
+from chat_import import StreamingImport
+from chat_query import ChatQuery
+from rollups import Rollups, ROLLUP_RESOLUTIONS
+from hype_metrics import ChatterMetrics, DecayedHype
 
 # Page configuration
 st.set_page_config(
@@ -207,6 +213,322 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_dataset_cache():
+    """Parsed uploads shared by all viewers, keyed by content hash"""
+    return DatasetCache(max_bytes=256 * 1024 * 1024)
+
+
+def load_upload(uploaded_file):
+    """Parse an uploaded JSON file once; reruns reuse the cached frame"""
+    return get_dataset_cache().get_or_load(uploaded_file.getvalue())
+
+
+# Logs in these formats are imported incrementally instead of all at once
+STREAMING_EXTENSIONS = ('.ndjson', '.jsonl', '.gz')
+
+# Time spent importing per refresh, so the page stays responsive
+IMPORT_STEP_SECONDS = 0.5
+
+
+def get_importer(source, key, name=None):
+    """This viewer's streaming import for ``source``, started on first use"""
+    importer = st.session_state.get('importer')
+    if importer is None or st.session_state.get('importer_key') != key:
+        if importer is not None:
+            importer.close()
+        importer = StreamingImport(source, name=name)
+        st.session_state.importer = importer
+        st.session_state.importer_key = key
+    return importer
+
+
+# Time ranges offered for the bot's stored history, in seconds
+HISTORY_RANGES = {'Last 15 minutes': 900, 'Last hour': 3600, 'Last 6 hours': 21600, 'Last 24 hours': 86400}
+HISTORY_COLUMNS = ['timestamp', 'username', 'message', 'sentiment_score', 'sentiment_label']
+
+
+@st.cache_resource
+def get_chat_query():
+    """Indexed reader for the chat history the bot persists to disk (segment indexes shared by all viewers)"""
+    return ChatQuery()
+
+
+@st.cache_data(ttl=30, max_entries=16, show_spinner=False)
+def load_history(channel, seconds, users=None, labels=None):
+    """Stored messages of a channel from the last ``seconds`` seconds
+
+    Only the segments and row groups overlapping the range are read, and
+    with ``users`` only the rows of those chatters (see ChatQuery).
+    """
+    start = datetime.now().timestamp() - seconds
+    return get_chat_query().frame(channel, start, users=users, labels=labels, columns=HISTORY_COLUMNS)
+
+
+def parse_usernames(text):
+    """``user1, User2`` -> ('user1', 'user2'), or None for no filter"""
+    users = tuple(sorted({name.strip().lower() for name in text.split(',') if name.strip()}))
+    return users or None
+
+
+# Messages kept per viewer from the bot's live feed
+LIVE_HISTORY_SIZE = 5000
+
+
+def read_live_feed(channel):
+    """Pull the messages the bot published since this viewer's last refresh"""
+    live = st.session_state.get('live')
+    if live is None or live['channel'] != channel:
+        if live is not None:
+            live['reader'].close()
+        live = {
+            'channel': channel,
+            'reader': LiveFeedReader(channel),
+            'store': MessageStore(channel, LIVE_HISTORY_SIZE),
+            'chatters': ChatterMetrics(),
+            'cursor': 0,
+            'generation': None
+        }
+        st.session_state.live = live
+
+    columns, cursor, generation, _ = live['reader'].poll(live['cursor'], live['generation'])
+    if generation != live['generation']:
+        # Bot restarted: start over with its new feed
+        live['store'] = MessageStore(channel, LIVE_HISTORY_SIZE)
+        live['chatters'] = ChatterMetrics()
+    live['cursor'], live['generation'] = cursor, generation
+    if columns is not None and len(columns['timestamp']):
+        live['store'].extend(
+            columns['timestamp'], columns['username'], columns['message'],
+            columns['score'], columns['label']
+        )
+        live['chatters'].add_batch(columns['timestamp'], columns['username'], columns['message'])
+    return live
+
+
+def get_static_metrics(df, key):
+    """Rollups, chatter sketches and decayed hype of an uploaded, stored or sample dataset, built once per dataset"""
+    cached = st.session_state.get('static_metrics')
+    if cached is None or cached[0] != key:
+        rollups = Rollups()
+        rollups.add_frame(df)
+        chatters = ChatterMetrics()
+        chatters.add_frame(df)
+        hype = DecayedHype()
+        hype.add_frame(df)
+        cached = st.session_state.static_metrics = (key, rollups, chatters, hype)
+    return cached[1:]
+
+
+def gap_spans(snapshot):
+    """The bot's recent disconnects as (start, end) local timestamps"""
+    recent = (snapshot or {}).get('connection', {}).get('recent', [])
+    if not recent:
+        return []
+    bounds = pd.to_datetime(np.array(recent).ravel(), unit='s', utc=True).tz_convert(LOCAL_TZ).tz_localize(None)
+    return list(zip(bounds[::2], bounds[1::2]))
+
+
+def break_at_gaps(points, column, gaps):
+    """x and y lists with a blank point inside each gap, so lines do not bridge it"""
+    if not gaps:
+        return points['timestamp'].tolist(), points[column].tolist()
+    breaks = pd.DataFrame({'timestamp': [start + (end - start) / 2 for start, end in gaps], column: np.nan})
+    points = pd.concat([points[['timestamp', column]], breaks]).sort_values('timestamp', kind='stable')
+    return points['timestamp'].tolist(), [None if pd.isna(value) else value for value in points[column]]
+
+
+# Chart colors per sentiment label (Twitch green, red, purple)
+SENTIMENT_COLORS = {'positive': '#00f89a', 'negative': '#eb0400', 'neutral': '#772ce8'}
+SENTIMENT_ORDER = ['positive', 'negative', 'neutral']
+
+
+def build_pie_figure():
+    """Sentiment distribution donut; data is filled in by update_figures"""
+    fig = go.Figure(data=[
+        go.Pie(
+            labels=[label.capitalize() for label in SENTIMENT_ORDER],
+            values=[0, 0, 0],
+            hole=0.4,
+            marker_colors=[SENTIMENT_COLORS[label] for label in SENTIMENT_ORDER],
+            sort=False,
+            textinfo='label+percent',
+            textposition='auto',
+            showlegend=True,
+            hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>',
+            pull=[0.05, 0, 0]  # Pull out the positive slice
+        )
+    ])
+    
+    fig.update_layout(
+        title={
+            'text': 'Sentiment Breakdown',
+            'x': 0.5,
+            'font': {'size': 16, 'color': '#efeff1'}
+        },
+        font=dict(size=12, color='#efeff1'),
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            font=dict(color='#efeff1')
+        ),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def build_timeline_figure():
+    """Sentiment score over time, one trace per label"""
+    fig = go.Figure()
+    
+    for sentiment in SENTIMENT_ORDER:
+        fig.add_trace(go.Scatter(
+            x=[],
+            y=[],
+            mode='lines+markers',
+            name=sentiment.capitalize(),
+            line=dict(color=SENTIMENT_COLORS[sentiment], width=3),
+            marker=dict(size=6, color=SENTIMENT_COLORS[sentiment]),
+            hovertemplate='<b>%{fullData.name}</b><br>Time: %{x}<br>Score: %{y:.2f}<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        title={
+            'text': 'Sentiment Score Over Time',
+            'x': 0.5,
+            'font': {'size': 16, 'color': '#efeff1'}
+        },
+        xaxis_title='Time',
+        yaxis_title='Sentiment Score',
+        xaxis=dict(
+            tickangle=-45,
+            title_font=dict(size=12, color='#efeff1'),
+            tickfont=dict(color='#efeff1'),
+            gridcolor='rgba(255,255,255,0.1)'
+        ),
+        yaxis=dict(
+            title_font=dict(size=12, color='#efeff1'),
+            tickfont=dict(color='#efeff1'),
+            range=[-1, 1],
+            gridcolor='rgba(255,255,255,0.1)'
+        ),
+        font=dict(size=10, color='#efeff1'),
+        hovermode='x unified',
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            font=dict(color='#efeff1')
+        ),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def build_activity_figure():
+    """Messages per hour of day"""
+    fig = go.Figure(data=[
+        go.Bar(
+            x=[],
+            y=[],
+            marker=dict(
+                color=[],
+                colorscale=['#772ce8', '#9146ff', '#a855f7']  # Twitch purple gradient
+            ),
+            hovertemplate='Hour: %{x}<br>Messages: %{y}<extra></extra>'
+        )
+    ])
+    
+    fig.update_layout(
+        height=250,
+        title='Messages by Hour',
+        showlegend=False,
+        xaxis_title='Hour of Day',
+        yaxis_title='Message Count',
+        font=dict(color='#efeff1'),
+        xaxis=dict(
+            tickfont=dict(color='#efeff1'),
+            title_font=dict(color='#efeff1'),
+            gridcolor='rgba(255,255,255,0.1)'
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#efeff1'),
+            title_font=dict(color='#efeff1'),
+            gridcolor='rgba(255,255,255,0.1)'
+        ),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def build_trend_figure():
+    """Average sentiment per 5-minute interval"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines+markers',
+        name='Sentiment Momentum',
+        line=dict(color='#9146ff', width=3),
+        fill='tonexty',
+        fillcolor='rgba(145, 70, 255, 0.2)',
+        marker=dict(size=6, color='#9146ff')
+    ))
+    
+    fig.update_layout(
+        height=250,
+        title='Sentiment Momentum (5-min intervals)',
+        xaxis_title='Time',
+        yaxis_title='Average Sentiment',
+        showlegend=False,
+        font=dict(color='#efeff1'),
+        xaxis=dict(
+            tickfont=dict(color='#efeff1'),
+            title_font=dict(color='#efeff1'),
+            gridcolor='rgba(255,255,255,0.1)'
+        ),
+        yaxis=dict(
+            range=[-1, 1],
+            tickfont=dict(color='#efeff1'),
+            title_font=dict(color='#efeff1'),
+            gridcolor='rgba(255,255,255,0.1)'
+        ),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+FIGURE_BUILDERS = {
+    'pie': build_pie_figure,
+    'timeline': build_timeline_figure,
+    'activity': build_activity_figure,
+    'trend': build_trend_figure
+}
+
+
+def get_figure(name):
+    """Return this viewer's figure, building it on first use
+
+    Figures are kept in session state and only their trace data is
+    replaced on refresh, so layouts and styling are built once.
+    """
+    figures = st.session_state.setdefault('figures', {})
+    if name not in figures:
+        figures[name] = FIGURE_BUILDERS[name]()
+    return figures[name]
+
+
 # Professional Header
 st.markdown("""
 <div class="dashboard-header fade-in">
@@ -241,6 +563,14 @@ with st.sidebar:
         
         # Auto-refresh toggle
         auto_refresh = st.checkbox('🔄 Auto-refresh', value=True, help='Automatically refresh dashboard data')
+        
+        # Timeline bucket size
+        timeline_resolution = st.selectbox(
+            '📏 Timeline Resolution',
+            ['Auto'] + [name for name, _, _ in ROLLUP_RESOLUTIONS],
+            index=0,
+            help='Bucket size of the sentiment timeline; Auto picks one that fits the data'
+        )
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -251,18 +581,49 @@ with st.sidebar:
         # File Upload
         st.markdown('#### 📤 Import Data')
         uploaded_file = st.file_uploader(
-            'Upload JSON chat data',
-            type=['json'],
-            help='Upload a JSON file with chat data for analysis'
+            'Upload chat data',
+            type=['json', 'ndjson', 'jsonl', 'gz'],
+            help='Upload a JSON array, or newline-delimited JSON (optionally gzip-compressed) for large chat logs'
+        )
+        log_path = st.text_input(
+            '📂 Or stream a local log file',
+            help='Path to an NDJSON or .gz chat log on this machine; imported in chunks'
         )
         
-        if uploaded_file is not None:
-            st.success(f'✅ File uploaded: {uploaded_file.name}')
-            try:
-                data = json.loads(uploaded_file.read().decode('utf-8'))
-                st.info(f'📊 Loaded {len(data)} messages')
-            except Exception as e:
-                st.error(f'❌ Error loading file: {e}')
+        importer = None
+        try:
+            if uploaded_file is not None and uploaded_file.name.endswith(STREAMING_EXTENSIONS):
+                st.success(f'✅ File uploaded: {uploaded_file.name}')
+                importer = get_importer(uploaded_file, uploaded_file.file_id)
+            elif log_path:
+                importer = get_importer(log_path, log_path)
+            elif uploaded_file is not None:
+                st.success(f'✅ File uploaded: {uploaded_file.name}')
+                st.info(f'📊 Loaded {len(load_upload(uploaded_file))} messages')
+        except Exception as e:
+            st.error(f'❌ Error loading file: {e}')
+        
+        if importer is not None:
+            st.info(f'📊 Streaming import of {importer.name}')
+        elif 'importer' in st.session_state:
+            st.session_state.importer.close()
+            del st.session_state.importer
+        
+        # Stored History
+        st.markdown('#### 🗄️ Stored History')
+        use_history = st.checkbox(
+            'Load stored history',
+            value=False,
+            help='Chat history the bot saved to disk (run it with --sinks feed,archive), read only for the selected time range'
+        )
+        history_range = st.selectbox('Time range', list(HISTORY_RANGES), index=1, disabled=not use_history)
+        history_users = parse_usernames(st.text_input(
+            'Chatters', disabled=not use_history, placeholder='all',
+            help='Comma-separated usernames; only their messages are read'
+        ))
+        history_labels = tuple(st.multiselect(
+            'Sentiment', ['positive', 'neutral', 'negative'], disabled=not use_history, placeholder='all'
+        )) or None
         
         # Sample Data Generator
         st.markdown('#### 🎲 Sample Data')
@@ -278,16 +639,26 @@ with st.sidebar:
     st.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
     
     with st.expander("📊 System Status", expanded=True):
-        # Connection Status
-        st.markdown("""
-        <div style="padding: 10px; background: #1f1f23; border-radius: 8px; margin: 10px 0; border: 1px solid #772ce8;">
-            <span class="status-indicator status-online"></span>
-            <strong style="color: #efeff1;">Bot Status:</strong> <span style="color: #00f89a;">Online</span>
-        </div>
-        """, unsafe_allow_html=True)
+        # Connection Status (from the live feed heartbeat)
+        live = read_live_feed(channel)
+        bot_online = live['reader'].is_alive()
+        if bot_online:
+            st.markdown("""
+            <div style="padding: 10px; background: #1f1f23; border-radius: 8px; margin: 10px 0; border: 1px solid #772ce8;">
+                <span class="status-indicator status-online"></span>
+                <strong style="color: #efeff1;">Bot Status:</strong> <span style="color: #00f89a;">Online</span>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown("""
+            <div style="padding: 10px; background: #1f1f23; border-radius: 8px; margin: 10px 0; border: 1px solid #eb0400;">
+                <span class="status-indicator status-offline"></span>
+                <strong style="color: #efeff1;">Bot Status:</strong> <span style="color: #eb0400;">Offline</span>
+            </div>
+            """, unsafe_allow_html=True)
         
         # Data Status
-        if 'sample_data' in st.session_state or uploaded_file is not None:
+        if 'sample_data' in st.session_state or uploaded_file is not None or importer is not None or use_history or len(live['store']) > 0:
             st.markdown("""
             <div style="padding: 10px; background: #1f1f23; border-radius: 8px; margin: 10px 0; border: 1px solid #00f89a;">
                 <span class="status-indicator status-online"></span>
@@ -302,10 +673,21 @@ with st.sidebar:
             </div>
             """, unsafe_allow_html=True)
         
+        # Copypasta / emote-wall share reported by the bot's dedup stage
+        snapshot = live['reader'].snapshot() if bot_online else None
+        if snapshot and 'spam' in snapshot:
+            spam = snapshot['spam']
+            st.markdown(f"""
+            <div style="padding: 10px; background: #1f1f23; border-radius: 8px; margin: 10px 0; border: 1px solid #772ce8;">
+                <strong style="color: #efeff1;">Spam Intensity:</strong> <span style="color: #9146ff;">{spam['spam_intensity']:.0%}</span>
+                <span style="color: #adadb8; font-size: 0.8rem;">({spam['duplicates']:,} repeats collapsed)</span>
+            </div>
+            """, unsafe_allow_html=True)
+        
         # Channel Info
         st.markdown(f"""
         <div style="padding: 10px; background: #1f1f23; border-radius: 8px; margin: 10px 0; border: 1px solid #9146ff;">
-            <strong style="color: #efeff1;">Current Channel:</strong> <span style="color: #9146ff;">{channel}</span>
+            <strong style="color: #efeff1;">Current Channel:</strong> <span style="color: #9146ff;">{escape(channel)}</span>
         </div>
         """, unsafe_allow_html=True)
     
@@ -344,6 +726,7 @@ if generate_sample:
         })
     
     st.session_state.sample_data = sample_data
+    st.session_state.sample_id = datetime.now().timestamp()
     st.success('📊 Sample data generated successfully!')
     st.rerun()
 
@@ -355,367 +738,35 @@ if clear_data:
     st.rerun()
 
 # Main Content Area
-if 'sample_data' in st.session_state or uploaded_file is not None:
-    # Load data
+def load_static_data():
+    """Uploaded, stored or sample data for this run and a key identifying it"""
+    if importer is not None:
+        return None, None
     if uploaded_file is not None:
         try:
-            data = json.loads(uploaded_file.read().decode('utf-8'))
-            df = pd.DataFrame(data)
+            return load_upload(uploaded_file), ('upload', uploaded_file.file_id)
         except Exception as e:
             st.error(f"Error loading file: {e}")
-            df = pd.DataFrame()
-    else:
-        df = pd.DataFrame(st.session_state.sample_data)
-    
-    if not df.empty:
-        # Calculate metrics
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        recent_df = df.tail(100)  # Last 100 messages
-        
-        # Calculate advanced metrics
-        avg_sentiment = recent_df['sentiment_score'].mean()
-        message_count = len(recent_df)
-        sentiment_counts = recent_df['sentiment_label'].value_counts()
-        
-        # Calculate additional metrics
-        positive_ratio = sentiment_counts.get('positive', 0) / message_count * 100
-        engagement_rate = message_count / 100  # Messages per minute (assuming 100 min window)
-        top_sentiment = sentiment_counts.index[0] if len(sentiment_counts) > 0 else 'neutral'
-        
-        # Professional KPI Cards
-        st.markdown('<div class="section-header">📊 Key Performance Indicators</div>', unsafe_allow_html=True)
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="metric-container fade-in">
-                <p class="metric-value">{avg_sentiment:.2f}</p>
-                <p class="metric-label">Hype Score</p>
-                <p class="metric-change positive-change">↑ {avg_sentiment:+.2f} vs last hour</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div class="metric-container fade-in">
-                <p class="metric-value">{message_count}</p>
-                <p class="metric-label">Messages</p>
-                <p class="metric-change positive-change">↑ {min(25, message_count//4)}% increase</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            trend_class = 'positive-change' if positive_ratio > 50 else 'negative-change'
-            trend_text = 'Above average' if positive_ratio > 50 else 'Below average'
-            st.markdown(f"""
-            <div class="metric-container fade-in">
-                <p class="metric-value">{positive_ratio:.1f}%</p>
-                <p class="metric-label">Positive Ratio</p>
-                <p class="metric-change {trend_class}">↑ {trend_text}</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown(f"""
-            <div class="metric-container fade-in">
-                <p class="metric-value">{engagement_rate:.1f}</p>
-                <p class="metric-label">Engagement Rate</p>
-                <p class="metric-change positive-change">↑ High activity</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Analytics Section
-        st.markdown('<div class="section-header">📈 Advanced Analytics</div>', unsafe_allow_html=True)
-        
-        chart_col1, chart_col2 = st.columns(2)
-        
-        with chart_col1:
-            st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
-            st.markdown('#### 🎯 Sentiment Distribution')
-            
-            # Enhanced pie chart with Twitch colors
-            fig_pie = go.Figure(data=[
-                go.Pie(
-                    labels=sentiment_counts.index,
-                    values=sentiment_counts.values,
-                    hole=0.4,
-                    marker_colors=['#00f89a', '#eb0400', '#772ce8'],  # Twitch green, red, purple
-                    textinfo='label+percent',
-                    textposition='auto',
-                    showlegend=True,
-                    hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>',
-                    pull=[0.05, 0, 0]  # Pull out the largest slice
-                )
-            ])
-            
-            fig_pie.update_layout(
-                title={
-                    'text': 'Sentiment Breakdown',
-                    'x': 0.5,
-                    'font': {'size': 16, 'color': '#efeff1'}
-                },
-                font=dict(size=12, color='#efeff1'),
-                showlegend=True,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1,
-                    font=dict(color='#efeff1')
-                ),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)'
-            )
-            
-            st.plotly_chart(fig_pie, use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with chart_col2:
-            st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
-            st.markdown('#### 📊 Sentiment Timeline')
-            
-            if len(df) > 0:
-                recent_df['time'] = recent_df['timestamp'].dt.strftime('%H:%M:%S')
-                
-                # Enhanced line chart with Twitch colors
-                fig_timeline = go.Figure()
-                
-                for sentiment in ['positive', 'negative', 'neutral']:
-                    sentiment_data = recent_df[recent_df['sentiment_label'] == sentiment]
-                    if not sentiment_data.empty:
-                        fig_timeline.add_trace(go.Scatter(
-                            x=sentiment_data['time'],
-                            y=sentiment_data['sentiment_score'],
-                            mode='lines+markers',
-                            name=sentiment.capitalize(),
-                            line=dict(
-                                color={'positive': '#00f89a', 'negative': '#eb0400', 'neutral': '#772ce8'}[sentiment],
-                                width=3
-                            ),
-                            marker=dict(
-                                size=6,
-                                color={'positive': '#00f89a', 'negative': '#eb0400', 'neutral': '#772ce8'}[sentiment]
-                            ),
-                            hovertemplate='<b>%{fullData.name}</b><br>Time: %{x}<br>Score: %{y:.2f}<extra></extra>'
-                        ))
-                
-                fig_timeline.update_layout(
-                    title={
-                        'text': 'Sentiment Score Over Time',
-                        'x': 0.5,
-                        'font': {'size': 16, 'color': '#efeff1'}
-                    },
-                    xaxis_title='Time',
-                    yaxis_title='Sentiment Score',
-                    xaxis=dict(
-                        tickangle=-45,
-                        title_font=dict(size=12, color='#efeff1'),
-                        tickfont=dict(color='#efeff1'),
-                        gridcolor='rgba(255,255,255,0.1)'
-                    ),
-                    yaxis=dict(
-                        title_font=dict(size=12, color='#efeff1'),
-                        tickfont=dict(color='#efeff1'),
-                        range=[-1, 1],
-                        gridcolor='rgba(255,255,255,0.1)'
-                    ),
-                    font=dict(size=10, color='#efeff1'),
-                    hovermode='x unified',
-                    showlegend=True,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(color='#efeff1')
-                    ),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)'
-                )
-                
-                st.plotly_chart(fig_timeline, use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-        # Enhanced Recent Messages Section
-        st.markdown('<div class="section-header">💬 Recent Chat Activity</div>', unsafe_allow_html=True)
-        
-        st.markdown('<div class="messages-container fade-in">', unsafe_allow_html=True)
-        
-        recent_messages = recent_df.tail(15).copy()  # Show more messages
-        recent_messages['sentiment_emoji'] = recent_messages['sentiment_label'].map({
-            'positive': '🟢', 'negative': '🔴', 'neutral': '🟡'
-        })
-        recent_messages['sentiment_display'] = recent_messages.apply(
-            lambda row: f"{row['sentiment_emoji']} {row['sentiment_score']:.2f}", axis=1
-        )
-        
-        # Create Twitch-themed message display
-        for i, (_, row) in enumerate(recent_messages.iterrows()):
-            sentiment_color = {
-                'positive': '#00f89a',
-                'negative': '#eb0400',
-                'neutral': '#772ce8'
-            }[row['sentiment_label']]
-            
-            st.markdown(f"""
-            <div style="
-                background: linear-gradient(135deg, #2d2d2d 0%, #1f1f23 100%);
-                border-left: 4px solid {sentiment_color};
-                border-radius: 8px;
-                padding: 12px;
-                margin: 8px 0;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.3);
-                border: 1px solid rgba(145, 70, 255, 0.2);
-            ">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <div>
-                        <strong style="color: #9146ff;">{row['username']}</strong>
-                        <span style="color: #adadb8; font-size: 0.85rem; margin-left: 10px;">
-                            {row['timestamp'].strftime('%H:%M:%S')}
-                        </span>
-                    </div>
-                    <div style="color: {sentiment_color}; font-weight: 600;">
-                        {row['sentiment_display']}
-                    </div>
-                </div>
-                <div style="margin-top: 8px; color: #efeff1;">
-                    {row['message']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Streamscharts.com Inspired Analytics
-        st.markdown('<div class="section-header">📊 Stream Analytics Dashboard</div>', unsafe_allow_html=True)
-        
-        insight_col1, insight_col2, insight_col3 = st.columns(3)
-        
-        with insight_col1:
-            st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
-            st.markdown('#### 🏆 Top Chatters')
-            
-            # Top users by message count
-            top_users = recent_df['username'].value_counts().head(5)
-            
-            for i, (user, count) in enumerate(top_users.items()):
-                badge_color = '#9146ff' if i == 0 else '#772ce8' if i == 1 else '#5f1dc7'
-                st.markdown(f"""
-                <div style="
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    padding: 8px;
-                    border-bottom: 1px solid rgba(145, 70, 255, 0.2);
-                    background: linear-gradient(135deg, rgba(145, 70, 255, 0.05) 0%, rgba(119, 44, 232, 0.05) 100%);
-                ">
-                    <span style="color: #efeff1; font-weight: 600;">{user}</span>
-                    <span style="background: {badge_color}; color: white; padding: 2px 8px; border-radius: 12px; font-size: 0.8rem;">
-                        {count} msgs
-                    </span>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with insight_col2:
-            st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
-            st.markdown('#### ⏰ Peak Activity Times')
-            
-            # Messages per time period
-            recent_df['hour'] = recent_df['timestamp'].dt.hour
-            hourly_activity = recent_df.groupby('hour').size().reset_index()
-            hourly_activity.columns = ['Hour', 'Messages']
-            
-            fig_activity = px.bar(
-                hourly_activity,
-                x='Hour',
-                y='Messages',
-                color='Messages',
-                color_continuous_scale=['#772ce8', '#9146ff', '#a855f7'],  # Twitch purple gradient
-                title='Messages by Hour'
-            )
-            
-            fig_activity.update_layout(
-                height=250,
-                showlegend=False,
-                xaxis_title='Hour of Day',
-                yaxis_title='Message Count',
-                font=dict(color='#efeff1'),
-                xaxis=dict(
-                    tickfont=dict(color='#efeff1'),
-                    title_font=dict(color='#efeff1'),
-                    gridcolor='rgba(255,255,255,0.1)'
-                ),
-                yaxis=dict(
-                    tickfont=dict(color='#efeff1'),
-                    title_font=dict(color='#efeff1'),
-                    gridcolor='rgba(255,255,255,0.1)'
-                ),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)'
-            )
-            
-            st.plotly_chart(fig_activity, use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with insight_col3:
-            st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
-            st.markdown('#### 📈 Sentiment Momentum')
-            
-            # Sentiment trend over time
-            sentiment_trend = recent_df.groupby(recent_df['timestamp'].dt.floor('5min')).agg({
-                'sentiment_score': 'mean',
-                'sentiment_label': lambda x: x.mode().iloc[0] if not x.mode().empty else 'neutral'
-            }).reset_index()
-            
-            if not sentiment_trend.empty:
-                fig_trend = go.Figure()
-                fig_trend.add_trace(go.Scatter(
-                    x=sentiment_trend['timestamp'],
-                    y=sentiment_trend['sentiment_score'],
-                    mode='lines+markers',
-                    name='Sentiment Momentum',
-                    line=dict(color='#9146ff', width=3),
-                    fill='tonexty',
-                    fillcolor='rgba(145, 70, 255, 0.2)',
-                    marker=dict(size=6, color='#9146ff')
-                ))
-                
-                fig_trend.update_layout(
-                    height=250,
-                    title='Sentiment Momentum (5-min intervals)',
-                    xaxis_title='Time',
-                    yaxis_title='Average Sentiment',
-                    showlegend=False,
-                    font=dict(color='#efeff1'),
-                    xaxis=dict(
-                        tickfont=dict(color='#efeff1'),
-                        title_font=dict(color='#efeff1'),
-                        gridcolor='rgba(255,255,255,0.1)'
-                    ),
-                    yaxis=dict(
-                        range=[-1, 1],
-                        tickfont=dict(color='#efeff1'),
-                        title_font=dict(color='#efeff1'),
-                        gridcolor='rgba(255,255,255,0.1)'
-                    ),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)'
-                )
-                
-                st.plotly_chart(fig_trend, use_container_width=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Auto-refresh
-        time.sleep(update_interval)
-        st.rerun()
-    
-else:
-    # Professional No Data State with Twitch theme
+            return pd.DataFrame(), None
+    if use_history:
+        try:
+            history = load_history(channel, HISTORY_RANGES[history_range], history_users, history_labels)
+        except Exception as e:
+            st.error(f"Error loading stored history: {e}")
+            return pd.DataFrame(), None
+        if history.empty:
+            st.info(f"No stored history for {channel} matching these filters" if history_users or history_labels
+                    else f"No stored history for {channel} in this time range")
+            return history, None
+        key = ('history', channel, history_range, history_users, history_labels, len(history), history['timestamp'].iloc[-1])
+        return history, key
+    if 'sample_data' in st.session_state:
+        return typed_frame(pd.DataFrame(st.session_state.sample_data)), ('sample', st.session_state.get('sample_id'))
+    return None, None
+
+
+def render_no_data():
+    """Professional No Data State with Twitch theme"""
     st.markdown('<div class="section-header">📊 Dashboard Status</div>', unsafe_allow_html=True)
     
     st.markdown("""
@@ -730,7 +781,7 @@ else:
             <ul style="text-align: left; color: #adadb8;">
                 <li>Use the sidebar to <strong style="color: #9146ff;">Generate Sample Data</strong></li>
                 <li><strong style="color: #9146ff;">Upload JSON</strong> file with chat data</li>
-                <li>Connect the bot for <strong style="color: #9146ff;">Live Analysis</strong></li>
+                <li>Run <code>python src/simple_bot.py</code> for <strong style="color: #9146ff;">Live Analysis</strong> of the selected channel</li>
             </ul>
         </div>
     </div>
@@ -757,6 +808,278 @@ else:
     3. **View Analytics**: Explore the real-time metrics and visualizations
     """)
 
+
+static_df, static_key = load_static_data()
+
+
+# Only this fragment re-runs on each refresh: the page shell, CSS and
+# sidebar are rendered once per full run, and live data is read as deltas
+def render_import_progress(importer):
+    """Progress and running totals of a streaming import"""
+    summary = importer.summary()
+    if importer.done:
+        status = f"✅ Imported {summary['rows']:,} messages from {importer.name}"
+    else:
+        status = f"⏳ Importing {importer.name}: {summary['rows']:,} messages so far"
+    st.progress(importer.progress(), text=status)
+    if importer.error:
+        st.error(f"❌ Import stopped early: {importer.error}")
+    if summary['rows']:
+        st.caption(
+            f"Average sentiment {summary['mean_sentiment']:+.2f} · "
+            f"{summary['sentiment_breakdown']} · "
+            f"{summary['first_timestamp']} → {summary['last_timestamp']}"
+            + (f" · {summary['bad_lines']:,} unreadable lines skipped" if summary['bad_lines'] else '')
+        )
+
+
+@st.fragment(run_every=update_interval if auto_refresh or importer is not None else None)
+def render_main():
+    """Live metric cards, charts and recent messages"""
+    if importer is not None:
+        # Keep importing in steps; analysis shows what has loaded so far
+        if not importer.done:
+            importer.read_for(IMPORT_STEP_SECONDS)
+        render_import_progress(importer)
+        recent_df = importer.tail.tail(100).copy()
+        rollups, chatters = importer.rollups, importer.chatters
+        hype = importer.hype.metrics()  # As of the newest imported message
+    elif static_df is not None:
+        recent_df = static_df.tail(100).copy()  # Last 100 messages
+        rollups, chatters, hype = get_static_metrics(static_df, static_key)
+        hype = hype.metrics()
+    else:
+        live = read_live_feed(channel)
+        recent_df = live['store'].to_dataframe(100)
+        # The bot keeps the rollups over its whole run and publishes them with the feed
+        rollups, chatters = live['reader'].rollups() or Rollups(), live['chatters']
+        # Hype as of the bot's latest snapshot; zeros until it publishes one
+        snapshot = live['reader'].snapshot() or {}
+        hype = snapshot.get('hype') or DecayedHype().metrics()
+    # Periods the bot was disconnected (only known for the live feed)
+    gaps = gap_spans(snapshot) if importer is None and static_df is None else []
+    
+    if recent_df.empty:
+        render_no_data()
+        return
+    
+    sentiment_counts = recent_df['sentiment_label'].value_counts()
+    
+    # KPI cards read the time-decayed hype engine, so they reflect the last
+    # minute or so of chat however busy the channel is
+    hype_index = hype['hype_index']
+    sentiment_change = hype['sentiment'] - hype['baseline_sentiment']
+    positive_ratio = hype['positive_share'] * 100
+    
+    # Professional KPI Cards
+    st.markdown('<div class="section-header">📊 Key Performance Indicators</div>', unsafe_allow_html=True)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(f"""
+        <div class="metric-container fade-in">
+            <p class="metric-value">{hype_index:+.2f}</p>
+            <p class="metric-label">Hype Index</p>
+            <p class="metric-change {'positive-change' if hype_index >= 0 else 'negative-change'}">{'↑' if hype_index >= 0 else '↓'} Sentiment and velocity</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+        <div class="metric-container fade-in">
+            <p class="metric-value">{hype['rate']:.1f}</p>
+            <p class="metric-label">Messages / sec</p>
+            <p class="metric-change {'positive-change' if hype['velocity'] >= 1 else 'negative-change'}">{'↑' if hype['velocity'] >= 1 else '↓'} {hype['velocity']:.1f}x the usual {hype['baseline_rate']:.1f}/s</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        trend_class = 'positive-change' if positive_ratio > 50 else 'negative-change'
+        trend_text = 'Above average' if positive_ratio > 50 else 'Below average'
+        st.markdown(f"""
+        <div class="metric-container fade-in">
+            <p class="metric-value">{positive_ratio:.1f}%</p>
+            <p class="metric-label">Positive Ratio</p>
+            <p class="metric-change {trend_class}">↑ {trend_text}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown(f"""
+        <div class="metric-container fade-in">
+            <p class="metric-value">{hype['sentiment']:+.2f}</p>
+            <p class="metric-label">Sentiment</p>
+            <p class="metric-change {'positive-change' if sentiment_change >= 0 else 'negative-change'}">{'↑' if sentiment_change >= 0 else '↓'} {sentiment_change:+.2f} vs usual</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Analytics Section
+    st.markdown('<div class="section-header">📈 Advanced Analytics</div>', unsafe_allow_html=True)
+    
+    chart_col1, chart_col2 = st.columns(2)
+    
+    with chart_col1:
+        st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
+        st.markdown('#### 🎯 Sentiment Distribution')
+        
+        fig_pie = get_figure('pie')
+        fig_pie.data[0].values = [int(sentiment_counts.get(label, 0)) for label in SENTIMENT_ORDER]
+        
+        st.plotly_chart(fig_pie, use_container_width=True, key='pie_chart')
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with chart_col2:
+        st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
+        st.markdown('#### 📊 Sentiment Timeline')
+        
+        # Mean score per label and bucket, read from the rollups
+        resolution = rollups.choose() if timeline_resolution == 'Auto' else timeline_resolution
+        timeline = rollups.frame(resolution)
+        fig_timeline = get_figure('timeline')
+        fig_timeline.layout.title.text = f'Sentiment Score Over Time ({resolution} buckets)'
+        for trace, sentiment in zip(fig_timeline.data, SENTIMENT_ORDER):
+            points = timeline[timeline[sentiment] > 0]
+            trace.x, trace.y = break_at_gaps(points, f'{sentiment}_mean_score', gaps)
+        # Shade disconnects so a hole in the data is not read as quiet chat
+        fig_timeline.layout.shapes = [
+            dict(type='rect', xref='x', yref='paper', x0=start, x1=end, y0=0, y1=1,
+                 fillcolor='rgba(235,4,0,0.15)', line_width=0, layer='below')
+            for start, end in gaps
+        ]
+        
+        st.plotly_chart(fig_timeline, use_container_width=True, key='timeline_chart')
+        if gaps:
+            missed = sum((end - start).total_seconds() for start, end in gaps)
+            st.caption(f"⚠️ Shaded: bot disconnected ({len(gaps)} gap{'s' if len(gaps) > 1 else ''}, {missed:.0f}s without data)")
+        st.markdown('</div>', unsafe_allow_html=True)
+    # Enhanced Recent Messages Section
+    st.markdown('<div class="section-header">💬 Recent Chat Activity</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="messages-container fade-in">', unsafe_allow_html=True)
+    
+    recent_messages = recent_df.tail(15).copy()  # Show more messages
+    recent_messages['sentiment_emoji'] = recent_messages['sentiment_label'].map({
+        'positive': '🟢', 'negative': '🔴', 'neutral': '🟡'
+    })
+    recent_messages['sentiment_display'] = recent_messages.apply(
+        lambda row: f"{row['sentiment_emoji']} {row['sentiment_score']:.2f}", axis=1
+    )
+    
+    # Create Twitch-themed message display
+    for i, (_, row) in enumerate(recent_messages.iterrows()):
+        sentiment_color = SENTIMENT_COLORS[row['sentiment_label']]
+        
+        st.markdown(f"""
+        <div style="
+            background: linear-gradient(135deg, #2d2d2d 0%, #1f1f23 100%);
+            border-left: 4px solid {sentiment_color};
+            border-radius: 8px;
+            padding: 12px;
+            margin: 8px 0;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.3);
+            border: 1px solid rgba(145, 70, 255, 0.2);
+        ">
+            <div style="display: flex; justify-content: space-between; align-items: center;">
+                <div>
+                    <strong style="color: #9146ff;">{escape(str(row['username']))}</strong>
+                    <span style="color: #adadb8; font-size: 0.85rem; margin-left: 10px;">
+                        {row['timestamp'].strftime('%H:%M:%S')}
+                    </span>
+                </div>
+                <div style="color: {sentiment_color}; font-weight: 600;">
+                    {row['sentiment_display']}
+                </div>
+            </div>
+            <div style="margin-top: 8px; color: #efeff1;">
+                {escape(str(row['message']))}
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Streamscharts.com Inspired Analytics
+    st.markdown('<div class="section-header">📊 Stream Analytics Dashboard</div>', unsafe_allow_html=True)
+    
+    insight_col1, insight_col2, insight_col3 = st.columns(3)
+    
+    with insight_col1:
+        st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
+        st.markdown('#### 🏆 Top Chatters')
+        
+        # Top users by message count over the last hour, from the chatter sketches
+        unique_chatters, unique_error = chatters.unique_chatters()
+        st.caption(f'👥 ≈{unique_chatters:,} unique chatters in the last hour (±{unique_error:,.0f})')
+        top_users = [(user, count) for user, count, _ in chatters.top_chatters(5)]
+        
+        for i, (user, count) in enumerate(top_users):
+            badge_color = '#9146ff' if i == 0 else '#772ce8' if i == 1 else '#5f1dc7'
+            st.markdown(f"""
+            <div style="
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                padding: 8px;
+                border-bottom: 1px solid rgba(145, 70, 255, 0.2);
+                background: linear-gradient(135deg, rgba(145, 70, 255, 0.05) 0%, rgba(119, 44, 232, 0.05) 100%);
+            ">
+                <span style="color: #efeff1; font-weight: 600;">{escape(str(user))}</span>
+                <span style="background: {badge_color}; color: white; padding: 2px 8px; border-radius: 12px; font-size: 0.8rem;">
+                    {count} msgs
+                </span>
+            </div>
+            """, unsafe_allow_html=True)
+
+        # Most repeated chat lines (emote spam, copypastas)
+        top_phrases = chatters.top_phrases(3)
+        if top_phrases:
+            st.markdown('#### 🔁 Repeated Phrases')
+            for phrase, count, _ in top_phrases:
+                st.markdown(f"""
+                <div style="display: flex; justify-content: space-between; padding: 6px 8px; border-bottom: 1px solid rgba(145, 70, 255, 0.2);">
+                    <span style="color: #efeff1;">{escape(phrase[:40])}</span>
+                    <span style="color: #adadb8; font-size: 0.8rem;">×{count}</span>
+                </div>
+                """, unsafe_allow_html=True)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    with insight_col2:
+        st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
+        st.markdown('#### ⏰ Peak Activity Times')
+        
+        # Messages per hour of day, from the hourly rollup
+        hourly = rollups.frame('1h')
+        hourly_activity = hourly.groupby(hourly['timestamp'].dt.hour)['count'].sum()
+        
+        fig_activity = get_figure('activity')
+        fig_activity.data[0].x = hourly_activity.index.tolist()
+        fig_activity.data[0].y = hourly_activity.values.tolist()
+        fig_activity.data[0].marker.color = hourly_activity.values.tolist()
+        
+        st.plotly_chart(fig_activity, use_container_width=True, key='activity_chart')
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with insight_col3:
+        st.markdown('<div class="chart-container fade-in">', unsafe_allow_html=True)
+        st.markdown('#### 📈 Sentiment Momentum')
+        
+        # Average sentiment per 5-minute bucket, from the rollups
+        sentiment_trend = rollups.frame('5min')
+        
+        if not sentiment_trend.empty:
+            fig_trend = get_figure('trend')
+            fig_trend.data[0].x = sentiment_trend['timestamp'].tolist()
+            fig_trend.data[0].y = sentiment_trend['mean_score'].tolist()
+            
+            st.plotly_chart(fig_trend, use_container_width=True, key='trend_chart')
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+render_main()
+
 # Professional Footer with Twitch theme
 st.markdown("""
 <div style="
@@ -0,0 +1,228 @@
+import heapq
+import math
+
+import numpy as np
+
+
+def hash_items(items):
+    """64-bit hashes of strings, stable across processes and runs"""
+    import pandas as pd
+    return pd.util.hash_array(np.asarray(items, dtype=object), categorize=False)
+
+
+def _bit_length(values):
+    """Number of significant bits of each uint64 value"""
+    values = values.copy()
+    length = np.zeros(len(values), dtype='int64')
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= np.uint64(1 << shift)
+        length += big * shift
+        values = np.where(big, values >> np.uint64(shift), values)
+    return length + (values > 0)
+
+
+class HyperLogLog:
+    """Approximate count of distinct items in fixed memory
+
+    Uses ``2 ** precision`` one-byte registers (4 KiB at the default
+    precision of 12). The standard error of ``count()`` is about
+    ``1.04 / sqrt(2 ** precision)``, 1.6% at precision 12; small counts
+    fall back to linear counting and are nearly exact. Sketches with the
+    same precision merge losslessly, so per-bucket sketches can be
+    combined into any window.
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16')
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype='uint8')
+
+    @property
+    def relative_error(self):
+        """Standard error of the estimate as a fraction of the count"""
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, item):
+        self.add_hashes(hash_items([item]))
+
+    def add_batch(self, items):
+        if len(items):
+            self.add_hashes(hash_items(items))
+
+    def add_hashes(self, hashes):
+        """Add items by their 64-bit hashes"""
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype('int64')
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        rank = (rest_bits - _bit_length(rest) + 1).astype('uint8')
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        """Estimated number of distinct items added"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype('int64')).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return float(estimate)
+
+    def merge(self, other):
+        """Fold another sketch into this one (union of the two streams)"""
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge sketches with different precision')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        sketch.registers[:] = self.registers
+        return sketch
+
+
+class CountMinSketch:
+    """Approximate per-item counts in fixed memory
+
+    A ``depth`` x ``width`` table of counters. Estimates never
+    undercount; with probability ``1 - exp(-depth)`` an estimate exceeds
+    the true count by at most ``e / width`` times the total count
+    (``error_bound()``). Sketches with the same dimensions merge by
+    adding their tables.
+    """
+
+    def __init__(self, width=1024, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype='int64')
+        self.total = 0
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        """Probability that an estimate exceeds the error bound"""
+        return math.exp(-self.depth)
+
+    def error_bound(self):
+        """Maximum overcount of an estimate (with probability 1 - delta)"""
+        return self.epsilon * self.total
+
+    def _indexes(self, hashes):
+        # Derive the row hashes from two halves of one 64-bit hash
+        low = (hashes & np.uint64(0xffffffff)).astype('int64')
+        high = (hashes >> np.uint64(32)).astype('int64')
+        return [(low + row * high) % self.width for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        self.add_hashes(hash_items([item]), np.array([count]))
+
+    def add_hashes(self, hashes, counts=None):
+        """Add items by their 64-bit hashes, optionally with weights"""
+        for row, indexes in enumerate(self._indexes(hashes)):
+            self.table[row] += np.bincount(indexes, weights=counts, minlength=self.width).astype('int64')
+        self.total += len(hashes) if counts is None else int(np.sum(counts))
+
+    def estimate(self, item):
+        return int(self.estimate_hashes(hash_items([item]))[0])
+
+    def estimate_hashes(self, hashes):
+        rows = [self.table[row, indexes] for row, indexes in enumerate(self._indexes(hashes))]
+        return np.min(rows, axis=0)
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Cannot merge sketches with different dimensions')
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def copy(self):
+        sketch = CountMinSketch(self.width, self.depth)
+        sketch.table[:] = self.table
+        sketch.total = self.total
+        return sketch
+
+
+class SpaceSaving:
+    """Heavy hitters of a stream with ``capacity`` counters
+
+    Every item occurring more than ``total / capacity`` times is
+    guaranteed to be tracked. Each reported count overestimates the true
+    count by at most its ``error``, and every error is at most
+    ``total / capacity``. Merged summaries keep the same guarantee over
+    the combined stream.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}  # item -> [count, error]
+        self.total = 0
+        self._heap = []  # (count, item), possibly stale
+
+    def _min_item(self):
+        heap, counts = self._heap, self.counts
+        while True:
+            count, item = heap[0]
+            entry = counts.get(item)
+            if entry is not None and entry[0] == count:
+                return item
+            heapq.heappop(heap)
+
+    def add(self, item, count=1):
+        self.total += count
+        entry = self.counts.get(item)
+        if entry is not None:
+            entry[0] += count
+        elif len(self.counts) < self.capacity:
+            entry = self.counts[item] = [count, 0]
+        else:
+            # Replace the smallest counter; the new item inherits its count
+            # as the worst-case error
+            smallest = self._min_item()
+            floor = self.counts.pop(smallest)[0]
+            entry = self.counts[item] = [floor + count, floor]
+        heapq.heappush(self._heap, (entry[0], item))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._heap = [(entry[0], key) for key, entry in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def add_counts(self, counts):
+        """Add pre-aggregated ``{item: count}``, largest first"""
+        for item, count in sorted(counts.items(), key=lambda pair: pair[1], reverse=True):
+            self.add(item, int(count))
+
+    def max_error(self):
+        """Upper bound on the overcount of any reported item"""
+        return self.total / self.capacity
+
+    def merge(self, other):
+        """Fold another summary into this one, keeping the largest counters"""
+        floor_self = min((entry[0] for entry in self.counts.values()), default=0) if len(self.counts) >= self.capacity else 0
+        floor_other = min((entry[0] for entry in other.counts.values()), default=0) if len(other.counts) >= other.capacity else 0
+        merged = {}
+        for item in set(self.counts) | set(other.counts):
+            count_a, error_a = self.counts.get(item, (floor_self, floor_self))
+            count_b, error_b = other.counts.get(item, (floor_other, floor_other))
+            merged[item] = [count_a + count_b, error_a + error_b]
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda pair: pair[1][0])
+        self.counts = {item: entry for item, entry in kept}
+        self.total += other.total
+        self._heap = [(entry[0], item) for item, entry in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def copy(self):
+        summary = SpaceSaving(self.capacity)
+        summary.counts = {item: list(entry) for item, entry in self.counts.items()}
+        summary.total = self.total
+        summary._heap = list(self._heap)
+        return summary
+
+    def top(self, n=10):
+        """``(item, count, error)`` of the ``n`` largest counters"""
+        largest = heapq.nlargest(n, self.counts.items(), key=lambda pair: pair[1][0])
+        return [(item, count, error) for item, (count, error) in largest]
@@ -0,0 +1,235 @@
+import math
+import time
+from collections import deque
+
+
+class EwmaStat:
+    """Exponentially weighted mean and variance of a series"""
+
+    __slots__ = ('alpha', 'mean', '_var', '_unweighted', 'count')
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.mean = 0.0
+        self._var = 0.0
+        self._unweighted = 1.0  # Weight still on the zero the variance started from
+        self.count = 0
+
+    @property
+    def var(self):
+        """Variance, corrected for starting from zero"""
+        return self._var / (1 - self._unweighted) if self._unweighted < 1 else 0.0
+
+    def update(self, value):
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self._var = (1 - self.alpha) * (self._var + diff * increment)
+            self._unweighted *= 1 - self.alpha
+        self.count += 1
+
+    def zscore(self, value, min_std):
+        return (value - self.mean) / max(math.sqrt(self.var), min_std)
+
+
+class SpikeEvent:
+    """A detected surge in message rate or shift in sentiment"""
+
+    __slots__ = ('channel', 'timestamp', 'kind', 'direction', 'detector', 'value', 'baseline', 'zscore', 'magnitude')
+
+    def __init__(self, channel, timestamp, kind, direction, detector, value, baseline, zscore, magnitude):
+        self.channel = channel
+        self.timestamp = timestamp  # Start of the second that triggered it
+        self.kind = kind  # 'rate' or 'sentiment'
+        self.direction = direction  # 'up' or 'down'
+        self.detector = detector  # 'zscore' (sudden) or 'cusum' (sustained)
+        self.value = value
+        self.baseline = baseline
+        self.zscore = zscore
+        self.magnitude = magnitude  # Rate: multiple of baseline; sentiment: change in mean score
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def describe(self):
+        if self.kind == 'rate':
+            return f"{self.value:.0f} msg/s, {self.magnitude:.1f}x the usual {self.baseline:.1f} (z={self.zscore:.1f})"
+        return f"sentiment {self.value:+.2f} vs {self.baseline:+.2f} ({self.magnitude:+.2f}, z={self.zscore:.1f})"
+
+
+class _Series:
+    """EWMA baseline plus two-sided CUSUM for one per-second series"""
+
+    __slots__ = ('stat', 'fast', 'high', 'low', 'cooldown_until', 'active')
+
+    def __init__(self, alpha, fast_alpha):
+        self.stat = EwmaStat(alpha)
+        self.fast = EwmaStat(fast_alpha)  # Recent level, to tell when an episode ends
+        self.high = 0.0  # Upper CUSUM
+        self.low = 0.0  # Lower CUSUM
+        self.cooldown_until = 0
+        self.active = None  # Direction of the episode last reported, until it ends
+
+
+class SpikeDetector:
+    """Streaming spike detection on one channel's per-second chat activity
+
+    Messages are summed into one-second ticks. Each tick updates EWMA
+    baselines (``half_life`` seconds) of the message rate and of the mean
+    sentiment, and checks the new value two ways: a z-score of at least
+    ``threshold`` catches sudden surges, a CUSUM of z-scores (slack
+    ``cusum_k``, limit ``cusum_h``) catches sustained shifts that no single
+    second stands out in. An episode is reported once: further events in
+    the same direction wait until the recent level (an EWMA with
+    ``fast_half_life``) is back within ``cusum_k`` standard deviations of
+    the baseline, whether the level fell back or the baseline caught up.
+    Every tick costs O(1) and no history is kept, so one process can
+    watch hundreds of channels.
+
+    Rate spikes are upward only and need at least ``min_rate`` messages a
+    second and ``min_ratio`` times the baseline. Sentiment is checked in
+    both directions on seconds with at least ``min_messages`` messages,
+    allowing for the sampling error of a mean of few messages. Nothing
+    fires during the first ``warmup`` ticks, or within ``cooldown``
+    seconds of the series' previous event. Values feed the baseline
+    clipped to ``threshold`` standard deviations, so a spike does not
+    immediately become the new normal. With ``gaps`` (a GapTracker),
+    seconds spent disconnected are skipped instead of counted as silence.
+    """
+
+    def __init__(self, channel, half_life=60.0, fast_half_life=5.0, threshold=5.0, cusum_k=0.5,
+                 cusum_h=10.0, warmup=60, cooldown=30, min_rate=5.0, min_ratio=2.0, min_messages=5,
+                 max_events=100, on_spike=None, gaps=None):
+        self.channel = channel
+        self.threshold = threshold
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.warmup = warmup
+        self.cooldown = cooldown
+        self.min_rate = min_rate
+        self.min_ratio = min_ratio
+        self.min_messages = min_messages
+        self.on_spike = on_spike
+        self.gaps = gaps
+        self.events = deque(maxlen=max_events)  # Most recent events
+        self.total = 0
+
+        alpha = 1 - 0.5 ** (1 / half_life)
+        fast_alpha = 1 - 0.5 ** (1 / fast_half_life)
+        self.rate = _Series(alpha, fast_alpha)
+        self.sentiment = _Series(alpha, fast_alpha)
+        self.message_var = EwmaStat(alpha)  # Spread of single message scores
+        self.second = None  # Second being accumulated
+        self.count = 0
+        self.score_sum = 0.0
+        self.score_squares = 0.0
+        self.ticks = 0
+
+    def add(self, timestamp, score):
+        """Count one scored message"""
+        second = int(timestamp)
+        if second != self.second:
+            self.advance(second)
+        self.count += 1
+        self.score_sum += score
+        self.score_squares += score * score
+
+    def advance(self, second):
+        """Close every second before ``second`` (silent ones count as zero)"""
+        if self.second is None:
+            self.second = second
+            return
+        if second <= self.second:
+            return
+        self._tick(self.second, self.count, self.score_sum, self.score_squares)
+        idle = second - self.second - 1
+        if idle and not (self.gaps is not None and self.gaps.overlap(self.second + 1, second) > 0):
+            # Silent seconds only lower the rate baseline; past a few
+            # half-lives more of them change nothing
+            for empty in range(self.second + 1, self.second + 1 + min(idle, 600)):
+                self._tick(empty, 0, 0.0, 0.0)
+        self.second = second
+        self.count = 0
+        self.score_sum = 0.0
+        self.score_squares = 0.0
+
+    def _tick(self, second, count, score_sum, score_squares):
+        self.ticks += 1
+        warm = self.ticks > self.warmup
+        # Rates are counts: their spread is at least Poisson-like
+        self._check(self.rate, 'rate', second, float(count), math.sqrt(max(self.rate.stat.mean, 1.0)), warm)
+        if count >= self.min_messages:
+            mean = score_sum / count
+            self.message_var.update(max(0.0, score_squares - count * mean * mean) / max(count - 1, 1))
+            sampling_std = math.sqrt(self.message_var.mean / count)
+            self._check(self.sentiment, 'sentiment', second, mean, max(sampling_std, 0.05), warm)
+
+    def _check(self, series, kind, second, value, min_std, warm):
+        stat = series.stat
+        series.fast.update(value)
+        if not stat.count:
+            stat.update(value)
+            return
+        z = stat.zscore(value, min_std)
+
+        if not warm:
+            stat.update(value)
+            return
+        std = max(math.sqrt(stat.var), min_std)
+        if series.active is not None and abs(series.fast.mean - stat.mean) < std * self.cusum_k:
+            # Back near the baseline: the episode is over, and whatever
+            # level it settled at is the new normal
+            series.active = None
+            stat.mean = series.fast.mean
+        series.high = max(0.0, series.high + z - self.cusum_k)
+        series.low = max(0.0, series.low - z - self.cusum_k)
+        detector = None
+        direction = 'up' if z > 0 else 'down'
+        if abs(z) >= self.threshold:
+            detector = 'zscore'
+        elif series.high > self.cusum_h:
+            detector, direction = 'cusum', 'up'
+        elif series.low > self.cusum_h:
+            detector, direction = 'cusum', 'down'
+
+        if detector is not None and direction == series.active:
+            series.high = series.low = 0.0  # Still the episode already reported
+        elif detector is not None and second >= series.cooldown_until:
+            baseline = stat.mean
+            if kind == 'rate':
+                magnitude = value / max(baseline, 0.1)
+                fire = direction == 'up' and value >= self.min_rate and magnitude >= self.min_ratio
+            else:
+                magnitude = value - baseline
+                fire = True
+            if fire:
+                series.high = series.low = 0.0
+                series.cooldown_until = second + self.cooldown
+                series.active = direction
+                event = SpikeEvent(self.channel, second, kind, direction, detector, value, baseline, z, magnitude)
+                self.events.append(event)
+                self.total += 1
+                if self.on_spike is not None:
+                    self.on_spike(event)
+
+        spread = std * self.threshold
+        stat.update(min(max(value, stat.mean - spread), stat.mean + spread))
+
+    def recent(self, seconds=None, now=None):
+        """Events of the last ``seconds`` seconds (all kept events by default)"""
+        if seconds is None:
+            return list(self.events)
+        cutoff = (time.time() if now is None else now) - seconds
+        return [event for event in self.events if event.timestamp >= cutoff]
+
+    def stats(self, top=5):
+        """Baselines and the latest events, for snapshots"""
+        return {
+            'rate_baseline': round(self.rate.stat.mean, 2),
+            'sentiment_baseline': round(self.sentiment.stat.mean, 3),
+            'events': self.total,
+            'recent': [event.as_dict() for event in list(self.events)[-top:]]
+        }
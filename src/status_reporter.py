@@ -0,0 +1,93 @@
+import asyncio
+import queue
+import sys
+import threading
+import time
+
+
+class BufferedWriter:
+    """Writes console output from a background thread
+
+    ``write`` only appends to a bounded in-memory buffer, so a slow
+    terminal never blocks the event loop. If the terminal falls so far
+    behind that the buffer fills up, further lines are dropped and
+    counted instead.
+    """
+
+    def __init__(self, stream=None, max_lines=10000):
+        self.stream = stream or sys.stdout
+        self.lines = queue.Queue(maxsize=max_lines)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='console-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        """Queue a line for output without blocking"""
+        try:
+            self.lines.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            line = self.lines.get()
+            if line is None:
+                break
+            # Write everything that is already waiting in one call
+            chunk = [line]
+            try:
+                while len(chunk) < 1000:
+                    line = self.lines.get_nowait()
+                    if line is None:
+                        self.stream.write('\n'.join(chunk) + '\n')
+                        self.stream.flush()
+                        return
+                    chunk.append(line)
+            except queue.Empty:
+                pass
+            self.stream.write('\n'.join(chunk) + '\n')
+            self.stream.flush()
+
+    def close(self):
+        """Flush queued lines and stop the writer thread"""
+        self.lines.put(None)
+        self._thread.join()
+
+
+class StatusReporter:
+    """Periodic status line plus optional sampled per-message echo
+
+    ``render()`` is called every ``interval`` seconds and returns the lines
+    to show. Individual chat messages are echoed only for one in every
+    ``echo_every`` messages (0 disables the echo).
+    """
+
+    def __init__(self, render, interval=1.0, echo_every=0, writer=None):
+        self.render = render
+        self.interval = interval
+        self.echo_every = echo_every
+        self.writer = writer or BufferedWriter()
+        self._seen = 0
+
+    def echo(self, line):
+        """Echo a chat line if it falls in the sample; ``line`` may be a callable"""
+        if not self.echo_every:
+            return
+        self._seen += 1
+        if self._seen % self.echo_every == 0:
+            self.writer.write(line() if callable(line) else line)
+
+    def write(self, line):
+        self.writer.write(line)
+
+    async def run(self):
+        """Render the status every ``interval`` seconds until cancelled"""
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+            try:
+                for line in self.render():
+                    self.writer.write(line)
+            except Exception as e:
+                self.writer.write(f"Error rendering status: {e}")
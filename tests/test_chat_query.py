@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chat_query import ChatQuery
+from message_store import LABELS
+from segment_store import SegmentStore
+
+CHANNEL = 'testchannel'
+MESSAGES = 20000
+HOURS = 4
+
+
+@pytest.fixture(scope='module')
+def history(tmp_path_factory):
+    """A compacted four-hour stream plus a late batch of small segments, and the rows written"""
+    store = SegmentStore(str(tmp_path_factory.mktemp('history')), flush_rows=1000, row_group_rows=2000)
+    rng = np.random.default_rng(7)
+    start = time.time() - 3 * 86400
+    rows = pd.DataFrame({
+        'timestamp': np.sort(start + rng.random(MESSAGES) * HOURS * 3600),
+        'username': [f'user{index}' for index in rng.integers(0, 200, MESSAGES).tolist()],
+        'message': [f'message {i}' for i in range(MESSAGES)],
+        'sentiment_score': rng.uniform(-1, 1, MESSAGES),
+        'sentiment_label': [LABELS[code] for code in rng.integers(0, len(LABELS), MESSAGES).tolist()],
+    })
+
+    def write(part):
+        for row in part.itertuples(index=False):
+            store.append(CHANNEL, *row)
+        store.flush()
+        store._drain()
+
+    write(rows.iloc[:-1000])
+    store.compact()
+    write(rows.iloc[-1000:])  # Late rows land next to the compacted segments
+    return start, ChatQuery(store), rows
+
+
+def test_unfiltered_read_returns_every_message_once(history):
+    _, query, rows = history
+    df = query.frame(CHANNEL)
+    assert len(df) == MESSAGES
+    assert df['timestamp'].is_monotonic_increasing
+    assert df['message'].tolist() == rows['message'].tolist()
+    assert df['username'].astype(str).tolist() == rows['username'].tolist()
+    assert df['sentiment_label'].astype(str).tolist() == rows['sentiment_label'].tolist()
+    assert query.timeline(CHANNEL)['messages'].sum() == MESSAGES
+
+
+@pytest.mark.parametrize('window, users, labels', [
+    ((3600, 3700), None, None),
+    ((1000, 9000), ['user5', 'user7'], ['negative']),
+    (None, ['user1'], None),
+    ((0, 5), None, ['positive']),
+    (None, ['nobody'], None),
+    ((HOURS * 3600 - 600, None), None, ['neutral', 'negative']),
+])
+def test_filtered_queries_match_the_unfiltered_read(history, window, users, labels):
+    start, query, rows = history
+    first, last = [None if offset is None else start + offset for offset in window or (None, None)]
+    mask = pd.Series(True, index=rows.index)
+    if first is not None:
+        mask &= rows['timestamp'] >= first
+    if last is not None:
+        mask &= rows['timestamp'] < last
+    if users is not None:
+        mask &= rows['username'].isin(users)
+    if labels is not None:
+        mask &= rows['sentiment_label'].isin(labels)
+
+    result = query.frame(CHANNEL, first, last, users, labels)
+    assert sorted(result['message']) == sorted(rows.loc[mask, 'message'])
+
+    timeline = query.timeline(CHANNEL, first, last, bucket=60, users=users, labels=labels)
+    assert timeline['messages'].sum() == mask.sum()
+    chunks = list(query.chunks(CHANNEL, first, last, users, labels, chunk_rows=500))
+    assert sum(len(chunk) for chunk in chunks) == mask.sum()
+    assert all(len(chunk) <= 500 for chunk in chunks)
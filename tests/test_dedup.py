@@ -0,0 +1,103 @@
+import asyncio
+
+from dedup import Deduplicator
+from simple_bot import SimpleTwitchBot
+
+
+def privmsg(username, text):
+    return f":{username}!{username}@{username}.tmi.twitch.tv PRIVMSG #testchannel :{text}"
+
+
+def make_bot():
+    return SimpleTwitchBot(
+        channel='testchannel', scorer='lexicon', live_feed=False, archive=False,
+        status_interval=0, echo_every=0
+    )
+
+
+def feed(bot, lines, start=1_700_000_000.0, spacing=0.01):
+    async def run():
+        for i, line in enumerate(lines):
+            await bot.handle_message(line, start + i * spacing)
+        await bot.batcher.drain()
+    asyncio.run(run())
+
+
+def test_emote_wall_variants_share_a_cluster():
+    dedup = Deduplicator(window=10)
+    first, duplicate = dedup.check('KEKW KEKW KEKW', 0.0)
+    assert not duplicate
+    cluster, duplicate = dedup.check('kekw', 1.0)
+    assert duplicate and cluster is first
+    assert cluster.repeats == 2
+    assert dedup.spam_intensity() == 0.5
+
+
+def test_edited_copypasta_matches_by_minhash():
+    dedup = Deduplicator(window=10)
+    pasta = 'this is the best stream on twitch and nobody can tell me otherwise ever'
+    dedup.check(pasta, 0.0)
+    _, duplicate = dedup.check(pasta.replace('ever', 'lol'), 1.0)
+    assert duplicate
+    _, duplicate = dedup.check('completely different words in this chat line here', 2.0)
+    assert not duplicate
+
+
+def test_cluster_expires_and_reports_repeats():
+    collapsed = []
+    dedup = Deduplicator(window=10, on_collapsed=collapsed.append)
+    for second in range(3):
+        dedup.check('Pog', float(second))
+    dedup.expire(13.0)
+    assert [cluster.repeats for cluster in collapsed] == [3]
+    assert not dedup.check('Pog', 13.0)[1]
+
+
+def test_duplicates_are_recorded_but_scored_once():
+    bot = make_bot()
+    feed(bot, [privmsg(f'user{i}', 'KEKW KEKW') for i in range(500)])
+
+    assert bot.dedup.duplicates == 499
+    assert bot.store.total == 500
+    assert bot.sentiment.misses == 1  # The cluster's first line only
+    assert set(bot.store.to_dataframe()['username']) == {f'user{i}' for i in range(500)}
+    metrics = bot.hype.all_metrics(now=1_700_000_000.0 + 5)
+    assert metrics['10s']['message_count'] == 500
+
+
+def test_duplicates_count_towards_rate_and_spikes():
+    bot = make_bot()
+    start = 1_700_000_000.0
+    # Two minutes of quiet chat, then an emote wall of 200 messages a second
+    quiet = [privmsg(f'user{i}', f'message number {i}') for i in range(120)]
+    feed(bot, quiet, start, spacing=1.0)
+    wall = [privmsg(f'viewer{i}', 'PogChamp PogChamp') for i in range(1000)]
+    feed(bot, wall, start + 120, spacing=0.005)
+    bot.spikes.advance(int(start) + 130)
+
+    assert bot.store.total == 1120
+    assert bot.hype.decayed.metrics(start + 125)['velocity'] > 2
+    assert any(event.kind == 'rate' and event.direction == 'up' for event in bot.spikes.events)
+
+
+def test_multi_channel_records_duplicates():
+    from multi_channel import MultiChannelBot
+    bot = MultiChannelBot(
+        channels=['testchannel'], scorer='lexicon', live_feed=False, archive=False, status_interval=0
+    )
+    feed(bot, [privmsg(f'user{i}', 'LUL LUL LUL') for i in range(50)])
+    state = bot.states['testchannel']
+    assert state.store.total == 50
+    assert state.dedup.duplicates == 49
+
+
+def test_multi_channel_echoes_collapsed_clusters():
+    from multi_channel import MultiChannelBot
+    bot = MultiChannelBot(
+        channels=['testchannel'], scorer='lexicon', live_feed=False, archive=False, status_interval=0
+    )
+    echoed = []
+    bot.reporter.echo = lambda line: echoed.append(line())
+    feed(bot, [privmsg(f'user{i}', 'LUL LUL LUL') for i in range(50)])
+    bot.states['testchannel'].dedup.expire(1_700_000_000.0 + 60)
+    assert any(line.startswith('[testchannel] 🔁 x50') for line in echoed)
@@ -0,0 +1,53 @@
+import numpy as np
+
+from rollups import Rollups
+
+START = 1_700_000_000
+
+
+def stream(seed=5, batches=60):
+    """Time-ordered batches of (timestamp, username, score, label code), each
+    led by a few late messages for buckets that may already be closed"""
+    rng = np.random.default_rng(seed)
+    now = START
+    for _ in range(batches):
+        size = int(rng.integers(1, 400))
+        late = sorted(
+            (now - float(rng.uniform(0, 120)), f'user{rng.integers(0, 30)}', float(rng.uniform(-1, 1)), int(rng.integers(0, 3)))
+            for _ in range(int(rng.integers(0, 5)) if now > START else 0)
+        )
+        offsets = np.sort(rng.uniform(0, 30, size))
+        batch = [
+            (now + float(offset), f'user{rng.integers(0, 30)}', float(rng.uniform(-1, 1)), int(rng.integers(0, 3)))
+            for offset in offsets
+        ]
+        now += 30
+        yield late + batch
+
+
+def test_add_batch_matches_add():
+    one_by_one, batched = Rollups(), Rollups()
+    for batch in stream():
+        for row in batch:
+            one_by_one.add(*row)
+        timestamps, usernames, scores, codes = zip(*batch)
+        batched.add_batch(timestamps, usernames, scores, codes)
+
+    assert batched.total == one_by_one.total
+    for name in one_by_one.series:
+        expected, result = one_by_one.frame(name), batched.frame(name)
+        assert len(expected) > 0
+        assert expected['chatters'].tolist() == result['chatters'].tolist(), name
+        assert expected['count'].tolist() == result['count'].tolist(), name
+        assert np.allclose(expected['mean_score'], result['mean_score']), name
+
+
+def test_queued_messages_match_add():
+    one_by_one, queued = Rollups(), Rollups()
+    for batch in stream(seed=6):
+        for row in batch:
+            one_by_one.add(*row)
+            queued.queue(*row)
+        queued.flush()
+    for name in one_by_one.series:
+        assert one_by_one.frame(name)['chatters'].tolist() == queued.frame(name)['chatters'].tolist(), name
@@ -0,0 +1,66 @@
+import os
+import shutil
+import time
+
+from chat_query import ChatQuery
+from segment_store import SegmentStore
+
+CHANNEL = 'testchannel'
+
+
+def closed_hour():
+    """Start of an hour old enough to be compacted"""
+    return (int(time.time()) // 3600 - 72) * 3600
+
+
+def write(store, rows):
+    for timestamp, message in rows:
+        store.append(CHANNEL, timestamp, 'user', message, 0.1, 'neutral')
+    store.flush()
+    store._drain()
+
+
+def files(store):
+    return sorted(
+        os.path.join(directory, name)
+        for directory, _, names in os.walk(os.path.join(store.root, CHANNEL)) for name in names
+    )
+
+
+def test_late_rows_inside_a_compacted_range_are_kept(tmp_path):
+    store = SegmentStore(str(tmp_path), flush_rows=100)
+    start = closed_hour()
+    write(store, [(start + i * 0.1, f'message {i}') for i in range(400)])
+    store.compact()
+    assert len(files(store)) == 1
+
+    # A late flush whose time range lies inside the compacted segment
+    write(store, [(start + 17, 'late')])
+    assert len(ChatQuery(store).frame(CHANNEL)) == 401
+
+    store.compact()
+    assert len(files(store)) == 1
+    df = ChatQuery(store).frame(CHANNEL)
+    assert len(df) == 401
+    assert df['message'].tolist().count('late') == 1
+    assert df['timestamp'].is_monotonic_increasing
+
+
+def test_inputs_left_by_an_interrupted_compaction_stay_hidden(tmp_path):
+    store = SegmentStore(str(tmp_path), flush_rows=100)
+    start = closed_hour()
+    write(store, [(start + i, f'message {i}') for i in range(400)])
+    inputs = files(store)
+    saved = str(tmp_path / 'saved')
+    os.makedirs(saved)
+    for path in inputs:
+        shutil.copy(path, saved)
+    store.compact()
+    # As if the compaction stopped before removing its inputs
+    for path in inputs:
+        shutil.copy(os.path.join(saved, os.path.basename(path)), path)
+
+    assert len(ChatQuery(store).frame(CHANNEL)) == 400
+    store.compact()
+    assert len(files(store)) == 1
+    assert len(ChatQuery(store).frame(CHANNEL)) == 400
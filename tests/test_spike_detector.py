@@ -0,0 +1,74 @@
+import random
+
+from spike_detector import SpikeDetector
+
+START = 1_700_000_000
+
+
+def chat(detector, rng, seconds, rate, mean=0.0, spread=0.3, start=START):
+    """Feed ``seconds`` of chat at about ``rate`` messages a second; returns the next second"""
+    for second in range(start, start + seconds):
+        count = max(0, round(rng.gauss(rate, rate ** 0.5)))
+        for i in range(count):
+            score = min(1.0, max(-1.0, rng.gauss(mean, spread)))
+            detector.add(second + i / max(count, 1), score)
+    return start + seconds
+
+
+def test_steady_chat_raises_no_alarm():
+    detector = SpikeDetector('test')
+    end = chat(detector, random.Random(1), 900, rate=10)
+    detector.advance(end)
+    assert detector.total == 0
+    assert 8 < detector.rate.stat.mean < 12
+
+
+def test_nothing_fires_during_warmup():
+    detector = SpikeDetector('test', warmup=60)
+    rng = random.Random(2)
+    second = chat(detector, rng, 20, rate=5)
+    second = chat(detector, rng, 20, rate=100, start=second)
+    detector.advance(second)
+    assert detector.ticks < 60
+    assert detector.total == 0
+
+
+def test_rate_surge_alarms_once_per_episode():
+    detector = SpikeDetector('test')
+    rng = random.Random(3)
+    second = chat(detector, rng, 300, rate=5)
+    second = chat(detector, rng, 30, rate=60, start=second)
+    detector.advance(second)
+
+    events = [event for event in detector.events if event.kind == 'rate']
+    assert len(events) == 1
+    event = events[0]
+    assert (event.kind, event.direction, event.detector) == ('rate', 'up', 'zscore')
+    assert event.timestamp == START + 300
+    assert event.magnitude >= detector.min_ratio
+
+    # Chat calms down and the episode ends; the next surge is a new alarm
+    second = chat(detector, rng, 300, rate=5, start=second)
+    assert detector.rate.active is None
+    second = chat(detector, rng, 10, rate=60, start=second)
+    detector.advance(second)
+    events = [event for event in detector.events if event.kind == 'rate']
+    assert len(events) == 2
+    assert events[1].timestamp == START + 630
+
+
+def test_sustained_sentiment_shift_is_caught_by_cusum():
+    events = []
+    detector = SpikeDetector('test', on_spike=events.append)
+    rng = random.Random(4)
+    second = chat(detector, rng, 300, rate=20, mean=0.0)
+    # Each second is only about 1.5 standard deviations off: no z-score
+    # alarm, but the CUSUM adds up
+    second = chat(detector, rng, detector.cooldown, rate=20, mean=0.1, start=second)
+    detector.advance(second)
+
+    sentiment = [event for event in events if event.kind == 'sentiment']
+    assert len(sentiment) == 1
+    assert (sentiment[0].direction, sentiment[0].detector) == ('up', 'cusum')
+    assert START + 300 < sentiment[0].timestamp < START + 330
+    assert sentiment[0].magnitude > 0